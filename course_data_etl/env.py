@@ -5,4 +5,5 @@ import os
 FORCE_PARSE = os.getenv("FORCE_PARSE", "false").lower() == "true"
 AVOID_PARSE_COURSERA = os.getenv("AVOID_PARSE_COURSERA", "false").lower() == "true"
 AVOID_PARSE_UDEMY = os.getenv("AVOID_PARSE_UDEMY", "false").lower() == "true"
-FORCE_INSERT = os.getenv("FORCE_INSERT", "false").lower() == "true"
\ No newline at end of file
+FORCE_INSERT = os.getenv("FORCE_INSERT", "false").lower() == "true"
+INSERT_BATCH_SIZE = int(os.getenv("INSERT_BATCH_SIZE", "500"))
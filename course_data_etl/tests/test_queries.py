@@ -1,5 +1,5 @@
 from data_utils.course import Course
-from env import FORCE_INSERT, FORCE_PARSE
+from env import FORCE_INSERT, FORCE_PARSE, INSERT_BATCH_SIZE
 from dataclasses import asdict
 from data_utils.save_raw_data import write_raw_data
 from data_utils.clean_scraped_courses import normalized_courses
@@ -27,7 +27,7 @@ example_queries = [
     ]
 
 DATA_LAYER_API = "http://data_layer_api:5000"
-DATA_LAYER_API_COURSE_INSERTION = f"{DATA_LAYER_API}/course/insert"
+DATA_LAYER_API_COURSE_INSERTION = f"{DATA_LAYER_API}/course/insert_batch"
 DATA_LAYER_API_COURSE_CLEAR = f"{DATA_LAYER_API}/course/clear"
 DATA_LAYER_API_QUERY_COURSE = f"{DATA_LAYER_API}/course/query"
 
@@ -43,10 +43,13 @@ def test_queries(queries: List[str] = example_queries):
         print("Inserting courses into data layer api")
         clear_request_result = requests.post(DATA_LAYER_API_COURSE_CLEAR)
         clear_request_result.raise_for_status()
-        for course in normalized_courses():
-            payload = {"course": asdict(course)}
+        courses = normalized_courses()
+        # the data layer embeds each chunk in batches, far fewer Ollama calls than one request per course
+        for start in range(0, len(courses), INSERT_BATCH_SIZE):
+            payload = {"courses": [asdict(course) for course in courses[start:start + INSERT_BATCH_SIZE]]}
             insert_request_result = requests.post(DATA_LAYER_API_COURSE_INSERTION, json = payload)
             insert_request_result.raise_for_status()
+            print(f"Inserted {insert_request_result.json()['inserted']} of {min(start + INSERT_BATCH_SIZE, len(courses))} courses")
     
         print("Sucessfully uploaded courses via data layer API")
 
@@ -13,6 +13,7 @@ from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExport
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor
 import binascii
+import threading
 import os
 
 def create_app():
@@ -76,6 +77,23 @@ def create_app():
     app.config["JWT_HEADER_TYPE"] = "Bearer"
     jwt = JWTManager(app)
 
+    # Database Connection Lifecycle ------------
+    # one pooled connection is checked out per request and returned here
+    from database.db_factory import close_request_vector_db
+    app.teardown_appcontext(close_request_vector_db)
+
+    # Embedding Model Warm-up ------------------
+    # pulled once per process in the background so startup doesn't wait on Ollama
+    from embedder.embedder import warm_up_embedder
+    threading.Thread(target=warm_up_embedder, name="embedder-warm-up", daemon=True).start()
+
+    # Embedding Outbox Workers -----------------
+    # discussions and replies are written with a pending embedding, computed here in the background
+    from env import DB_IMPLEMENTATION, EMBEDDING_WORKER_ENABLED
+    if DB_IMPLEMENTATION == "postgres" and EMBEDDING_WORKER_ENABLED:
+        from embedder.outbox_worker import EmbeddingOutboxWorker
+        EmbeddingOutboxWorker().start()
+
     # Route Registration -----------------------
     from .search import search_bp
     from .discussion import discussion_bp
@@ -1,15 +1,27 @@
 from flask import Blueprint, request, jsonify, current_app
+from concurrent.futures import ThreadPoolExecutor
 from database.db_factory import get_vector_db
 from classes.course import Course, CourseReview
 from classes.discussion import Discussion
 from classes.reply import Reply
-from classes.like import Like
-from embedder.embedder import get_embedding, embed_course_vector, embed_discussion_vector, embed_reply_vector
+from classes.like import Like, LikeObjectType
+from embedder.embedder import get_embedding_with_prefix, embed_course_vector, embed_courses, normalize_query
+from embedder.circuit_breaker import EmbedderUnavailableError
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from uuid import UUID
 from app.protected import auth_add_like, auth_remove_like
+from cache.ttl_cache import TTLCache
+from cache.result_cache import ResultCache, course_data_version, STALE
+from env import SUGGEST_CACHE_SIZE, SUGGEST_CACHE_TTL
+from env import COURSE_SEARCH_CACHE_SIZE, COURSE_SEARCH_CACHE_TTL, COURSE_SEARCH_CACHE_STALE_TTL
+import json
 course_bp = Blueprint('course', __name__)
 
+# Hot autocomplete prefixes -> suggestions, so repeated keystrokes skip the database
+suggest_cache = TTLCache(SUGGEST_CACHE_SIZE, SUGGEST_CACHE_TTL)
+SUGGEST_MIN_PREFIX_LENGTH = 2
+SUGGEST_MAX_LIMIT = 20
+
 @course_bp.route('/', methods=['GET'])
 def get_courses():
     try:
@@ -44,7 +56,7 @@ def get_course_by_id(course_id):
 @course_bp.route('/<course_id>/reviews', methods=['GET'])
 def get_course_reviews(course_id):
     """
-    Get all reviews for a specific course.
+    Get the reviews for a specific course, newest first.
     
     URL Parameters:
         course_id: The UUID of the course to fetch reviews for
@@ -52,9 +64,10 @@ def get_course_reviews(course_id):
     Query Parameters:
         limit (optional): Maximum number of reviews to return
         offset (optional): Number of reviews to skip (for pagination)
+        cursor (optional): pagination.next_cursor of the previous page, to continue after it
         
     Returns:
-        JSON with reviews array and stats object
+        JSON with reviews array, stats object and pagination object
     """
     try:
         # Validate course_id format
@@ -67,6 +80,7 @@ def get_course_reviews(course_id):
         # Get pagination parameters
         limit = request.args.get('limit', type=int)
         offset = request.args.get('offset', type=int)
+        cursor = request.args.get('cursor')
         
         # Get database connection
         database = get_vector_db()
@@ -77,26 +91,13 @@ def get_course_reviews(course_id):
             database.close()
             return jsonify({"error": "Course not found"}), 404
             
-        # Get reviews for the course
-        result = database.get_course_reviews(course_id)
-        
-        # Apply pagination to reviews if specified
-        if limit is not None or offset is not None:
-            reviews = result["reviews"]
-            offset = offset or 0
-            
-            if limit is not None:
-                paginated_reviews = reviews[offset:offset+limit]
-            else:
-                paginated_reviews = reviews[offset:]
-                
-            result["reviews"] = paginated_reviews
-            result["pagination"] = {
-                "total": len(reviews),
-                "offset": offset,
-                "limit": limit,
-                "returned": len(paginated_reviews)
-            }
+        # Get the page of reviews for the course
+        try:
+            result = database.get_course_reviews(course_id, limit, offset, cursor)
+        except ValueError as e:
+            # malformed cursor
+            database.close()
+            return jsonify({"error": str(e)}), 400
         
         database.close()
         return jsonify(result)
@@ -199,27 +200,211 @@ def insert_course():
     database = get_vector_db() 
     database.insert_course(course, course_vector)
     database.close()
+    suggest_cache.clear()
     
     return jsonify({"message": "Course Upload Endpoint"})
 
+@course_bp.route('/insert_batch', methods=['POST'])
+def insert_courses():
+    """
+    Embed and insert many courses at once (used by the ETL for bulk loads).
+    The embeddings are computed in batches, so this takes far fewer Ollama calls than /insert per course.
+    
+    Request body:
+        {
+            "courses": [dict]  # same course format as /insert
+        }
+        
+    Returns:
+        JSON with the number of received and newly inserted courses (existing courses are skipped)
+    """
+    payload = request.get_json()
+    courses = [Course.dict_to_course(course_dict) for course_dict in payload["courses"]]
+    course_vectors = embed_courses(courses)
+    
+    database = get_vector_db()
+    inserted_ids = database.insert_courses(courses, course_vectors)
+    database.close()
+    suggest_cache.clear()
+    
+    return jsonify({"received": len(courses), "inserted": len(inserted_ids)})
+
+@course_bp.route('/suggest', methods=['GET'])
+def suggest_courses():
+    """
+    Autocomplete course titles for the search box. Never calls the embedder.
+    
+    Query Parameters:
+        prefix: The text typed so far
+        limit (optional): Maximum number of suggestions (default 8, at most 20)
+        
+    Returns:
+        JSON with suggestions array of {id, title, platform}
+    """
+    try:
+        # Normalize so "Python ", "python" and "PYTHON" share a cache entry
+        prefix = " ".join(request.args.get('prefix', '').split()).casefold()
+        limit = min(request.args.get('limit', 8, type=int), SUGGEST_MAX_LIMIT)
+        
+        if len(prefix) < SUGGEST_MIN_PREFIX_LENGTH or limit <= 0:
+            return jsonify({"suggestions": []})
+        
+        cache_key = (prefix, limit)
+        suggestions = suggest_cache.get(cache_key)
+        if suggestions is None:
+            database = get_vector_db()
+            suggestions = database.suggest_course_titles(prefix, limit)
+            database.close()
+            suggest_cache.set(cache_key, suggestions)
+        
+        return jsonify({"suggestions": suggestions})
+    except Exception as e:
+        # Log the error for debugging
+        print(f"Error suggesting courses: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+COURSE_SEARCH_MODES = ("hybrid", "vector", "lexical")
+
+# Course search results, invalidated by every course, course review and user write in this process
+course_search_cache = ResultCache(COURSE_SEARCH_CACHE_SIZE, COURSE_SEARCH_CACHE_TTL, COURSE_SEARCH_CACHE_STALE_TTL, course_data_version)
+# Stale results are recomputed here so the request serving them doesn't wait
+cache_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-cache-refresh")
+
+def course_search_key(query, limit, mode, threshold, similarity_weight, ef_search, filters):
+    """
+    Cache key of a course search. The query is normalized the same way as for the embedding
+    cache and filters are serialized with sorted keys, so equivalent searches share an entry.
+    """
+    return (mode, normalize_query(query), limit, threshold, similarity_weight, ef_search, json.dumps(filters or {}, sort_keys=True))
+
+def run_course_search(query, limit, mode, threshold, similarity_weight, ef_search, filters):
+    """
+    Embed the query and search courses, falling back to full-text search if the query can't be embedded
+
+    Returns:
+        tuple: (courses, mode that produced them, degraded reason or None)
+
+    Raises:
+        ValueError: If the filters are invalid
+    """
+    query_vector = prefix_vector = None
+    degraded_reason = None
+    if mode != "lexical":
+        try:
+            query_vector, prefix_vector = get_embedding_with_prefix(query)
+        except Exception as e:
+            # Embedder slow, down or failing (not every backend error is an EmbedderError), text matches are still useful
+            print(f"Error embedding query, falling back to lexical search: {str(e)}")
+            degraded_reason = "embedder_unavailable" if isinstance(e, EmbedderUnavailableError) else "embedder_error"
+            mode = "lexical"
+    
+    database = get_vector_db()
+    try:
+        if mode == "hybrid":
+            courses = database.query_course_hybrid(query, query_vector, limit, threshold, similarity_weight, ef_search=ef_search, prefix_vector=prefix_vector, filters=filters)
+        elif mode == "vector":
+            courses = database.query_course_vector(query_vector, limit, threshold, similarity_weight, ef_search=ef_search, prefix_vector=prefix_vector, filters=filters)
+        else:
+            courses = database.query_course_lexical(query, limit, similarity_weight, filters=filters)
+    finally:
+        database.close()
+    
+    return courses, mode, degraded_reason
+
+def refresh_course_search(key, *search_args):
+    """
+    Recompute a stale cached search in the background (runs outside the request, on its own connection)
+    """
+    try:
+        version = course_data_version.value
+        courses, _, degraded_reason = run_course_search(*search_args)
+        if degraded_reason is None:
+            course_search_cache.set(key, courses, version)
+    except Exception as e:
+        print(f"Error refreshing cached course search: {str(e)}")
+    finally:
+        course_search_cache.end_refresh(key)
+
 @course_bp.route('/query', methods=['POST'])
 def query_course():
+    """
+    Search courses.
+
+    Request body:
+        {
+            "query": str,
+            "limit": int,
+            "mode": str,       # optional: hybrid (default), vector or lexical
+            "threshold": float,          # optional minimum similarity (default 0.5)
+            "similarity_weight": float,  # optional weight of relevance vs. rating (default 0.85)
+            "ef_search": int,  # optional HNSW candidate list size
+            "filters": {       # optional, every filter given must match
+                "platform": str or [str],
+                "is_free": bool,
+                "min_rating": float,
+                "skills": [str]     # at least one of these skills
+            }
+        }
+
+    Results are cached per process until a course or review is written. Expired results are
+    still served for a while (cache "stale") and refreshed in the background.
+
+    If the query can't be embedded (embedder failing, or its circuit breaker open), hybrid and
+    vector searches serve the last cached result for the same search if there is one, and
+    otherwise fall back to full-text search only. Either way the response is flagged as degraded.
+
+    Returns:
+        JSON with the ranked courses, the mode that produced them, whether the search was degraded
+        and where the result came from ("fresh", "stale", "outdated" or "miss")
+    """
     payload = request.get_json()
     limit = payload["limit"]
     query = payload["query"]
-    query_vector = get_embedding(query)
+    mode = payload.get("mode", "hybrid")
+    threshold = payload.get("threshold", 0.5)
+    similarity_weight = payload.get("similarity_weight", .85)
+    ef_search = payload.get("ef_search")
+    filters = payload.get("filters")
+
+    if mode not in COURSE_SEARCH_MODES:
+        return jsonify({"error": f"Invalid mode: must be one of {', '.join(COURSE_SEARCH_MODES)}"}), 400
+
+    search_args = (query, limit, mode, threshold, similarity_weight, ef_search, filters)
+    key = course_search_key(*search_args)
+    courses, cache_state = course_search_cache.get(key)
+    if cache_state is not None:
+        if cache_state == STALE and course_search_cache.begin_refresh(key):
+            cache_refresh_executor.submit(refresh_course_search, key, *search_args)
+        return jsonify({"courses": courses, "mode": mode, "degraded": False, "cache": cache_state})
+
+    # read before searching, so a write during the search invalidates its result
+    version = course_data_version.value
+    try:
+        courses, result_mode, degraded_reason = run_course_search(*search_args)
+    except ValueError as e:
+        # invalid filters
+        return jsonify({"error": str(e)}), 400
     
-    database = get_vector_db()
-    courses = database.query_course_vector(query_vector, limit)
-    database.close()
+    cache_state = "miss"
+    if degraded_reason is None:
+        course_search_cache.set(key, courses, version)
+    else:
+        # the same search before the outage beats keyword matches, even if courses changed since
+        previous = course_search_cache.peek(key)
+        if previous is not None:
+            courses, result_mode, cache_state = previous, mode, "outdated"
     
-    return jsonify({"courses": courses})
+    response = {"courses": courses, "mode": result_mode, "degraded": degraded_reason is not None, "cache": cache_state}
+    if degraded_reason:
+        response["degraded_reason"] = degraded_reason
+    return jsonify(response)
 
 @course_bp.route('/clear', methods=['POST'])
 def clear_courses():
     database = get_vector_db()
     database.clear_courses()
     database.close()
+    suggest_cache.clear()
     
     return jsonify({"message": "Course data cleared" })
 
@@ -238,6 +423,7 @@ def get_course_discussions(course_id):
     Query Parameters:
         limit (optional): Maximum number of discussions to return
         offset (optional): Number of discussions to skip (for pagination)
+        cursor (optional): pagination.next_cursor of the previous page, to continue after it
         
     Returns:
         JSON with discussions array and pagination information
@@ -253,6 +439,7 @@ def get_course_discussions(course_id):
         # Get pagination parameters
         limit = request.args.get('limit', type=int)
         offset = request.args.get('offset', type=int)
+        cursor = request.args.get('cursor')
         
         # Get database connection
         database = get_vector_db()
@@ -263,31 +450,13 @@ def get_course_discussions(course_id):
             database.close()
             return jsonify({"error": "Course not found"}), 404
             
-        # Get discussions for the course
-        discussions = database.get_discussions_by_course(course_id)
-        
-        # Apply pagination if specified
-        if limit is not None or offset is not None:
-            offset = offset or 0
-            
-            if limit is not None:
-                paginated_discussions = discussions[offset:offset+limit]
-            else:
-                paginated_discussions = discussions[offset:]
-                
-            result = {
-                "discussions": paginated_discussions,
-                "pagination": {
-                    "total": len(discussions),
-                    "offset": offset,
-                    "limit": limit,
-                    "returned": len(paginated_discussions)
-                }
-            }
-        else:
-            result = {
-                "discussions": discussions
-            }
+        # Get the page of discussions for the course
+        try:
+            result = database.get_discussions_by_course(course_id, limit, offset, cursor)
+        except ValueError as e:
+            # malformed cursor
+            database.close()
+            return jsonify({"error": str(e)}), 400
         
         database.close()
         return jsonify(result)
@@ -380,6 +549,7 @@ def get_discussion_detail(discussion_id):
         return jsonify({"error": str(e)}), 500
 
 @course_bp.route('/discussion/<discussion_id>/replies', methods=['GET'])
+@jwt_required(optional=True)
 def get_discussion_replies(discussion_id):
     """
     Get all replies for a specific discussion.
@@ -390,9 +560,11 @@ def get_discussion_replies(discussion_id):
     Query Parameters:
         limit (optional): Maximum number of replies to return
         offset (optional): Number of replies to skip (for pagination)
+        cursor (optional): pagination.next_cursor of the previous page, to continue after it
         
     Returns:
-        JSON with replies array
+        JSON with replies array and pagination object, each reply with its like_count and whether the
+        viewer (if a token is sent) liked it
     """
     try:
         # Validate discussion_id format
@@ -405,6 +577,7 @@ def get_discussion_replies(discussion_id):
         # Get pagination parameters
         limit = request.args.get('limit', type=int)
         offset = request.args.get('offset', type=int)
+        cursor = request.args.get('cursor')
         
         # Get database connection
         database = get_vector_db()
@@ -415,36 +588,26 @@ def get_discussion_replies(discussion_id):
             database.close()
             return jsonify({"error": "Discussion not found"}), 404
         
-        # Get replies for the discussion
-        replies = database.get_replies_by_discussion(discussion_id)
+        # Get the page of replies for the discussion
+        try:
+            result = database.get_replies_by_discussion(discussion_id, limit, offset, cursor)
+        except ValueError as e:
+            # malformed cursor
+            database.close()
+            return jsonify({"error": str(e)}), 400
         
         # Process replies to handle deleted replies
-        for reply in replies:
+        for reply in result["replies"]:
             if reply.get('text') == '[deleted]':
                 reply['username'] = 'Anonymous'
         
-        # Apply pagination if specified
-        if limit is not None or offset is not None:
-            offset = offset or 0
-            
-            if limit is not None:
-                paginated_replies = replies[offset:offset+limit]
-            else:
-                paginated_replies = replies[offset:]
-                
-            result = {
-                "replies": paginated_replies,
-                "pagination": {
-                    "total": len(replies),
-                    "offset": offset,
-                    "limit": limit,
-                    "returned": len(paginated_replies)
-                }
-            }
-        else:
-            result = {
-                "replies": replies
-            }
+        # Replies carry their like_count, one query for which of them the viewer liked
+        viewer_id = get_jwt_identity()
+        viewer_likes = database.get_viewer_likes(
+            [reply["id"] for reply in result["replies"]], LikeObjectType.REPLY, viewer_id
+        ) if viewer_id else set()
+        for reply in result["replies"]:
+            reply["liked_by_viewer"] = reply["id"] in viewer_likes
         
         database.close()
         return jsonify(result)
@@ -512,16 +675,15 @@ def create_discussion():
             user_id=UUID(user_id)
         )
         
-        # Generate embedding for the discussion
-        discussion_vector = embed_discussion_vector(discussion)
-        
         # Insert discussion into database with course references
-        discussion_id = database.insert_discussion(discussion, discussion_vector, referenced_course_ids)
+        # (its embedding is computed in the background by the embedding outbox worker)
+        discussion_id = database.insert_discussion(discussion, referenced_course_ids=referenced_course_ids)
         database.close()
         
         return jsonify({
             "message": "Discussion created successfully",
-            "discussion_id": str(discussion_id)
+            "discussion_id": str(discussion_id),
+            "embedding_status": "pending"
         }), 201
         
     except Exception as e:
@@ -530,6 +692,7 @@ def create_discussion():
         return jsonify({"error": str(e)}), 500
 
 @course_bp.route('/<course_id>/discussion/<discussion_id>/replies', methods=['GET'])
+@jwt_required(optional=True)
 def get_course_discussion_replies(course_id, discussion_id):
     """
     Get all replies for a specific discussion.
@@ -541,9 +704,11 @@ def get_course_discussion_replies(course_id, discussion_id):
     Query Parameters:
         limit (optional): Maximum number of replies to return
         offset (optional): Number of replies to skip (for pagination)
+        cursor (optional): pagination.next_cursor of the previous page, to continue after it
         
     Returns:
-        JSON with replies array
+        JSON with replies array and pagination object, each reply with its like_count and whether the
+        viewer (if a token is sent) liked it
     """
     try:
         # Validate discussion_id format
@@ -556,40 +721,31 @@ def get_course_discussion_replies(course_id, discussion_id):
         # Get pagination parameters
         limit = request.args.get('limit', type=int)
         offset = request.args.get('offset', type=int)
+        cursor = request.args.get('cursor')
         
         # Get database connection
         database = get_vector_db()
         
-        # Get replies for the discussion
-        replies = database.get_replies_by_discussion(discussion_id)
+        # Get the page of replies for the discussion
+        try:
+            result = database.get_replies_by_discussion(discussion_id, limit, offset, cursor)
+        except ValueError as e:
+            # malformed cursor
+            database.close()
+            return jsonify({"error": str(e)}), 400
         
         # Process replies to handle deleted replies
-        for reply in replies:
+        for reply in result["replies"]:
             if reply.get('text') == '[deleted]':
                 reply['username'] = 'Anonymous'
         
-        # Apply pagination if specified
-        if limit is not None or offset is not None:
-            offset = offset or 0
-            
-            if limit is not None:
-                paginated_replies = replies[offset:offset+limit]
-            else:
-                paginated_replies = replies[offset:]
-                
-            result = {
-                "replies": paginated_replies,
-                "pagination": {
-                    "total": len(replies),
-                    "offset": offset,
-                    "limit": limit,
-                    "returned": len(paginated_replies)
-                }
-            }
-        else:
-            result = {
-                "replies": replies
-            }
+        # Replies carry their like_count, one query for which of them the viewer liked
+        viewer_id = get_jwt_identity()
+        viewer_likes = database.get_viewer_likes(
+            [reply["id"] for reply in result["replies"]], LikeObjectType.REPLY, viewer_id
+        ) if viewer_id else set()
+        for reply in result["replies"]:
+            reply["liked_by_viewer"] = reply["id"] in viewer_likes
         
         database.close()
         return jsonify(result)
@@ -650,16 +806,14 @@ def create_reply(course_id, discussion_id):
             discussion_id=discussion_uuid
         )
         
-        # Generate embedding for the reply
-        reply_vector = embed_reply_vector(reply)
-        
-        # Insert reply into database
-        reply_id = database.insert_reply(reply, reply_vector)
+        # Insert reply into database (embedded in the background by the embedding outbox worker)
+        reply_id = database.insert_reply(reply)
         database.close()
         
         return jsonify({
             "message": "Reply created successfully",
-            "reply_id": str(reply_id)
+            "reply_id": str(reply_id),
+            "embedding_status": "pending"
         }), 201
         
     except Exception as e:
@@ -721,16 +875,14 @@ def reply_to_reply(course_id, discussion_id, reply_id):
             discussion_id=discussion_uuid
         )
         
-        # Generate embedding for the reply
-        reply_vector = embed_reply_vector(reply)
-        
-        # Insert reply to reply into database
-        reply_id = database.insert_reply_to_reply(reply, parent_reply_uuid, reply_vector)
+        # Insert reply to reply into database (embedded in the background by the embedding outbox worker)
+        reply_id = database.insert_reply_to_reply(reply, parent_reply_uuid)
         database.close()
         
         return jsonify({
             "message": "Reply created successfully",
-            "reply_id": str(reply_id)
+            "reply_id": str(reply_id),
+            "embedding_status": "pending"
         }), 201
         
     except Exception as e:
@@ -796,11 +948,50 @@ def delete_reply(course_id, discussion_id, reply_id):
         print(f"Error deleting reply: {str(e)}")
         return jsonify({"error": str(e)}), 500
     
-def get_reply_by_id(reply_id):
-    database = get_vector_db()
-    reply = database.get_reply_by_id(reply_id)
-    database.close()
-    return reply
+# Most objects whose likes can be fetched in one /likes/batch request
+LIKE_BATCH_MAX_IDS = 500
+
+@course_bp.route('/likes/batch', methods=['POST'])
+@jwt_required(optional=True)
+def get_like_summaries():
+    """
+    Get the like counts of many objects, and whether the viewer liked them, in one request.
+    
+    Request body:
+        {
+            "object_ids": [str],   # at most LIKE_BATCH_MAX_IDS
+            "object_type": str     # course, learning_journey, discussion or reply
+        }
+        
+    Returns:
+        JSON with {object_id: {"like_count": int, "liked_by_viewer": bool}} for every requested ID.
+        liked_by_viewer is only true when a token is sent.
+    """
+    try:
+        payload = request.get_json()
+        object_ids = payload.get("object_ids")
+        object_type = payload.get("object_type")
+        
+        if not isinstance(object_ids, list) or object_type is None:
+            return jsonify({"error": "Missing required fields: object_ids (list) and object_type are required"}), 400
+        if len(object_ids) > LIKE_BATCH_MAX_IDS:
+            return jsonify({"error": f"At most {LIKE_BATCH_MAX_IDS} object_ids per request"}), 400
+        
+        try:
+            object_type = LikeObjectType(object_type)
+            object_ids = [str(UUID(object_id)) for object_id in object_ids]
+        except (ValueError, TypeError, AttributeError):
+            return jsonify({"error": "Invalid object_type or object ID format"}), 400
+        
+        database = get_vector_db()
+        likes = database.get_like_summaries(object_ids, object_type, get_jwt_identity())
+        database.close()
+        
+        return jsonify({"likes": likes})
+    except Exception as e:
+        # Log the error for debugging
+        print(f"Error getting like summaries: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
 @course_bp.route('/like_reply', methods=['POST'])
 @jwt_required()
@@ -814,7 +1005,7 @@ def like_reply():
     
     reply_id = payload["reply_id"]
 
-    return auth_add_like(user_id, reply_id, 'reply', get_reply_by_id)
+    return auth_add_like(user_id, reply_id, 'reply')
 
 @course_bp.route('/unlike_reply', methods=['POST'])
 @jwt_required()
@@ -828,14 +1019,8 @@ def unlike_reply():
     
     reply_id = payload["reply_id"]
 
-    return auth_remove_like(user_id, reply_id, 'reply', get_reply_by_id)
+    return auth_remove_like(user_id, reply_id, 'reply')
     
-def get_course_by_id(course_id):
-        database = get_vector_db()
-        course = database.get_course_by_id(course_id)
-        database.close()
-        return course
-
 @course_bp.route('/like', methods=['POST'])
 @jwt_required()
 def like_course():
@@ -853,7 +1038,7 @@ def like_course():
     
     course_id = payload["course_id"]
 
-    return auth_add_like(user_id, course_id, 'course', get_course_by_id)
+    return auth_add_like(user_id, course_id, 'course')
 
 @course_bp.route('/unlike', methods=['POST'])
 @jwt_required()
@@ -867,7 +1052,7 @@ def unlike_course():
     
     course_id = payload["course_id"]
 
-    return auth_remove_like(user_id, course_id, 'course', get_course_by_id)
+    return auth_remove_like(user_id, course_id, 'course')
     
 @course_bp.route('/discussion/<discussion_id>/reply', methods=['POST'])
 @jwt_required()
@@ -923,16 +1108,14 @@ def create_discussion_reply(discussion_id):
             discussion_id=discussion_uuid
         )
         
-        # Generate embedding for the reply
-        reply_vector = embed_reply_vector(reply)
-        
-        # Insert reply into database
-        reply_id = database.insert_reply(reply, reply_vector)
+        # Insert reply into database (embedded in the background by the embedding outbox worker)
+        reply_id = database.insert_reply(reply)
         database.close()
         
         return jsonify({
             "message": "Reply created successfully",
-            "reply_id": str(reply_id)
+            "reply_id": str(reply_id),
+            "embedding_status": "pending"
         }), 201
         
     except Exception as e:
@@ -1001,16 +1184,14 @@ def reply_to_discussion_reply(discussion_id, reply_id):
             discussion_id=discussion_uuid
         )
         
-        # Generate embedding for the reply
-        reply_vector = embed_reply_vector(reply)
-        
-        # Insert reply to reply into database
-        reply_id = database.insert_reply_to_reply(reply, parent_reply_uuid, reply_vector)
+        # Insert reply to reply into database (embedded in the background by the embedding outbox worker)
+        reply_id = database.insert_reply_to_reply(reply, parent_reply_uuid)
         database.close()
         
         return jsonify({
             "message": "Reply created successfully",
-            "reply_id": str(reply_id)
+            "reply_id": str(reply_id),
+            "embedding_status": "pending"
         }), 201
         
     except Exception as e:
@@ -15,7 +15,7 @@ discussion_bp = Blueprint('discussion', __name__)
         course_id UUID REFERENCES courses(id) ON DELETE CASCADE,
         title TEXT NOT NULL,
         description TEXT NOT NULL,
-        embedding vector(768) NOT NULL, -- Added vector embedding
+        embedding vector(768), -- NULL while the embedding is pending
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
 
@@ -45,9 +45,6 @@ def post_discussion():
     title = payload.get("title")
     description = payload.get("description")
 
-    # whats the embedding???
-    embedding = payload.get("embedding")
-
     # Validate the course ID, title, and description
     if course_id is None or title is None or description is None:
         return jsonify({"error": "Course ID, title, and description are required"}), 400
@@ -67,9 +64,10 @@ def post_discussion():
         )
         
         # then we can insert this into the discussion table
-        database.insert_discussion(discussion, embedding)
+        # (its embedding is computed in the background by the embedding outbox worker)
+        database.insert_discussion(discussion)
         
-        return jsonify({"message": "Discussion added successfully"})
+        return jsonify({"message": "Discussion added successfully", "embedding_status": "pending"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -137,10 +135,11 @@ def edit_discussion():
         discussion = database.get_discussion_by_id(discussion_id)
         if discussion is None:
             return jsonify({"error": "Discussion not found"}), 404
-        if discussion.user_id != user_id:
+        if discussion["user_id"] != user_id:
             return jsonify({"error": "You are not the owner of this discussion"}), 403
         
         # then we can insert this into the discussion table
+        # (the discussion is re-embedded from the new text in the background)
         edited = database.edit_discussion(discussion_id, title, description)
         
         return jsonify({"message": "Discussion not edited" if edited == 0 else "Discussion edited successfully"})
@@ -149,12 +148,6 @@ def edit_discussion():
     finally:
         database.close()
 
-def get_discussion_by_id(discussion_id):
-    database = get_vector_db()
-    discussion = database.get_discussion_by_id(discussion_id)
-    database.close()
-    return discussion
-
 @discussion_bp.route('/like', methods=['POST'])
 @jwt_required()
 def like_reply():
@@ -167,7 +160,7 @@ def like_reply():
     
     discussion_id = payload["discussion_id"]
 
-    return auth_add_like(user_id, discussion_id, 'discussion', get_discussion_by_id)
+    return auth_add_like(user_id, discussion_id, 'discussion')
 
 @discussion_bp.route('/unlike', methods=['POST'])
 @jwt_required()
@@ -181,4 +174,4 @@ def unlike_reply():
     
     discussion_id = payload["discussion_id"]
 
-    return auth_remove_like(user_id, discussion_id, 'discussion', get_discussion_by_id)
\ No newline at end of file
+    return auth_remove_like(user_id, discussion_id, 'discussion')
\ No newline at end of file
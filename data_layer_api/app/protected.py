@@ -2,7 +2,9 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 import jwt
 from flask import Blueprint, request, jsonify, current_app
 from database.db_factory import get_vector_db
-from classes.like import Like
+from database.like_buffer import get_like_buffer
+from classes.like import Like, LikeObjectType
+from uuid import UUID
 
 protected_bp = Blueprint('protected', __name__)
 
@@ -11,20 +13,41 @@ protected_bp = Blueprint('protected', __name__)
 def _validate_token():    
     return get_jwt_identity()
     
-def auth_add_like(user_id, object_id, object_type, get_object_by_id):
+def parse_like_request(user_id, object_id, object_type):
+    """
+    Validate a like or unlike request.
+
+    Returns:
+        tuple: (LikeObjectType, None) or (None, error response)
+    """
     if user_id is None:
-        return jsonify({"error": "Invalid user_id"}), 401
+        return None, (jsonify({"error": "Invalid user_id"}), 401)
     
     # Validate the object ID
     if object_id is None:
-        return jsonify({"error": f"{object_type} ID is required"}), 400
+        return None, (jsonify({"error": f"{object_type} ID is required"}), 400)
+    try:
+        UUID(str(object_id))
+    except ValueError:
+        return None, (jsonify({"error": f"Invalid {object_type} ID format"}), 400)
+
+    return LikeObjectType(object_type), None
+
+def auth_add_like(user_id, object_id, object_type):
+    """
+    Like an object. The existence check and the insert are a single statement, or, with the
+    like write-behind buffer enabled, the like is queued and written in the next batch.
+    """
+    object_type, error = parse_like_request(user_id, object_id, object_type)
+    if error:
+        return error
+
+    like_buffer = get_like_buffer()
+    if like_buffer is not None and like_buffer.like(user_id, object_id, object_type.value):
+        return jsonify({"message": f"Like of {object_type.value} queued"}), 202
 
     try:
         database = get_vector_db()
-
-        object = get_object_by_id(object_id)
-        if object is None:
-            return jsonify({"error": f"{object_type} not found"}), 404
         
         like = Like(
             user_id=user_id,
@@ -32,35 +55,39 @@ def auth_add_like(user_id, object_id, object_type, get_object_by_id):
             object_type=object_type
         )   
         
-        # Add like to the database
-        database.insert_like(like)
+        # Add like to the database (a no-op if it already exists)
+        found, _ = database.insert_like(like)
+        if not found:
+            return jsonify({"error": f"{object_type.value} not found"}), 404
         
-        return jsonify({"message": f"Liked {object_type} successfully"})
+        return jsonify({"message": f"Liked {object_type.value} successfully"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
         database.close()
 
-def auth_remove_like(user_id, object_id, object_type, get_object_by_id):
-    if user_id is None:
-        return jsonify({"error": "Invalid user_id"}), 401
-    
-    # Validate the discussion ID
-    if object_id is None:
-        return jsonify({"error": f"{object_type} ID is required"}), 400
+def auth_remove_like(user_id, object_id, object_type):
+    """
+    Unlike an object, in a single statement or through the like write-behind buffer
+    """
+    object_type, error = parse_like_request(user_id, object_id, object_type)
+    if error:
+        return error
+
+    like_buffer = get_like_buffer()
+    if like_buffer is not None and like_buffer.unlike(user_id, object_id, object_type.value):
+        return jsonify({"message": f"Unlike of {object_type.value} queued"}), 202
 
     try:
         database = get_vector_db()
-        # Check if the discussion exists
-        object = get_object_by_id(object_id)
-        if object is None:
-            return jsonify({"error": f"{object_type} not found"}), 404
         
-        # Add like to the database
-        deleted = database.delete_like(user_id, object_id, object_type)
+        # Remove the like from the database
+        found, deleted = database.delete_like(user_id, object_id, object_type)
+        if not found:
+            return jsonify({"error": f"{object_type.value} not found"}), 404
         
-        return jsonify({"message": f"{object_type} not unliked" if deleted == 0 else f"Unliked {object_type} successfully"})
+        return jsonify({"message": f"Unliked {object_type.value} successfully" if deleted else f"{object_type.value} not unliked"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
-        database.close()
\ No newline at end of file
+        database.close()
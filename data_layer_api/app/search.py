@@ -1,8 +1,166 @@
 from flask import Blueprint, request, jsonify
+from concurrent.futures import ThreadPoolExecutor, wait
+from database.db_factory import get_vector_db
+from embedder.embedder import get_embedding_with_prefix
+from env import SEARCH_MAX_WORKERS, SEARCH_TIMEOUT_MS
+import time
 
 search_bp = Blueprint('search', __name__)
 
+"""
+Unified search across courses, discussions and replies
+
+The query is embedded once and each source is searched concurrently on a bounded
+thread pool. Worker threads run outside the request context, so each search borrows
+its own pooled connection. Sources that miss the request deadline are left out of
+the response instead of holding it up.
+
+If the query can't be embedded, courses are searched with full-text search only and
+the vector-only sources are reported as unavailable (the response is flagged degraded).
+"""
+
+# Shared by every /search request so concurrent searches can't spawn unbounded threads
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="search")
+
+# source name -> (result type, PostgresVectorDB search method)
+SEARCH_SOURCES = {
+    "courses": ("course", "query_course_vector"),
+    "discussions": ("discussion", "query_discussion_vectors"),
+    "replies": ("reply", "query_reply_vectors"),
+}
+
+DEFAULT_SOURCE_LIMITS = {
+    "courses": 10,
+    "discussions": 5,
+    "replies": 5,
+}
+
+def search_source(method_name, query_vector, prefix_vector, limit, threshold, deadline):
+    """
+    Run one source's vector search on its own pooled connection, bounded by the request deadline
+    """
+    return run_with_deadline(deadline, lambda database: getattr(database, method_name)(
+        query_vector, limit, threshold, prefix_vector=prefix_vector
+    ))
+
+def search_courses_lexical(query, limit, deadline):
+    """
+    Full-text course search used when the query can't be embedded
+    """
+    return run_with_deadline(deadline, lambda database: database.query_course_lexical(query, limit))
+
+def run_with_deadline(deadline, search):
+    """
+    Run search(database) on its own pooled connection with the statement timeout set to the time left
+    """
+    remaining_ms = (deadline - time.monotonic()) * 1000
+    if remaining_ms <= 0:
+        raise TimeoutError("Search deadline passed before the query started")
+
+    database = get_vector_db()
+    try:
+        # stop the query server side once the response no longer needs it
+        database.set_statement_timeout(remaining_ms)
+        return search(database)
+    finally:
+        database.close()
+
 @search_bp.route('/', methods=['POST'])
 def search():
-    # Implement search logic here
-    return jsonify({"message": "Search endpoint"})
\ No newline at end of file
+    """
+    Search courses, discussions and replies with a single query.
+
+    Request body:
+        {
+            "query": str,
+            "sources": [str],          # optional subset of courses, discussions, replies
+            "limits": {source: int},   # optional per-source result limits
+            "threshold": float,        # optional minimum similarity (default 0.5)
+            "timeout_ms": int          # optional deadline, capped at SEARCH_TIMEOUT_MS
+        }
+
+    Returns:
+        JSON with results of every source ranked by similarity (each tagged with its type),
+        plus the status of each source ("ok", "timeout", "error" or "unavailable")
+        and whether the search was degraded to full-text search
+    """
+    try:
+        started = time.monotonic()
+        payload = request.get_json()
+
+        query = payload.get("query")
+        if not query:
+            return jsonify({"error": "Missing required field: query is required"}), 400
+
+        sources = payload.get("sources", list(SEARCH_SOURCES))
+        unknown_sources = [source for source in sources if source not in SEARCH_SOURCES]
+        if unknown_sources:
+            return jsonify({"error": f"Unknown search sources: {', '.join(unknown_sources)}"}), 400
+
+        limits = {**DEFAULT_SOURCE_LIMITS, **payload.get("limits", {})}
+        threshold = payload.get("threshold", 0.5)
+        timeout_ms = min(payload.get("timeout_ms", SEARCH_TIMEOUT_MS), SEARCH_TIMEOUT_MS)
+        deadline = started + timeout_ms / 1000
+
+        # Embed once and share the vectors with every source
+        degraded = False
+        try:
+            query_vector, prefix_vector = get_embedding_with_prefix(query)
+        except Exception as e:
+            print(f"Error embedding search query, falling back to full-text course search: {str(e)}")
+            degraded = True
+
+        results = []
+        source_status = {}
+        if degraded:
+            futures = {}
+            for source in sources:
+                if source == "courses":
+                    futures[source] = search_executor.submit(search_courses_lexical, query, limits[source], deadline)
+                else:
+                    source_status[source] = {"status": "unavailable", "returned": 0}
+        else:
+            futures = {
+                source: search_executor.submit(
+                    search_source, SEARCH_SOURCES[source][1], query_vector, prefix_vector,
+                    limits[source], threshold, deadline
+                )
+                for source in sources
+            }
+        wait(futures.values(), timeout=max(0, deadline - time.monotonic()))
+
+        for source, future in futures.items():
+            if not future.done():
+                future.cancel()
+                source_status[source] = {"status": "timeout", "returned": 0}
+                continue
+
+            error = future.exception()
+            if error is not None:
+                print(f"Error searching {source}: {str(error)}")
+                source_status[source] = {"status": "error", "returned": 0, "error": str(error)}
+                continue
+
+            rows = future.result()
+            result_type = SEARCH_SOURCES[source][0]
+            for row in rows:
+                # full-text matches have no similarity, rank them by their relevance instead
+                score = row["similarity"] if row["similarity"] is not None else row["relevance"]
+                results.append({"type": result_type, "score": float(score), **row})
+            source_status[source] = {"status": "ok", "returned": len(rows)}
+
+        # Similarity is comparable across sources (cosine on the same embedding model)
+        results.sort(key=lambda result: result["score"], reverse=True)
+
+        return jsonify({
+            "query": query,
+            "results": results,
+            "sources": source_status,
+            "partial": any(status["status"] != "ok" for status in source_status.values()),
+            "degraded": degraded,
+            "took_ms": round((time.monotonic() - started) * 1000, 1)
+        })
+    except Exception as e:
+        # Log the error for debugging
+        print(f"Error searching: {str(e)}")
+        return jsonify({"error": str(e)}), 500
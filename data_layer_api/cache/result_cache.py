@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+"""
+Versioned result cache for search responses
+
+Entries are tagged with the data version they were computed from. Writes that change what a
+search would return bump the version, which invalidates every entry at once without having
+to know which keys a write affects. Entries past their ttl but within stale_ttl are still
+served (stale-while-revalidate) while the caller recomputes them in the background.
+
+The version is per process: a write handled by another worker process is only picked up
+once the entry expires, so ttl bounds how stale a result can be.
+"""
+
+FRESH = "fresh"
+STALE = "stale"
+
+_MISSING = object()
+
+
+class DataVersion:
+    """
+    Thread safe counter bumped by every write that changes cached results
+    """
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def bump(self):
+        with self._lock:
+            self._value += 1
+
+
+# Bumped by course, course review and user writes (see PostgresVectorDB)
+course_data_version = DataVersion()
+
+
+class ResultCache:
+    """
+    Thread safe LRU cache of results that are invalidated when their data version changes.
+
+    Args:
+        maxsize (int): Maximum number of entries, the least recently used is evicted first
+        ttl (float): Seconds an entry is served as fresh
+        stale_ttl (float): Further seconds an expired entry is served while it is refreshed
+        version (DataVersion): Version the entries are checked against
+    """
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float, version: DataVersion):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.version = version
+        self._entries = OrderedDict()  # key -> (version, fresh_until, value)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Tuple[Any, Optional[str]]:
+        """
+        Look up a result computed from the current data version.
+
+        Returns:
+            Tuple[Any, Optional[str]]: The cached value and FRESH or STALE, or (None, None) on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return None, None
+
+            version, fresh_until, value = entry
+            if now >= fresh_until + self.stale_ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None, None
+            if version != self.version.value:
+                # kept for peek() until it expires, but never served as current
+                self.misses += 1
+                return None, None
+
+            self._entries.move_to_end(key)
+            if now < fresh_until:
+                self.hits += 1
+                return value, FRESH
+            self.stale_hits += 1
+            return value, STALE
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the last value cached for key whatever its version, as long as it hasn't fully expired.
+        Used when a result can't be recomputed and an outdated one beats none.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING or now >= entry[1] + self.stale_ttl:
+                return default
+            return entry[2]
+
+    def set(self, key: Hashable, value: Any, version: int) -> int:
+        """
+        Cache value under key. version must be read before the value was computed, so a write
+        that lands while it is being computed invalidates it.
+
+        Returns:
+            int: Number of entries evicted to make room
+        """
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (version, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+        return evicted
+
+    def begin_refresh(self, key: Hashable) -> bool:
+        """
+        Claim the background refresh of a stale key. Returns False if it is already being refreshed.
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key: Hashable):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """
+        Return the entry count and hit/miss counters (e.g. for debugging endpoints)
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries), "maxsize": self.maxsize, "version": self.version.value,
+                "hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses, "evictions": self.evictions,
+            }
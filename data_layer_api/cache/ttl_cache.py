@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+"""
+Small in-process caches shared across request threads
+
+Each process (gunicorn/flask worker) keeps its own copy, so cached values must be safe
+to serve slightly stale and must not be relied on for correctness.
+"""
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread safe LRU cache whose entries also expire ttl seconds after they were set.
+
+    Args:
+        maxsize (int): Maximum number of entries, the least recently used is evicted first
+        ttl (float): Seconds an entry stays valid
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the cached value for key, or default if it is missing or expired
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= now:
+                if entry is not _MISSING:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> int:
+        """
+        Cache value under key, evicting the least recently used entry if the cache is full
+
+        Returns:
+            int: Number of entries evicted to make room
+        """
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                evicted += 1
+            self.evictions += evicted
+        return evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """
+        Return the entry count and hit/miss counters (e.g. for debugging endpoints)
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            }
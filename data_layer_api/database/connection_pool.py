@@ -0,0 +1,116 @@
+import threading
+import time
+import psycopg2
+import psycopg2.pool
+from opentelemetry import metrics
+from env import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+from env import DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT
+from database.index_admin import search_profile_options
+
+"""
+Process-wide Postgres connection pool
+
+psycopg2's ThreadedConnectionPool raises immediately when every connection is
+checked out, so checkouts are gated by a semaphore sized to the pool. Callers
+wait up to DB_POOL_TIMEOUT seconds for a free connection before giving up.
+"""
+
+meter = metrics.get_meter(__name__)
+wait_time_histogram = meter.create_histogram(
+    "db.pool.wait_time",
+    unit="ms",
+    description="Time spent waiting to check out a pooled database connection",
+)
+timeout_counter = meter.create_counter(
+    "db.pool.timeouts",
+    description="Number of connection checkouts that timed out because the pool was exhausted",
+)
+in_use_counter = meter.create_up_down_counter(
+    "db.pool.connections_in_use",
+    description="Number of pooled database connections currently checked out",
+)
+
+
+class PoolTimeoutError(Exception):
+    """
+    Raised when no pooled connection becomes available within the checkout timeout
+    """
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, dsn: str, min_size: int, max_size: int, timeout: float, **connect_kwargs):
+        self.timeout = timeout
+        self.max_size = max_size
+        self._pool = psycopg2.pool.ThreadedConnectionPool(min_size, max_size, dsn, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def getconn(self):
+        """
+        Check out a connection, waiting up to the pool timeout if the pool is exhausted.
+
+        Raises:
+            PoolTimeoutError: If no connection became available in time
+        """
+        start = time.perf_counter()
+        acquired = self._slots.acquire(timeout=self.timeout)
+        wait_ms = (time.perf_counter() - start) * 1000
+        wait_time_histogram.record(wait_ms)
+
+        if not acquired:
+            timeout_counter.add(1)
+            raise PoolTimeoutError(
+                f"Timed out after {self.timeout}s waiting for a database connection "
+                f"(pool size {self.max_size})"
+            )
+
+        try:
+            conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        in_use_counter.add(1)
+        return conn
+
+    def putconn(self, conn):
+        """
+        Return a connection to the pool. Any open transaction is rolled back first
+        so the next borrower starts from a clean state. Broken connections are discarded.
+        """
+        discard = bool(conn.closed)
+        if not discard:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        try:
+            self._pool.putconn(conn, close=discard)
+        finally:
+            in_use_counter.add(-1)
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Return the process-wide connection pool, creating it on first use
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                connection_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+                # the vector search profile is applied as session settings when each connection opens
+                _pool = ConnectionPool(
+                    connection_string, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT,
+                    options=search_profile_options(),
+                )
+    return _pool
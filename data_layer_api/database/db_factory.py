@@ -1,15 +1,38 @@
+from flask import g, has_request_context
 from database.vector_db import VectorDB
 from database.sqlite_vector_db import SQLiteVectorDB
 from database.postgres_vector_db import PostgresVectorDB
+from database.connection_pool import get_pool
 from env import DB_IMPLEMENTATION, DB_PATH
 
 
 def get_vector_db() -> VectorDB:
+    """
+    Return a database handle.
+
+    For postgres, inside a Flask request every call returns the same handle, backed by one
+    pooled connection that is returned to the pool by close_request_vector_db() at teardown.
+    Outside a request (background threads, scripts) each call borrows its own pooled
+    connection, which is returned when the caller closes the handle.
+    """
     if DB_IMPLEMENTATION == "sqlite":
         print("Database Used: " + DB_IMPLEMENTATION)
         return SQLiteVectorDB(DB_PATH)
     elif DB_IMPLEMENTATION == "postgres":
-        print("Database Used: " + DB_IMPLEMENTATION)
-        return PostgresVectorDB()
+        if not has_request_context():
+            return PostgresVectorDB(pool=get_pool())
+
+        if "vector_db" not in g:
+            g.vector_db = PostgresVectorDB(pool=get_pool(), request_scoped=True)
+        return g.vector_db
     else:
-        raise ValueError(f"Unsupported DB_IMPLEMENTATION: {DB_IMPLEMENTATION}")
\ No newline at end of file
+        raise ValueError(f"Unsupported DB_IMPLEMENTATION: {DB_IMPLEMENTATION}")
+
+
+def close_request_vector_db(exception=None):
+    """
+    Teardown hook that returns the request's pooled connection (if one was checked out)
+    """
+    database = g.pop("vector_db", None)
+    if database is not None:
+        database.release()
@@ -0,0 +1,446 @@
+import argparse
+import math
+import threading
+import psycopg2
+from typing import Callable, Dict, List, Optional
+from env import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+from env import HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH, IVFFLAT_PROBES, VECTOR_SEARCH_PROFILE
+from env import EMBEDDING_STORAGE_COURSES, EMBEDDING_STORAGE_DISCUSSIONS, EMBEDDING_STORAGE_REPLIES, MATRYOSHKA_DIMENSIONS
+
+"""
+Vector index management for the courses, discussions and replies tables
+
+Indexes are built and dropped with CONCURRENTLY so reindexing large tables does not
+block writes. Query-time recall/latency settings (hnsw.ef_search, ivfflat.probes) come
+from a named search profile that is applied to every pooled connection when it is opened.
+
+CLI usage:
+
+    python -m database.index_admin list
+    python -m database.index_admin build courses --method ivfflat
+    python -m database.index_admin switch courses hnsw
+    python -m database.index_admin rebuild courses_embedding_hnsw_idx
+    python -m database.index_admin drop courses_embedding_ivfflat_idx
+    python -m database.index_admin compact replies halfvec
+    python -m database.index_admin profile
+"""
+
+VECTOR_TABLES = ("courses", "discussions", "replies")
+INDEX_METHODS = ("hnsw", "ivfflat")
+
+EMBEDDING_DIMENSIONS = 768
+
+# Compact copies of the embedding used for the candidate search in each storage mode.
+# They are generated columns, so adding one backfills every row and later writes keep it in sync.
+COMPACT_STORAGE = {
+    "halfvec": {
+        "column": "embedding_half",
+        "type": f"halfvec({EMBEDDING_DIMENSIONS})",
+        "expression": f"embedding::halfvec({EMBEDDING_DIMENSIONS})",
+    },
+    "binary": {
+        "column": "embedding_bin",
+        "type": f"bit({EMBEDDING_DIMENSIONS})",
+        "expression": f"binary_quantize(embedding)::bit({EMBEDDING_DIMENSIONS})",
+    },
+    # renormalized Matryoshka prefix, computed the same way as embedder.vectors.truncate_embedding
+    "matryoshka": {
+        "column": "embedding_short",
+        "type": f"vector({MATRYOSHKA_DIMENSIONS})",
+        "expression": f"l2_normalize(subvector(embedding, 1, {MATRYOSHKA_DIMENSIONS}))",
+    },
+}
+STORAGE_MODES = ("full",) + tuple(COMPACT_STORAGE)
+
+TABLE_STORAGE_MODES = {
+    "courses": EMBEDDING_STORAGE_COURSES,
+    "discussions": EMBEDDING_STORAGE_DISCUSSIONS,
+    "replies": EMBEDDING_STORAGE_REPLIES,
+}
+
+# Operator class per indexed column. Embeddings are unit vectors, so inner product is used;
+# binary quantized embeddings are compared by hamming distance. Matryoshka prefixes are
+# renormalized, so they are unit vectors too.
+COLUMN_OPCLASSES = {
+    "embedding": "vector_ip_ops",
+    "embedding_half": "halfvec_ip_ops",
+    "embedding_bin": "bit_hamming_ops",
+    "embedding_short": "vector_ip_ops",
+}
+
+# Session settings per profile, trading recall for latency
+SEARCH_PROFILES: Dict[str, Dict[str, int]] = {
+    "fast": {"hnsw.ef_search": 20, "ivfflat.probes": 1},
+    "balanced": {"hnsw.ef_search": HNSW_EF_SEARCH, "ivfflat.probes": IVFFLAT_PROBES},
+    "accurate": {"hnsw.ef_search": 200, "ivfflat.probes": 32},
+}
+
+PROGRESS_POLL_SECONDS = 2.0
+
+
+def get_search_profile(name: str = VECTOR_SEARCH_PROFILE) -> Dict[str, int]:
+    """
+    Return the session settings for a search profile
+    """
+    if name not in SEARCH_PROFILES:
+        raise ValueError(f"Unknown VECTOR_SEARCH_PROFILE: {name} (expected one of {', '.join(SEARCH_PROFILES)})")
+    return SEARCH_PROFILES[name]
+
+
+def get_storage_mode(table: str) -> str:
+    """
+    Return the configured embedding storage mode (full, halfvec, binary or matryoshka) for a table
+    """
+    _check_table(table)
+    mode = TABLE_STORAGE_MODES[table]
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unsupported embedding storage mode for {table}: {mode} (expected one of {', '.join(STORAGE_MODES)})")
+    return mode
+
+
+def add_compact_column(cursor, table: str, mode: str) -> str:
+    """
+    Add the generated compact embedding column for a storage mode (no-op if it exists).
+    This rewrites the table to backfill the column, so it holds a lock on the table
+    while it runs and belongs in a migration or maintenance window.
+
+    Returns:
+        str: The compact column name
+    """
+    _check_table(table)
+    storage = COMPACT_STORAGE[mode]
+    cursor.execute(f"""
+        ALTER TABLE {table}
+        ADD COLUMN IF NOT EXISTS {storage['column']} {storage['type']}
+        GENERATED ALWAYS AS ({storage['expression']}) STORED
+    """)
+    return storage["column"]
+
+
+def search_profile_options(name: str = VECTOR_SEARCH_PROFILE) -> str:
+    """
+    Return the profile as a libpq `options` string, so the settings are applied when a
+    connection is opened instead of costing a round trip per request
+    """
+    return " ".join(f"-c {setting}={value}" for setting, value in get_search_profile(name).items())
+
+
+def apply_search_profile(conn, name: str = VECTOR_SEARCH_PROFILE):
+    """
+    Apply a search profile to an already open connection for the rest of its session
+    """
+    with conn.cursor() as cursor:
+        for setting, value in get_search_profile(name).items():
+            cursor.execute("SELECT set_config(%s, %s, false)", [setting, str(value)])
+    conn.commit()
+
+
+def index_name(table: str, method: str, column: str = "embedding") -> str:
+    return f"{table}_{column}_{method}_idx"
+
+
+def ivfflat_lists(row_count: int) -> int:
+    """
+    Number of IVFFlat lists for a table size, following the pgvector guidance of
+    rows / 1000 up to 1M rows and sqrt(rows) beyond that
+    """
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def _check_table(table: str):
+    if table not in VECTOR_TABLES:
+        raise ValueError(f"Unsupported table: {table} (expected one of {', '.join(VECTOR_TABLES)})")
+
+
+def list_vector_indexes(conn, tables=VECTOR_TABLES) -> List[Dict]:
+    """
+    List the HNSW and IVFFlat indexes on the given tables with their size and validity.
+
+    Returns:
+        List[Dict]: One entry per index
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT
+                t.relname AS table_name,
+                i.relname AS index_name,
+                am.amname AS method,
+                ix.indisvalid AS is_valid,
+                pg_relation_size(i.oid) AS size_bytes,
+                pg_size_pretty(pg_relation_size(i.oid)) AS size,
+                pg_get_indexdef(i.oid) AS definition
+            FROM
+                pg_index ix
+            JOIN
+                pg_class i ON i.oid = ix.indexrelid
+            JOIN
+                pg_class t ON t.oid = ix.indrelid
+            JOIN
+                pg_am am ON am.oid = i.relam
+            WHERE
+                t.relname = ANY(%s) AND am.amname IN ('hnsw', 'ivfflat')
+            ORDER BY
+                t.relname, i.relname
+        """, [list(tables)])
+
+        columns = [desc[0] for desc in cursor.description]
+        indexes = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    conn.rollback()
+    return indexes
+
+
+def missing_compact_columns(conn, tables=VECTOR_TABLES) -> List[Dict]:
+    """
+    List the tables whose configured storage mode searches a compact column that doesn't
+    exist, e.g. because EMBEDDING_STORAGE_* was changed after migration 0004/0005 ran.
+
+    Returns:
+        List[Dict]: One entry (table, mode, column) per missing column
+    """
+    expected = {}
+    for table in tables:
+        mode = get_storage_mode(table)
+        if mode != "full":
+            expected[(table, COMPACT_STORAGE[mode]["column"])] = mode
+    if not expected:
+        return []
+
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT table_name, column_name
+            FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = ANY(%s) AND column_name = ANY(%s)
+        """, [list({table for table, _ in expected}), list({column for _, column in expected})])
+        existing = set(cursor.fetchall())
+    conn.rollback()
+
+    return [
+        {"table": table, "mode": mode, "column": column}
+        for (table, column), mode in expected.items()
+        if (table, column) not in existing
+    ]
+
+
+def _row_count(conn, table: str) -> int:
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        count = cursor.fetchone()[0]
+    conn.rollback()
+    return count
+
+
+def _watch_build_progress(monitor_conn, pid: int, stop: threading.Event, report: Callable[[str], None]):
+    """
+    Poll pg_stat_progress_create_index for the backend building the index until stopped
+    """
+    while not stop.wait(PROGRESS_POLL_SECONDS):
+        with monitor_conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total
+                FROM pg_stat_progress_create_index
+                WHERE pid = %s
+            """, [pid])
+            row = cursor.fetchone()
+        monitor_conn.rollback()
+
+        if row is None:
+            continue
+        phase, blocks_done, blocks_total, tuples_done, tuples_total = row
+        if tuples_total:
+            report(f"{phase}: {tuples_done}/{tuples_total} tuples ({100 * tuples_done / tuples_total:.1f}%)")
+        elif blocks_total:
+            report(f"{phase}: {blocks_done}/{blocks_total} blocks ({100 * blocks_done / blocks_total:.1f}%)")
+        else:
+            report(f"{phase}: {tuples_done} tuples")
+
+
+def _run_concurrently(conn, statement: str, params=None, monitor_conn=None, report: Callable[[str], None] = print):
+    """
+    Run a CONCURRENTLY statement (which cannot run inside a transaction), reporting
+    progress from monitor_conn while it runs
+    """
+    previous_autocommit = conn.autocommit
+    conn.rollback()
+    conn.autocommit = True
+
+    stop = threading.Event()
+    watcher = None
+    if monitor_conn is not None:
+        watcher = threading.Thread(
+            target=_watch_build_progress,
+            args=(monitor_conn, conn.get_backend_pid(), stop, report),
+            daemon=True,
+        )
+        watcher.start()
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(statement, params)
+    finally:
+        stop.set()
+        if watcher is not None:
+            watcher.join()
+        conn.autocommit = previous_autocommit
+
+
+def drop_index(conn, name: str):
+    """
+    Drop an index without blocking writes to its table
+    """
+    _run_concurrently(conn, f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def build_index(
+    conn,
+    table: str,
+    method: str = "hnsw",
+    column: str = "embedding",
+    m: int = HNSW_M,
+    ef_construction: int = HNSW_EF_CONSTRUCTION,
+    lists: Optional[int] = None,
+    monitor_conn=None,
+    report: Callable[[str], None] = print,
+) -> Dict:
+    """
+    Build a vector index with CREATE INDEX CONCURRENTLY.
+
+    Args:
+        conn: Connection used for the build (switched to autocommit for the duration)
+        table (str): One of courses, discussions or replies
+        method (str): hnsw or ivfflat
+        column (str): Vector column to index
+        m (int): HNSW max connections per node
+        ef_construction (int): HNSW build-time candidate list size
+        lists (int, optional): IVFFlat list count, sized from the row count when omitted
+        monitor_conn (optional): Second connection used to report build progress
+        report (Callable): Receives progress messages
+
+    Returns:
+        Dict: The built index as returned by list_vector_indexes
+    """
+    _check_table(table)
+    if method not in INDEX_METHODS:
+        raise ValueError(f"Unsupported index method: {method} (expected one of {', '.join(INDEX_METHODS)})")
+    opclass = COLUMN_OPCLASSES[column]
+    name = index_name(table, method, column)
+
+    # A failed concurrent build leaves an invalid index behind that IF NOT EXISTS would keep
+    for existing in list_vector_indexes(conn, [table]):
+        if existing["index_name"] == name and not existing["is_valid"]:
+            report(f"Dropping invalid index {name} left by a failed build")
+            drop_index(conn, name)
+
+    if method == "hnsw":
+        options = "m = %s, ef_construction = %s"
+        params = [m, ef_construction]
+    else:
+        if lists is None:
+            lists = ivfflat_lists(_row_count(conn, table))
+        options = "lists = %s"
+        params = [lists]
+
+    report(f"Building {name} ({method}, {options % tuple(params)})")
+    _run_concurrently(
+        conn,
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} USING {method} ({column} {opclass}) WITH ({options})",
+        params,
+        monitor_conn=monitor_conn,
+        report=report,
+    )
+
+    built = next(index for index in list_vector_indexes(conn, [table]) if index["index_name"] == name)
+    report(f"Built {name}: {built['size']}")
+    return built
+
+
+def rebuild_index(conn, name: str, monitor_conn=None, report: Callable[[str], None] = print):
+    """
+    Rebuild an existing index with REINDEX CONCURRENTLY (e.g. after bulk loads degrade an IVFFlat index)
+    """
+    report(f"Rebuilding {name}")
+    _run_concurrently(conn, f"REINDEX INDEX CONCURRENTLY {name}", monitor_conn=monitor_conn, report=report)
+
+
+def switch_index_method(conn, table: str, method: str, column: str = "embedding", monitor_conn=None, report: Callable[[str], None] = print, **build_options) -> Dict:
+    """
+    Switch a column between HNSW and IVFFlat. The new index is built before the old one
+    is dropped so searches keep an index throughout.
+    """
+    built = build_index(conn, table, method, column, monitor_conn=monitor_conn, report=report, **build_options)
+    for existing in list_vector_indexes(conn, [table]):
+        other_method_name = index_name(table, existing["method"], column)
+        if existing["method"] != method and existing["index_name"] == other_method_name:
+            report(f"Dropping {existing['index_name']}")
+            drop_index(conn, existing["index_name"])
+    return built
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage vector indexes on courses, discussions and replies")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("list", help="List vector indexes and their sizes")
+
+    build_parser = subparsers.add_parser("build", help="Build a vector index concurrently")
+    build_parser.add_argument("table", choices=VECTOR_TABLES)
+    build_parser.add_argument("--method", choices=INDEX_METHODS, default="hnsw")
+    build_parser.add_argument("--column", choices=list(COLUMN_OPCLASSES), default="embedding")
+    build_parser.add_argument("--m", type=int, default=HNSW_M)
+    build_parser.add_argument("--ef-construction", type=int, default=HNSW_EF_CONSTRUCTION)
+    build_parser.add_argument("--lists", type=int, default=None)
+
+    switch_parser = subparsers.add_parser("switch", help="Replace a table's vector index with another method")
+    switch_parser.add_argument("table", choices=VECTOR_TABLES)
+    switch_parser.add_argument("method", choices=INDEX_METHODS)
+    switch_parser.add_argument("--column", choices=list(COLUMN_OPCLASSES), default="embedding")
+
+    rebuild_parser = subparsers.add_parser("rebuild", help="Rebuild an index concurrently")
+    rebuild_parser.add_argument("index_name")
+
+    drop_parser = subparsers.add_parser("drop", help="Drop an index concurrently")
+    drop_parser.add_argument("index_name")
+
+    compact_parser = subparsers.add_parser("compact", help="Add a compact embedding column and build its index")
+    compact_parser.add_argument("table", choices=VECTOR_TABLES)
+    compact_parser.add_argument("mode", choices=list(COMPACT_STORAGE))
+
+    subparsers.add_parser("profile", help="Show the active search profile")
+
+    args = parser.parse_args()
+
+    connection_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    conn = psycopg2.connect(connection_string)
+    monitor_conn = psycopg2.connect(connection_string)
+    try:
+        if args.command == "list":
+            for index in list_vector_indexes(conn):
+                status = "" if index["is_valid"] else " (INVALID)"
+                print(f"{index['table_name']}.{index['index_name']} [{index['method']}] {index['size']}{status}")
+                print(f"    {index['definition']}")
+        elif args.command == "build":
+            build_index(conn, args.table, args.method, args.column, m=args.m, ef_construction=args.ef_construction, lists=args.lists, monitor_conn=monitor_conn)
+        elif args.command == "switch":
+            switch_index_method(conn, args.table, args.method, args.column, monitor_conn=monitor_conn)
+        elif args.command == "rebuild":
+            rebuild_index(conn, args.index_name, monitor_conn=monitor_conn)
+        elif args.command == "drop":
+            drop_index(conn, args.index_name)
+        elif args.command == "compact":
+            with conn.cursor() as cursor:
+                column = add_compact_column(cursor, args.table, args.mode)
+            conn.commit()
+            build_index(conn, args.table, "hnsw", column, monitor_conn=monitor_conn)
+            print(f"Set EMBEDDING_STORAGE_{args.table.upper()}={args.mode} to search {column}")
+        elif args.command == "profile":
+            print(f"Active profile: {VECTOR_SEARCH_PROFILE}")
+            for setting, value in get_search_profile().items():
+                print(f"    {setting} = {value}")
+    finally:
+        monitor_conn.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
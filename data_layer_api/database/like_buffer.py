@@ -0,0 +1,147 @@
+import atexit
+import threading
+import psycopg2
+from typing import Optional, Tuple
+from database.db_factory import get_vector_db
+from env import DB_IMPLEMENTATION, LIKE_WRITE_BEHIND_ENABLED, LIKE_WRITE_BEHIND_FLUSH_MS, LIKE_WRITE_BEHIND_MAX_PENDING
+
+"""
+Write-behind buffer for likes and unlikes
+
+With LIKE_WRITE_BEHIND_ENABLED, like routes queue the mutation here and return right away.
+A background thread writes everything queued every LIKE_WRITE_BEHIND_FLUSH_MS in one
+transaction (PostgresVectorDB.apply_like_mutations). Repeated likes and unlikes of the same
+object by the same user are coalesced, only the last one is written. Queued mutations are
+flushed at interpreter exit but lost if the process is killed, and likes on objects or by
+users that don't exist are dropped when flushed. A batch rejected because of one of its
+rows is written one mutation at a time instead, dropping the ones that fail for good.
+"""
+
+# Errors caused by the mutation itself (e.g. a foreign key or malformed value), retrying won't help
+PERMANENT_ERRORS = (psycopg2.IntegrityError, psycopg2.DataError)
+
+_like_buffer = None
+_like_buffer_lock = threading.Lock()
+
+
+class LikeWriteBuffer:
+    """
+    Args:
+        flush_ms (float): Milliseconds between flushes
+        max_pending (int): Queued mutations after which new ones are refused (and written directly by the caller)
+    """
+    def __init__(self, flush_ms: float = LIKE_WRITE_BEHIND_FLUSH_MS, max_pending: int = LIKE_WRITE_BEHIND_MAX_PENDING):
+        self.flush_seconds = flush_ms / 1000
+        self.max_pending = max_pending
+        self._pending = {}  # (user_id, object_id, object_type) -> True to like, False to unlike
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def like(self, user_id, object_id, object_type: str) -> bool:
+        """
+        Queue a like. Returns False if the buffer is full and the like was not queued.
+        """
+        return self._record((str(user_id), str(object_id), object_type), True)
+
+    def unlike(self, user_id, object_id, object_type: str) -> bool:
+        """
+        Queue an unlike. Returns False if the buffer is full and the unlike was not queued.
+        """
+        return self._record((str(user_id), str(object_id), object_type), False)
+
+    def _record(self, key: tuple, liked: bool) -> bool:
+        with self._lock:
+            if key not in self._pending and len(self._pending) >= self.max_pending:
+                return False
+            self._pending[key] = liked
+            return True
+
+    def flush(self) -> Tuple[int, int]:
+        """
+        Write every queued mutation in one transaction. If a row makes the batch fail for good
+        the mutations are written one by one and the failing ones dropped. On other failures
+        (e.g. the database is unavailable) the unwritten mutations are queued again, unless a
+        newer mutation of the same like was queued in the meantime.
+
+        Returns:
+            Tuple[int, int]: Number of likes inserted and deleted
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0, 0
+
+            remaining = dict(batch)
+            database = get_vector_db()
+            try:
+                try:
+                    likes = [key for key, liked in batch.items() if liked]
+                    unlikes = [key for key, liked in batch.items() if not liked]
+                    return database.apply_like_mutations(likes, unlikes)
+                except PERMANENT_ERRORS as e:
+                    print(f"Buffered like batch rejected, writing its {len(batch)} mutations one by one: {str(e)}")
+                    return self._apply_one_by_one(database, remaining)
+            except Exception:
+                with self._lock:
+                    for key, liked in remaining.items():
+                        self._pending.setdefault(key, liked)
+                raise
+            finally:
+                database.close()
+
+    def _apply_one_by_one(self, database, remaining: dict) -> Tuple[int, int]:
+        """
+        Write each mutation in its own transaction, removing it from remaining once it is
+        written or dropped, so a failure part way only re-queues the unwritten ones
+        """
+        inserted = deleted = 0
+        for key, liked in list(remaining.items()):
+            try:
+                added, removed = database.apply_like_mutations([key] if liked else [], [] if liked else [key])
+                inserted += added
+                deleted += removed
+            except PERMANENT_ERRORS as e:
+                print(f"Dropping buffered {'like' if liked else 'unlike'} {key}: {str(e)}")
+            del remaining[key]
+        return inserted, deleted
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="like-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        try:
+            self.flush()
+        except Exception as e:
+            # runs at interpreter exit, nothing is left to retry the mutations
+            print(f"Error flushing buffered likes on shutdown, {len(self._pending)} mutation(s) lost: {str(e)}")
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                # e.g. the database is unavailable, the mutations are retried on the next flush
+                print(f"Error flushing buffered likes: {str(e)}")
+
+
+def get_like_buffer() -> Optional[LikeWriteBuffer]:
+    """
+    Return the process-wide like buffer, started on first use, or None when write-behind
+    is disabled (LIKE_WRITE_BEHIND_ENABLED=false or a non-postgres DB_IMPLEMENTATION)
+    """
+    global _like_buffer
+    if not LIKE_WRITE_BEHIND_ENABLED or DB_IMPLEMENTATION != "postgres":
+        return None
+    with _like_buffer_lock:
+        if _like_buffer is None:
+            _like_buffer = LikeWriteBuffer()
+            _like_buffer.start()
+    return _like_buffer
@@ -0,0 +1,152 @@
+import importlib.util
+import os
+import re
+import psycopg2
+from typing import List, NamedTuple
+from env import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+
+"""
+Versioned schema migrations for the Postgres database
+
+Migrations live in database/migrations/ as NNNN_description.sql and are applied in
+order, each in its own transaction, recording the applied version in schema_version.
+Migrations that depend on configuration (e.g. index parameters) are written as
+NNNN_description.py modules exposing upgrade(cursor).
+Run once per deploy (before the API starts serving) with:
+
+    python -m database.migrate
+"""
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.(sql|py)$")
+
+# Arbitrary key so concurrent deploys don't apply the same migration twice
+MIGRATION_LOCK_ID = 7_150_421
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    path: str
+
+
+class SchemaVersionError(RuntimeError):
+    """
+    Raised when the database schema is older than the migrations shipped with this code,
+    or lacks the compact embedding columns the configured storage modes search
+    """
+    pass
+
+
+def list_migrations() -> List[Migration]:
+    """
+    Return every migration in the migrations directory, ordered by version
+    """
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE_PATTERN.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return migrations
+
+
+def latest_version() -> int:
+    """
+    Return the schema version this code expects (the highest migration version)
+    """
+    migrations = list_migrations()
+    return migrations[-1].version if migrations else 0
+
+
+def get_schema_version(conn) -> int:
+    """
+    Return the highest applied migration version, or 0 if migrations were never run
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('schema_version')")
+        if cursor.fetchone()[0] is None:
+            return 0
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return cursor.fetchone()[0]
+
+
+def apply_migration(cursor, migration: Migration):
+    """
+    Run a single migration's statements on the given cursor (without committing)
+    """
+    if migration.path.endswith(".py"):
+        spec = importlib.util.spec_from_file_location(f"migration_{migration.version:04d}", migration.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(cursor)
+    else:
+        with open(migration.path) as file:
+            cursor.execute(file.read())
+
+
+def migrate(conn) -> List[Migration]:
+    """
+    Apply every pending migration in order.
+
+    Args:
+        conn: An open psycopg2 connection
+
+    Returns:
+        List[Migration]: The migrations that were applied
+    """
+    applied = []
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", [MIGRATION_LOCK_ID])
+        conn.commit()
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.commit()
+
+        current_version = get_schema_version(conn)
+        for migration in list_migrations():
+            if migration.version <= current_version:
+                continue
+
+            print(f"Applying migration {migration.version:04d}_{migration.name}")
+            try:
+                with conn.cursor() as cursor:
+                    apply_migration(cursor, migration)
+                    cursor.execute(
+                        "INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                        [migration.version, migration.name]
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+            applied.append(migration)
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [MIGRATION_LOCK_ID])
+        conn.commit()
+
+    return applied
+
+
+if __name__ == "__main__":
+    connection_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    connection = psycopg2.connect(connection_string)
+    try:
+        applied_migrations = migrate(connection)
+        print(f"Applied {len(applied_migrations)} migration(s), schema is at version {get_schema_version(connection)}")
+    finally:
+        connection.close()
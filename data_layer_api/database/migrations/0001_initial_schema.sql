@@ -0,0 +1,85 @@
+-- Initial schema: users, courses, reviews, discussions, replies and likes
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- Users Table
+CREATE TABLE IF NOT EXISTS users (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    password TEXT NOT NULL,
+    salt TEXT NOT NULL
+);
+
+-- Courses Table
+CREATE TABLE IF NOT EXISTS courses (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    title TEXT NOT NULL,
+    description TEXT, --nullable
+    platform TEXT NOT NULL CHECK (platform IN ('coursera', 'udemy')),
+    url TEXT NOT NULL,
+    authors TEXT[] NOT NULL,
+    skills TEXT[] NOT NULL,
+    -- skills and author data is inconsistent across platforms
+    -- so we store them in arrays instead of relational tables
+    rating DECIMAL(3,2) DEFAULT 0,
+    num_ratings INT DEFAULT 0,
+    image_url TEXT NOT NULL,
+    is_free BOOLEAN DEFAULT FALSE,
+    embedding vector(768) NOT NULL, -- Added vector embedding
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- urls are resource locators for courses on their respective platforms
+    -- urls by nature should uniquely identify a course
+    UNIQUE (platform, url)
+);
+
+-- User review table
+CREATE TABLE IF NOT EXISTS course_reviews (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    course_id UUID NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    rating INT CHECK (rating >= 0 AND rating <= 5) NOT NULL,
+    description TEXT, -- Optional review text
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, course_id) -- Ensures a user can only review a course once
+);
+
+-- Discussions Table
+CREATE TABLE IF NOT EXISTS discussions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    embedding vector(768) NOT NULL, -- Added vector embedding
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Course Discussions Join Table (new)
+CREATE TABLE IF NOT EXISTS course_discussions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    course_id UUID NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    discussion_id UUID NOT NULL REFERENCES discussions(id) ON DELETE CASCADE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (course_id, discussion_id) -- Prevent duplicates
+);
+
+-- Replies Table
+CREATE TABLE IF NOT EXISTS replies (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    discussion_id UUID NOT NULL REFERENCES discussions(id) ON DELETE CASCADE,
+    parent_reply_id UUID REFERENCES replies(id) ON DELETE CASCADE,
+    text TEXT NOT NULL,
+    embedding vector(768) NOT NULL, -- Added vector embedding
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Likes Table (tracks likes on multiple objects)
+CREATE TABLE IF NOT EXISTS likes (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    object_id UUID NOT NULL,
+    object_type TEXT NOT NULL CHECK (object_type IN ('discussion', 'reply')),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, object_id, object_type)
+);
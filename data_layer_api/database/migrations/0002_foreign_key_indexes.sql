@@ -0,0 +1,14 @@
+-- Indexes for foreign keys and lookups that previously required sequential scans
+
+-- get_replies_by_discussion, reply counts and ON DELETE CASCADE from discussions
+CREATE INDEX IF NOT EXISTS replies_discussion_id_idx ON replies (discussion_id);
+
+-- get_course_reviews, review aggregates and ON DELETE CASCADE from courses
+CREATE INDEX IF NOT EXISTS course_reviews_course_id_idx ON course_reviews (course_id);
+
+-- get_courses_for_discussion and ON DELETE CASCADE from discussions
+-- (the UNIQUE (course_id, discussion_id) index only serves lookups by course)
+CREATE INDEX IF NOT EXISTS course_discussions_discussion_id_idx ON course_discussions (discussion_id);
+
+-- get_like_count (the UNIQUE (user_id, object_id, object_type) index leads with user_id)
+CREATE INDEX IF NOT EXISTS likes_object_idx ON likes (object_id, object_type);
@@ -0,0 +1,18 @@
+from env import HNSW_M, HNSW_EF_CONSTRUCTION
+
+"""
+Store unit-normalized embeddings and add an HNSW index on courses.embedding
+
+With unit vectors inner product equals cosine similarity, so searches order by
+the inner product operator (<#>) and the index uses vector_ip_ops.
+"""
+
+def upgrade(cursor):
+    for table in ("courses", "discussions", "replies"):
+        cursor.execute(f"UPDATE {table} SET embedding = l2_normalize(embedding)")
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS courses_embedding_hnsw_idx
+        ON courses USING hnsw (embedding vector_ip_ops)
+        WITH (m = %s, ef_construction = %s)
+    """, [HNSW_M, HNSW_EF_CONSTRUCTION])
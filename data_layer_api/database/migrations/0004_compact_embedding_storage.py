@@ -0,0 +1,20 @@
+from database.index_admin import VECTOR_TABLES, add_compact_column, get_storage_mode, index_name, COLUMN_OPCLASSES
+from env import HNSW_M, HNSW_EF_CONSTRUCTION
+
+"""
+Add and backfill the compact embedding column for every table configured with a
+halfvec or binary storage mode, with an HNSW index for the candidate search
+"""
+
+def upgrade(cursor):
+    for table in VECTOR_TABLES:
+        mode = get_storage_mode(table)
+        if mode == "full":
+            continue
+
+        column = add_compact_column(cursor, table, mode)
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS {index_name(table, 'hnsw', column)}
+            ON {table} USING hnsw ({column} {COLUMN_OPCLASSES[column]})
+            WITH (m = %s, ef_construction = %s)
+        """, [HNSW_M, HNSW_EF_CONSTRUCTION])
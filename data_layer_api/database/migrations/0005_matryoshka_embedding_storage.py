@@ -0,0 +1,20 @@
+from database.index_admin import VECTOR_TABLES, add_compact_column, get_storage_mode, index_name, COLUMN_OPCLASSES
+from env import HNSW_M, HNSW_EF_CONSTRUCTION
+
+"""
+Add and backfill the truncated Matryoshka embedding column (MATRYOSHKA_DIMENSIONS long)
+for every table configured with the matryoshka storage mode, with an HNSW index for the
+first search stage
+"""
+
+def upgrade(cursor):
+    for table in VECTOR_TABLES:
+        if get_storage_mode(table) != "matryoshka":
+            continue
+
+        column = add_compact_column(cursor, table, "matryoshka")
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS {index_name(table, 'hnsw', column)}
+            ON {table} USING hnsw ({column} {COLUMN_OPCLASSES[column]})
+            WITH (m = %s, ef_construction = %s)
+        """, [HNSW_M, HNSW_EF_CONSTRUCTION])
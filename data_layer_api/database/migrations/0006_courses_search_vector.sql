@@ -0,0 +1,17 @@
+-- Full-text search over courses for lexical and hybrid search.
+-- array_to_string is only STABLE, so generated columns can't call it directly.
+-- Wrapping it is safe here because it is only ever applied to TEXT[].
+CREATE OR REPLACE FUNCTION immutable_array_to_string(arr TEXT[], sep TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$ SELECT array_to_string(arr, sep) $$;
+
+-- Title matches weigh most, then skills and authors, then the description
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(immutable_array_to_string(skills, ' '), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(immutable_array_to_string(authors, ' '), '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'C')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS courses_search_vector_idx ON courses USING gin (search_vector);
@@ -0,0 +1,5 @@
+-- Trigram index for course title autocomplete (/course/suggest).
+-- Serves both anchored (title ILIKE 'pre%') and word start (title ILIKE '% pre%') patterns.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS courses_title_trgm_idx ON courses USING gin (title gin_trgm_ops);
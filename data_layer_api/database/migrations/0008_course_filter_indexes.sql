@@ -0,0 +1,14 @@
+-- Indexes for course search filters (platform, is_free, min_rating, skills).
+-- Selective filters are resolved through these before an exact vector scan of the matching rows.
+
+-- platform = ANY(...) with an optional minimum rating
+CREATE INDEX IF NOT EXISTS courses_platform_rating_idx ON courses (platform, rating);
+
+-- min_rating on its own
+CREATE INDEX IF NOT EXISTS courses_rating_idx ON courses (rating);
+
+-- is_free = true (free courses are the minority)
+CREATE INDEX IF NOT EXISTS courses_free_rating_idx ON courses (rating) WHERE is_free;
+
+-- skills && ARRAY[...]
+CREATE INDEX IF NOT EXISTS courses_skills_idx ON courses USING gin (skills);
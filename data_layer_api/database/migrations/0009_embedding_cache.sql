@@ -0,0 +1,8 @@
+-- Persistent embedding store keyed by sha256(model + input text), so re-ingesting
+-- unchanged courses, discussions or replies never asks the model again.
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    content_hash TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    embedding vector(768) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
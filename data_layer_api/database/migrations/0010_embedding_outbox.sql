@@ -0,0 +1,19 @@
+-- Asynchronous embedding of discussions and replies.
+-- Writes commit with a NULL (pending) embedding and an outbox row. A background worker
+-- embeds pending rows in batches and deletes their outbox rows (see embedder/outbox_worker.py).
+ALTER TABLE discussions ALTER COLUMN embedding DROP NOT NULL;
+ALTER TABLE replies ALTER COLUMN embedding DROP NOT NULL;
+
+CREATE TABLE IF NOT EXISTS embedding_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    object_type TEXT NOT NULL CHECK (object_type IN ('discussion', 'reply')),
+    object_id UUID NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    last_error TEXT,
+    -- claimed jobs are leased by pushing this forward, failed jobs are retried with backoff
+    available_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (object_type, object_id)
+);
+
+CREATE INDEX IF NOT EXISTS embedding_outbox_available_at_idx ON embedding_outbox (available_at);
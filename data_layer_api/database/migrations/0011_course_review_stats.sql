@@ -0,0 +1,55 @@
+-- Per-course review aggregates, maintained incrementally by every course_reviews write
+-- (see PostgresVectorDB.review_stats_upsert_sql) so searches and review pages don't
+-- re-aggregate course_reviews. Ratings are 0-5, so a count per rating keeps min and max
+-- exact when reviews are updated or deleted.
+CREATE TABLE IF NOT EXISTS course_review_stats (
+    course_id UUID PRIMARY KEY REFERENCES courses(id) ON DELETE CASCADE,
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    ratings_0 INT NOT NULL DEFAULT 0,
+    ratings_1 INT NOT NULL DEFAULT 0,
+    ratings_2 INT NOT NULL DEFAULT 0,
+    ratings_3 INT NOT NULL DEFAULT 0,
+    ratings_4 INT NOT NULL DEFAULT 0,
+    ratings_5 INT NOT NULL DEFAULT 0,
+    avg_rating NUMERIC GENERATED ALWAYS AS (
+        CASE WHEN review_count > 0 THEN rating_sum::numeric / review_count END
+    ) STORED,
+    min_rating INT GENERATED ALWAYS AS (
+        CASE
+            WHEN ratings_0 > 0 THEN 0
+            WHEN ratings_1 > 0 THEN 1
+            WHEN ratings_2 > 0 THEN 2
+            WHEN ratings_3 > 0 THEN 3
+            WHEN ratings_4 > 0 THEN 4
+            WHEN ratings_5 > 0 THEN 5
+        END
+    ) STORED,
+    max_rating INT GENERATED ALWAYS AS (
+        CASE
+            WHEN ratings_5 > 0 THEN 5
+            WHEN ratings_4 > 0 THEN 4
+            WHEN ratings_3 > 0 THEN 3
+            WHEN ratings_2 > 0 THEN 2
+            WHEN ratings_1 > 0 THEN 1
+            WHEN ratings_0 > 0 THEN 0
+        END
+    ) STORED
+);
+
+-- Backfill from the existing reviews
+INSERT INTO course_review_stats (
+    course_id, review_count, rating_sum,
+    ratings_0, ratings_1, ratings_2, ratings_3, ratings_4, ratings_5
+)
+SELECT
+    course_id, COUNT(*), SUM(rating),
+    COUNT(*) FILTER (WHERE rating = 0),
+    COUNT(*) FILTER (WHERE rating = 1),
+    COUNT(*) FILTER (WHERE rating = 2),
+    COUNT(*) FILTER (WHERE rating = 3),
+    COUNT(*) FILTER (WHERE rating = 4),
+    COUNT(*) FILTER (WHERE rating = 5)
+FROM course_reviews
+GROUP BY course_id
+ON CONFLICT (course_id) DO NOTHING;
@@ -0,0 +1,45 @@
+-- Denormalized reply and like counters, so discussion lists and threads don't count
+-- replies and likes on every read. insert_reply, insert_reply_to_reply, insert_like and
+-- delete_like update them in the same statement as the row they add or remove.
+-- Deletes that cascade (users, parent replies) are repaired by:
+--     python -m database.reconcile_counters
+ALTER TABLE discussions ADD COLUMN IF NOT EXISTS reply_count INT NOT NULL DEFAULT 0;
+ALTER TABLE discussions ADD COLUMN IF NOT EXISTS like_count INT NOT NULL DEFAULT 0;
+-- direct replies to the reply
+ALTER TABLE replies ADD COLUMN IF NOT EXISTS reply_count INT NOT NULL DEFAULT 0;
+ALTER TABLE replies ADD COLUMN IF NOT EXISTS like_count INT NOT NULL DEFAULT 0;
+
+-- Backfill from the existing replies and likes
+UPDATE discussions d
+SET reply_count = counts.reply_count
+FROM (
+    SELECT discussion_id, COUNT(*) AS reply_count FROM replies GROUP BY discussion_id
+) counts
+WHERE d.id = counts.discussion_id;
+
+UPDATE replies r
+SET reply_count = counts.reply_count
+FROM (
+    SELECT parent_reply_id, COUNT(*) AS reply_count FROM replies
+    WHERE parent_reply_id IS NOT NULL
+    GROUP BY parent_reply_id
+) counts
+WHERE r.id = counts.parent_reply_id;
+
+UPDATE discussions d
+SET like_count = counts.like_count
+FROM (
+    SELECT object_id, COUNT(*) AS like_count FROM likes
+    WHERE object_type = 'discussion'
+    GROUP BY object_id
+) counts
+WHERE d.id = counts.object_id;
+
+UPDATE replies r
+SET like_count = counts.like_count
+FROM (
+    SELECT object_id, COUNT(*) AS like_count FROM likes
+    WHERE object_type = 'reply'
+    GROUP BY object_id
+) counts
+WHERE r.id = counts.object_id;
@@ -0,0 +1,6 @@
+-- The initial schema only allowed likes on discussions and replies, so liking a course
+-- (see get_liked_courses_by_user) failed the CHECK constraint.
+-- Learning journeys have no table yet, so they can't be liked.
+ALTER TABLE likes DROP CONSTRAINT IF EXISTS likes_object_type_check;
+ALTER TABLE likes ADD CONSTRAINT likes_object_type_check
+    CHECK (object_type IN ('course', 'discussion', 'reply'));
@@ -0,0 +1,13 @@
+-- Indexes in the order the paginated lists read, so a page (by LIMIT/OFFSET or by cursor)
+-- stops after its rows instead of sorting every review or reply of the course or discussion.
+-- They replace the single-column foreign key indexes from 0002.
+
+-- get_course_reviews: newest first
+CREATE INDEX IF NOT EXISTS course_reviews_course_created_idx
+    ON course_reviews (course_id, created_at DESC, id DESC);
+DROP INDEX IF EXISTS course_reviews_course_id_idx;
+
+-- get_replies_by_discussion: oldest first
+CREATE INDEX IF NOT EXISTS replies_discussion_created_idx
+    ON replies (discussion_id, created_at, id);
+DROP INDEX IF EXISTS replies_discussion_id_idx;
@@ -0,0 +1,51 @@
+import base64
+import json
+from typing import Optional, Tuple
+
+"""
+Keyset pagination cursors for lists ordered by (created_at, id)
+
+A cursor is the position of the last row of a page. The next page is the rows after it
+in the list's order, so deep pages cost the same as the first one (unlike OFFSET) and
+rows inserted in the meantime don't shift the page boundaries.
+"""
+
+
+def encode_cursor(created_at: str, row_id: str) -> str:
+    """
+    Return an opaque cursor pointing after the row with this created_at (ISO format) and id
+    """
+    payload = json.dumps([created_at, row_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Return the (created_at, id) position encoded in a cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor}") from e
+    return str(created_at), str(row_id)
+
+
+def page_info(rows: list, total: int, limit: Optional[int], offset: Optional[int]) -> dict:
+    """
+    Build the pagination object of a page of rows (dicts with created_at and id).
+    next_cursor is set when the page is full, so there may be more rows after it.
+    """
+    pagination = {
+        "total": total,
+        "returned": len(rows),
+    }
+    if limit is not None:
+        pagination["limit"] = limit
+        if rows and len(rows) == limit:
+            pagination["next_cursor"] = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    if offset is not None:
+        pagination["offset"] = offset
+    return pagination
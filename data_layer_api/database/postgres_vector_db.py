@@ -1,9 +1,16 @@
 import psycopg2
 import psycopg2.extras
 psycopg2.extras.register_uuid()
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from database.vector_db import VectorDB
-from env import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+from database.connection_pool import ConnectionPool
+from database.migrate import get_schema_version, latest_version, SchemaVersionError
+from database.index_admin import get_search_profile, search_profile_options, get_storage_mode, missing_compact_columns, EMBEDDING_DIMENSIONS
+from env import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME, RERANK_CANDIDATE_FACTOR, MATRYOSHKA_DIMENSIONS
+from env import HYBRID_RRF_K, HYBRID_VECTOR_WEIGHT, HYBRID_LEXICAL_WEIGHT, FILTER_PREFILTER_MAX_ROWS
+from embedder.vectors import l2_normalize, truncate_embedding
+from cache.result_cache import course_data_version
+from database.pagination import decode_cursor, page_info
 from uuid import UUID
 from datetime import datetime
 
@@ -15,13 +22,41 @@ from classes.discussion import Discussion
 from classes.reply import Reply
 from classes.like import Like, LikeObjectType
 
+# Set once the schema version has been checked against the database in this process
+_schema_version_verified = False
+
+# Filters accepted by the course searches (see PostgresVectorDB.course_filter_sql)
+COURSE_FILTERS = ("platform", "is_free", "min_rating", "skills")
+
+# Likeable object type -> table the liked object must exist in
+LIKE_OBJECT_TABLES = {"course": "courses", "discussion": "discussions", "reply": "replies"}
+
+# Liked object type -> table keeping its like_count (see database/reconcile_counters.py)
+LIKE_COUNTER_TABLES = {"discussion": "discussions", "reply": "replies"}
 
 class PostgresVectorDB(VectorDB):
-    def __init__(self):
-        # Can be a connection string or dictionary of params
-        connection_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-        self.conn = psycopg2.connect(connection_string)
-        self.create_tables()
+    def __init__(self, pool: Optional[ConnectionPool] = None, request_scoped: bool = False):
+        """
+        Args:
+            pool (ConnectionPool, optional): Pool to borrow the connection from. When omitted a
+                dedicated connection is opened and closed with this object.
+            request_scoped (bool): If True, close() is a no-op and the connection is only
+                returned to the pool by release() (called from the Flask teardown hook)
+        """
+        self.pool = pool
+        self.request_scoped = request_scoped
+        if pool is not None:
+            self.conn = pool.getconn()
+        else:
+            # Can be a connection string or dictionary of params
+            connection_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+            self.conn = psycopg2.connect(connection_string, options=search_profile_options())
+
+        try:
+            self.check_schema_version()
+        except Exception:
+            self.release()
+            raise
     
     """
     Columns with vector type can only be inserted/updated with a
@@ -32,96 +67,38 @@ class PostgresVectorDB(VectorDB):
     def pgvector_format(self, vector: List[float]) -> str:
         return f"[{','.join(map(str, vector))}]"
     
-    def create_tables(self):
-        with self.conn.cursor() as cursor:
-            cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-            self.conn.commit()
+    def check_schema_version(self):
+        """
+        Verify the database has been migrated to the version this code expects, and has the
+        compact embedding columns the configured EMBEDDING_STORAGE_* modes search.
+        Migrations are applied at deploy time (python -m database.migrate), so this
+        is only checked against the database once per process.
+        """
+        global _schema_version_verified
+        if _schema_version_verified:
+            return
 
-            cursor.execute("""
-            -- Users Table
-            CREATE TABLE IF NOT EXISTS users (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                password TEXT NOT NULL,
-                salt TEXT NOT NULL
-            );
-
-            -- Courses Table
-            CREATE TABLE IF NOT EXISTS courses (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                title TEXT NOT NULL,
-                description TEXT, --nullable
-                platform TEXT NOT NULL CHECK (platform IN ('coursera', 'udemy')),
-                url TEXT NOT NULL,
-                authors TEXT[] NOT NULL,
-                skills TEXT[] NOT NULL,
-                -- skills and author data is inconsistent across platforms
-                -- so we store them in arrays instead of relational tables
-                rating DECIMAL(3,2) DEFAULT 0,
-                num_ratings INT DEFAULT 0,
-                image_url TEXT NOT NULL,
-                is_free BOOLEAN DEFAULT FALSE,
-                embedding vector(768) NOT NULL, -- Added vector embedding
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                -- urls are resource locators for courses on their respective platforms
-                -- urls by nature should uniquely identify a course
-                UNIQUE (platform, url)
-            );
-
-            -- User review table
-            CREATE TABLE IF NOT EXISTS course_reviews (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                course_id UUID NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
-                rating INT CHECK (rating >= 0 AND rating <= 5) NOT NULL, 
-                description TEXT, -- Optional review text
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE (user_id, course_id) -- Ensures a user can only review a course once
-            );               
-
-            -- Discussions Table
-            CREATE TABLE IF NOT EXISTS discussions (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                title TEXT NOT NULL,
-                description TEXT NOT NULL,
-                embedding vector(768) NOT NULL, -- Added vector embedding
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            
-            -- Course Discussions Join Table (new)
-            CREATE TABLE IF NOT EXISTS course_discussions (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                course_id UUID NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
-                discussion_id UUID NOT NULL REFERENCES discussions(id) ON DELETE CASCADE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE (course_id, discussion_id) -- Prevent duplicates
-            );
-
-            -- Replies Table
-            CREATE TABLE IF NOT EXISTS replies (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                discussion_id UUID NOT NULL REFERENCES discussions(id) ON DELETE CASCADE,
-                parent_reply_id UUID REFERENCES replies(id) ON DELETE CASCADE,
-                text TEXT NOT NULL,
-                embedding vector(768) NOT NULL, -- Added vector embedding
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-
-            -- Likes Table (tracks likes on multiple objects)
-            CREATE TABLE IF NOT EXISTS likes (
-                id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
-                object_id UUID NOT NULL,
-                object_type TEXT NOT NULL CHECK (object_type IN ('discussion', 'reply')), 
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE (user_id, object_id, object_type)
-            );
-            """)
-            self.conn.commit()
+        current_version = get_schema_version(self.conn)
+        # end the read transaction so the connection is idle again
+        self.conn.rollback()
+        expected_version = latest_version()
+        if current_version < expected_version:
+            raise SchemaVersionError(
+                f"Database schema is at version {current_version} but version {expected_version} is required. "
+                "Run `python -m database.migrate`."
+            )
+
+        # migrations only add the compact columns for the storage modes configured when they
+        # ran, so a mode enabled later would make every search reference a missing column
+        missing = missing_compact_columns(self.conn)
+        if missing:
+            raise SchemaVersionError(
+                "Embedding storage is configured for columns that don't exist: "
+                + ", ".join(f"{entry['table']}.{entry['column']} ({entry['mode']})" for entry in missing)
+                + ". Add them with `python -m database.index_admin compact <table> <mode>` "
+                "or set EMBEDDING_STORAGE_<TABLE>=full."
+            )
+        _schema_version_verified = True
     
 # Course Queries    
     def insert_course(self, course: Course, vector: List[float]):
@@ -136,8 +113,8 @@ class PostgresVectorDB(VectorDB):
             UUID: The ID of the inserted course
         """
         with self.conn.cursor() as cursor:
-            # Format the vector properly for pgvector
-            vector_str = self.pgvector_format(vector)
+            # Store unit vectors so inner product can be used as cosine similarity
+            vector_str = self.pgvector_format(l2_normalize(vector))
             
             # Convert the platform enum to match the check constraint in the DB
             # The enum values are tuples, so we need the first element without the comma
@@ -192,9 +169,60 @@ class PostgresVectorDB(VectorDB):
             # Get the generated course ID
             course_id = cursor.fetchone()[0]
             self.conn.commit()
+        course_data_version.bump()
             
         return course_id
     
+    def insert_courses(self, courses: List[Course], vectors: List[List[float]]) -> List[UUID]:
+        """
+        Insert many courses in one statement. Courses that already exist (same platform and url)
+        are skipped.
+        
+        Args:
+            courses (List[Course]): The course objects to insert
+            vectors (List[List[float]]): The embedding vector for each course, in the same order
+            
+        Returns:
+            List[UUID]: The IDs of the newly inserted courses
+        """
+        if len(courses) != len(vectors):
+            raise ValueError(f"Got {len(vectors)} vectors for {len(courses)} courses")
+        if not courses:
+            return []
+        
+        rows = [
+            (
+                course.name,
+                course.description,
+                course.original_website.value.lower(),
+                course.url,
+                course.authors,
+                course.skills,
+                course.rating,
+                course.num_ratings,
+                course.image_url,
+                course.is_free,
+                # Store unit vectors so inner product can be used as cosine similarity
+                self.pgvector_format(l2_normalize(vector)),
+            )
+            for course, vector in zip(courses, vectors)
+        ]
+        
+        with self.conn.cursor() as cursor:
+            inserted = psycopg2.extras.execute_values(cursor, """
+                INSERT INTO courses (
+                    title, description, platform, url, authors, skills,
+                    rating, num_ratings, image_url, is_free, embedding
+                ) VALUES %s
+                ON CONFLICT (platform, url) DO NOTHING
+                RETURNING id
+            """, rows, page_size=len(rows), fetch=True)
+            self.conn.commit()
+        if inserted:
+            course_data_version.bump()
+            
+        return [row[0] for row in inserted]
+    
     def delete_course(self, course_id=None, platform=None, url=None):
         """
         Delete a course from the courses table by either its ID or platform/url combination.
@@ -221,6 +249,8 @@ class PostgresVectorDB(VectorDB):
             # Check if any rows were deleted
             rows_deleted = cursor.rowcount
             self.conn.commit()
+        if rows_deleted:
+            course_data_version.bump()
             
         return rows_deleted > 0
 
@@ -343,6 +373,49 @@ class PostgresVectorDB(VectorDB):
         
         return None
         
+    def suggest_course_titles(self, prefix: str, limit: int = 8):
+        """
+        Autocomplete course titles for a typed prefix using the trigram index on courses.title.
+        Titles starting with the prefix come first, then titles containing a word that starts
+        with it, each ordered by trigram similarity to the prefix.
+        
+        Args:
+            prefix (str): The text typed so far
+            limit (int): Maximum number of suggestions
+            
+        Returns:
+            List[Dict]: Suggestions with id, title and platform
+        """
+        # Escape LIKE wildcards so the prefix is matched literally
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT id, title, platform
+                FROM courses
+                WHERE title ILIKE %(starts_with)s OR title ILIKE %(word_starts_with)s
+                ORDER BY
+                    title ILIKE %(starts_with)s DESC,
+                    similarity(title, %(prefix)s) DESC,
+                    title
+                LIMIT %(limit)s
+            """, {
+                "starts_with": f"{escaped}%",
+                "word_starts_with": f"% {escaped}%",
+                "prefix": prefix,
+                "limit": limit,
+            })
+            
+            columns = [desc[0] for desc in cursor.description]
+            suggestions = []
+            
+            for row in cursor.fetchall():
+                suggestion = dict(zip(columns, row))
+                suggestion["id"] = str(suggestion["id"])
+                suggestions.append(suggestion)
+                
+        return suggestions
+
     def find_by_email(self, email):
         """
         Find a user by their email.
@@ -468,6 +541,10 @@ class PostgresVectorDB(VectorDB):
     def delete_user(self, user_id=None, username=None, email=None):
         """
         Delete a user from the users table by ID, username, or email.
+        The user's course reviews and likes are deleted first, in the same statement, so the
+        course_review_stats and like_count they counted towards are kept up to date. The
+        reply_count of the discussions and replies that lose replies with the user (theirs and
+        every reply below them, deleted by ON DELETE CASCADE) is decremented the same way.
         
         Args:
             user_id (UUID, optional): The ID of the user to delete
@@ -477,22 +554,84 @@ class PostgresVectorDB(VectorDB):
         Returns:
             bool: True if a user was deleted, False otherwise
         """
+        if user_id:
+            # Delete by user ID
+            condition, value = "id = %s", user_id
+        elif username:
+            # Delete by username
+            condition, value = "username = %s", username
+        elif email:
+            # Delete by email
+            condition, value = "email = %s", email
+        else:
+            raise ValueError("Either user_id, username, or email must be provided")
+        
         with self.conn.cursor() as cursor:
-            if user_id:
-                # Delete by user ID
-                cursor.execute("DELETE FROM users WHERE id = %s", [user_id])
-            elif username:
-                # Delete by username
-                cursor.execute("DELETE FROM users WHERE username = %s", [username])
-            elif email:
-                # Delete by email
-                cursor.execute("DELETE FROM users WHERE email = %s", [email])
-            else:
-                raise ValueError("Either user_id, username, or email must be provided")
+            cursor.execute(f"""
+                WITH RECURSIVE target AS (
+                    SELECT id FROM users WHERE {condition}
+                ),
+                deleted_reviews AS (
+                    DELETE FROM course_reviews
+                    WHERE user_id IN (SELECT id FROM target)
+                    RETURNING course_id, NULL::int AS new_rating, rating AS old_rating
+                ),
+                stats AS (
+                    {self.review_stats_upsert_sql("deleted_reviews")}
+                ),
+                deleted_likes AS (
+                    DELETE FROM likes
+                    WHERE user_id IN (SELECT id FROM target)
+                    RETURNING object_id, object_type
+                ),
+                -- the user's replies and the replies below them, which the cascade deletes
+                removed_replies AS (
+                    SELECT id, discussion_id, parent_reply_id FROM replies
+                    WHERE user_id IN (SELECT id FROM target)
+                    UNION
+                    SELECT r.id, r.discussion_id, r.parent_reply_id
+                    FROM replies r
+                    JOIN removed_replies removed ON r.parent_reply_id = removed.id
+                ),
+                -- one UPDATE per table, a row can only be updated once per statement
+                discussion_counters AS (
+                    UPDATE discussions d
+                    SET reply_count = d.reply_count - c.replies, like_count = d.like_count - c.likes
+                    FROM (
+                        SELECT id, SUM(replies) AS replies, SUM(likes) AS likes
+                        FROM (
+                            SELECT discussion_id AS id, 1 AS replies, 0 AS likes FROM removed_replies
+                            UNION ALL
+                            SELECT object_id, 0, 1 FROM deleted_likes WHERE object_type = 'discussion'
+                        ) changes
+                        GROUP BY id
+                    ) c
+                    WHERE d.id = c.id
+                ),
+                reply_counters AS (
+                    UPDATE replies r
+                    SET reply_count = r.reply_count - c.replies, like_count = r.like_count - c.likes
+                    FROM (
+                        SELECT id, SUM(replies) AS replies, SUM(likes) AS likes
+                        FROM (
+                            SELECT parent_reply_id AS id, 1 AS replies, 0 AS likes FROM removed_replies
+                            WHERE parent_reply_id IS NOT NULL
+                            UNION ALL
+                            SELECT object_id, 0, 1 FROM deleted_likes WHERE object_type = 'reply'
+                        ) changes
+                        GROUP BY id
+                    ) c
+                    WHERE r.id = c.id
+                )
+                DELETE FROM users WHERE id IN (SELECT id FROM target)
+            """, [value])
             
             # Check if any rows were deleted
             rows_deleted = cursor.rowcount
             self.conn.commit()
+        if rows_deleted:
+            # the user's course reviews were deleted with them
+            course_data_version.bump()
             
         return rows_deleted > 0
     
@@ -525,18 +664,49 @@ class PostgresVectorDB(VectorDB):
                 
             return users
 
+    @staticmethod
+    def paginate_sql(query: str, params: list, limit=None, offset=None):
+        """
+        Append LIMIT and OFFSET to a query when they are given.
+        
+        Returns:
+            tuple: (query, params)
+        """
+        if limit is not None:
+            query += " LIMIT %s"
+            params = params + [limit]
+        if offset is not None:
+            query += " OFFSET %s"
+            params = params + [offset]
+        return query, params
+
     # Review Queries
-    def get_course_reviews(self, course_id):
+    def get_course_reviews(self, course_id, limit=None, offset=None, after=None):
         """
-        Get all reviews for a specific course.
+        Get the reviews for a specific course, newest first, with optional pagination.
         
         Args:
             course_id (str or UUID): The ID of the course to fetch reviews for
+            limit (int, optional): Maximum number of reviews to return
+            offset (int, optional): Number of reviews to skip
+            after (str, optional): Cursor from a previous page's pagination.next_cursor,
+                only reviews after it are returned
             
         Returns:
-            list: A list of review dictionaries with user information
-        """
-        query = """
+            dict: The page of reviews with user information, the course's review stats
+                and pagination info (the total comes from the stats)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        conditions = ["cr.course_id = %s"]
+        params = [course_id]
+        if after is not None:
+            created_at, review_id = decode_cursor(after)
+            conditions.append("(cr.created_at, cr.id) < (%s::timestamp, %s::uuid)")
+            params += [created_at, review_id]
+        
+        query = f"""
             SELECT 
                 cr.id,
                 cr.user_id,
@@ -551,13 +721,14 @@ class PostgresVectorDB(VectorDB):
             JOIN
                 users u ON cr.user_id = u.id
             WHERE 
-                cr.course_id = %s
+                {" AND ".join(conditions)}
             ORDER BY 
-                cr.created_at DESC
+                cr.created_at DESC, cr.id DESC
         """
+        query, params = self.paginate_sql(query, params, limit, offset)
         
         with self.conn.cursor() as cursor:
-            cursor.execute(query, [course_id])
+            cursor.execute(query, params)
             
             # Get column names
             columns = [desc[0] for desc in cursor.description]
@@ -582,17 +753,17 @@ class PostgresVectorDB(VectorDB):
                         
                 reviews.append(review_dict)
             
-            # Get aggregate statistics
+            # Get aggregate statistics (maintained by every review write)
             stats_query = """
                 SELECT 
-                    COUNT(*) as review_count,
-                    AVG(rating) as avg_rating,
-                    MIN(rating) as min_rating,
-                    MAX(rating) as max_rating
+                    COALESCE(s.review_count, 0) as review_count,
+                    s.avg_rating,
+                    s.min_rating,
+                    s.max_rating
                 FROM 
-                    course_reviews
-                WHERE 
-                    course_id = %s
+                    (SELECT %s::uuid AS course_id) c
+                LEFT JOIN 
+                    course_review_stats s ON s.course_id = c.course_id
             """
             
             cursor.execute(stats_query, [course_id])
@@ -604,14 +775,52 @@ class PostgresVectorDB(VectorDB):
                 
             result = {
                 "reviews": reviews,
-                "stats": stats
+                "stats": stats,
+                "pagination": page_info(reviews, stats["review_count"], limit, offset)
             }
                 
             return result
 
+    @staticmethod
+    def review_stats_upsert_sql(changes: str) -> str:
+        """
+        Return an upsert that applies review changes to course_review_stats, for use as a
+        data-modifying CTE in the statement that changes the reviews.
+        
+        Every change adds its new rating and removes its old one (either can be NULL, for
+        inserts and deletes), so concurrent writes to the same course simply add up.
+        
+        Args:
+            changes (str): Name of a CTE returning (course_id, new_rating, old_rating)
+            
+        Returns:
+            str: The INSERT ... ON CONFLICT statement
+        """
+        rating_columns = [f"ratings_{rating}" for rating in range(6)]
+        rating_deltas = ",\n                ".join(
+            f"SUM(COALESCE((new_rating = {rating})::int, 0) - COALESCE((old_rating = {rating})::int, 0))"
+            for rating in range(6)
+        )
+        rating_updates = ",\n                ".join(f"{column} = s.{column} + EXCLUDED.{column}" for column in rating_columns)
+        return f"""
+            INSERT INTO course_review_stats AS s (course_id, review_count, rating_sum, {", ".join(rating_columns)})
+            SELECT
+                course_id,
+                SUM((new_rating IS NOT NULL)::int - (old_rating IS NOT NULL)::int),
+                SUM(COALESCE(new_rating, 0) - COALESCE(old_rating, 0)),
+                {rating_deltas}
+            FROM {changes}
+            GROUP BY course_id
+            ON CONFLICT (course_id) DO UPDATE SET
+                review_count = s.review_count + EXCLUDED.review_count,
+                rating_sum = s.rating_sum + EXCLUDED.rating_sum,
+                {rating_updates}
+        """
+
     def insert_course_review(self, review: CourseReview):
         """
-        Insert or update a course review in the course_reviews table.
+        Insert or update a course review in the course_reviews table, updating the course's
+        review stats in the same statement.
         
         Args:
             review (CourseReview): The CourseReview object containing review details.
@@ -619,45 +828,66 @@ class PostgresVectorDB(VectorDB):
         Returns:
             UUID: The ID of the inserted or updated review.
         """
-        with self.conn.cursor() as cursor:
-            # Ensure rating is within valid range
-            if review.rating < 0 or review.rating > 5:
-                raise ValueError("Rating must be between 0 and 5")
+        # Ensure rating is within valid range
+        if review.rating < 0 or review.rating > 5:
+            raise ValueError("Rating must be between 0 and 5")
 
-            # Check if the user has already reviewed the course
-            cursor.execute(
-                "SELECT id FROM course_reviews WHERE user_id = %s AND course_id = %s",
-                [review.user_id, review.course_id]
-            )
-            existing_review = cursor.fetchone()
-
-            if existing_review:
-                # If review exists, update it
-                cursor.execute("""
-                    UPDATE course_reviews
-                    SET rating = %s, description = %s, created_at = CURRENT_TIMESTAMP
-                    WHERE id = %s
-                    RETURNING id
-                """, [review.rating, review.description, existing_review[0]])
-
-                review_id = cursor.fetchone()[0]
-            else:
-                # Insert new review
-                cursor.execute("""
+        params = {
+            "user_id": review.user_id,
+            "course_id": review.course_id,
+            "rating": review.rating,
+            "description": review.description,
+        }
+        with self.conn.cursor() as cursor:
+            # The existing review is locked before it is updated, so its previous rating is
+            # removed from the stats exactly once even if it changes concurrently
+            upsert_sql = f"""
+                WITH existing AS (
+                    SELECT id, rating FROM course_reviews
+                    WHERE user_id = %(user_id)s AND course_id = %(course_id)s
+                    FOR UPDATE
+                ),
+                updated AS (
+                    UPDATE course_reviews r
+                    SET rating = %(rating)s, description = %(description)s, created_at = CURRENT_TIMESTAMP
+                    FROM existing e
+                    WHERE r.id = e.id
+                    RETURNING r.id, r.course_id, r.rating AS new_rating, e.rating AS old_rating
+                ),
+                inserted AS (
                     INSERT INTO course_reviews (user_id, course_id, rating, description)
-                    VALUES (%s, %s, %s, %s)
-                    RETURNING id
-                """, [review.user_id, review.course_id, review.rating, review.description])
-
-                review_id = cursor.fetchone()[0]
+                    SELECT %(user_id)s::uuid, %(course_id)s::uuid, %(rating)s::int, %(description)s::text
+                    WHERE NOT EXISTS (SELECT 1 FROM existing)
+                    ON CONFLICT (user_id, course_id) DO NOTHING
+                    RETURNING id, course_id, rating AS new_rating, NULL::int AS old_rating
+                ),
+                changes AS (
+                    SELECT * FROM updated
+                    UNION ALL
+                    SELECT * FROM inserted
+                ),
+                stats AS (
+                    {self.review_stats_upsert_sql("changes")}
+                )
+                SELECT id FROM changes
+            """
+            cursor.execute(upsert_sql, params)
+            row = cursor.fetchone()
+            if row is None:
+                # The same review was inserted concurrently after this statement's snapshot,
+                # it is visible (and updated) on a second attempt
+                cursor.execute(upsert_sql, params)
+                row = cursor.fetchone()
+            review_id = row[0]
 
             self.conn.commit()
+        course_data_version.bump()
 
         return review_id
 
     def delete_course_review(self, review_id):
         """
-        Delete a course review by its ID.
+        Delete a course review by its ID, updating the course's review stats in the same statement.
         
         Args:
             review_id (str or UUID): The ID of the review to delete
@@ -667,29 +897,27 @@ class PostgresVectorDB(VectorDB):
         """
         try:
             with self.conn.cursor() as cursor:
-                # Check if the review exists first
-                cursor.execute(
-                    "SELECT * FROM course_reviews WHERE id = %s",
-                    [review_id]
-                )
-                
-                review = cursor.fetchone()
-                if not review:
-                    return False
-                
-                # Delete the review
-                cursor.execute(
-                    "DELETE FROM course_reviews WHERE id = %s",
-                    [review_id]
-                )
+                cursor.execute(f"""
+                    WITH deleted AS (
+                        DELETE FROM course_reviews
+                        WHERE id = %s
+                        RETURNING id, course_id, NULL::int AS new_rating, rating AS old_rating
+                    ),
+                    stats AS (
+                        {self.review_stats_upsert_sql("deleted")}
+                    )
+                    SELECT id FROM deleted
+                """, [review_id])
                 
-                # Get the number of affected rows
-                affected_rows = cursor.rowcount
+                deleted = cursor.fetchone()
                 
                 # Commit the transaction
                 self.conn.commit()
+                if deleted is None:
+                    return False
+                course_data_version.bump()
                 
-                return affected_rows > 0
+                return True
         except Exception as e:
             print(f"Error deleting course review: {e}")
             # Rollback the transaction in case of error
@@ -723,18 +951,15 @@ class PostgresVectorDB(VectorDB):
                     d.title, 
                     d.description, 
                     d.created_at,
-                    ARRAY_AGG(DISTINCT cd.course_id) FILTER (WHERE cd.course_id IS NOT NULL) as referenced_course_ids,
-                    COUNT(DISTINCT r.id) as reply_count
+                    ARRAY(
+                        SELECT cd.course_id FROM course_discussions cd WHERE cd.discussion_id = d.id
+                    ) as referenced_course_ids,
+                    d.reply_count,
+                    d.like_count
                 FROM 
                     discussions d
                 JOIN 
                     users u ON d.user_id = u.id
-                LEFT JOIN
-                    course_discussions cd ON d.id = cd.discussion_id
-                LEFT JOIN
-                    replies r ON r.discussion_id = d.id
-                GROUP BY
-                    d.id, u.username
                 ORDER BY 
                     d.created_at DESC
             """
@@ -816,13 +1041,39 @@ class PostgresVectorDB(VectorDB):
                 
         return None
 
-    def insert_discussion(self, discussion: Discussion, vector: List[float], referenced_course_ids=None):
+    def edit_discussion(self, discussion_id, title: str, description: str) -> int:
+        """
+        Update the title and description of a discussion.
+        The discussion's embedding is cleared and queued to be recomputed from the new text.
+        
+        Args:
+            discussion_id (UUID): The ID of the discussion to edit
+            title (str): The new title
+            description (str): The new description
+            
+        Returns:
+            int: Number of discussions updated (0 if it doesn't exist)
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute(
+                "UPDATE discussions SET title = %s, description = %s, embedding = NULL WHERE id = %s",
+                [title, description, discussion_id]
+            )
+            rows_updated = cursor.rowcount
+            if rows_updated > 0:
+                self.enqueue_embedding(cursor, "discussion", discussion_id)
+            self.conn.commit()
+            
+        return rows_updated
+
+    def insert_discussion(self, discussion: Discussion, vector: Optional[List[float]] = None, referenced_course_ids=None):
         """
         Insert a discussion into the discussions table and create references to any courses.
         
         Args:
             discussion (Discussion): The discussion object to insert
-            vector (List[float]): The embedding vector for the discussion content
+            vector (List[float], optional): The embedding vector for the discussion content.
+                When omitted the embedding is left pending for the embedding outbox worker.
             referenced_course_ids (List[UUID], optional): List of course IDs referenced in the discussion
             
         Returns:
@@ -830,8 +1081,8 @@ class PostgresVectorDB(VectorDB):
         """
         
         with self.conn.cursor() as cursor:
-            # Format the vector for pgvector
-            vector_str = self.pgvector_format(vector)
+            # Store unit vectors so inner product can be used as cosine similarity
+            vector_str = self.pgvector_format(l2_normalize(vector)) if vector is not None else None
             
             # Insert the discussion (without course_id since that column is removed)
             cursor.execute("""
@@ -851,6 +1102,8 @@ class PostgresVectorDB(VectorDB):
             
             # Get the generated discussion ID
             discussion_id = cursor.fetchone()[0]
+            if vector is None:
+                self.enqueue_embedding(cursor, "discussion", discussion_id)
             self.conn.commit()
             
             # Add references to courses in the course_discussions table
@@ -861,48 +1114,90 @@ class PostgresVectorDB(VectorDB):
         return discussion_id
 
 
-    def get_discussions_by_course(self, course_id):
+    def get_discussions_by_course(self, course_id, limit=None, offset=None, after=None):
         """
-        Get all discussions for a specific course through the course_discussions join table.
+        Get the discussions for a specific course through the course_discussions join table,
+        newest first, with optional pagination.
         
         Args:
             course_id (UUID): The ID of the course
+            limit (int, optional): Maximum number of discussions to return
+            offset (int, optional): Number of discussions to skip
+            after (str, optional): Cursor from a previous page's pagination.next_cursor
             
         Returns:
-            List[Dict]: List of discussions with reply counts
+            dict: The page of discussions with reply counts and pagination info
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        return self.get_course_discussions_page("""
+            d.id, 
+            d.title, 
+            d.description, 
+            d.user_id, 
+            u.username,
+            d.created_at, 
+            d.reply_count,
+            d.like_count
+        """, course_id, limit, offset, after)
+
+    def get_course_discussions_page(self, columns_sql: str, course_id, limit=None, offset=None, after=None):
         """
-        with self.conn.cursor() as cursor:
-            cursor.execute("""
+        Return one page of the discussions referencing a course, newest first.
+        The total is counted with COUNT(*) OVER () over every discussion of the course,
+        before the cursor and limit are applied, in the same query as the page.
+        
+        Args:
+            columns_sql (str): Columns to select from discussions d, users u and course_discussions cd
+                (must include d.id and d.created_at)
+            course_id (UUID): The ID of the course
+            limit (int, optional): Maximum number of discussions to return
+            offset (int, optional): Number of discussions to skip
+            after (str, optional): Cursor from a previous page's pagination.next_cursor
+            
+        Returns:
+            dict: {"discussions": [...], "pagination": {...}}
+        """
+        conditions = ["TRUE"]
+        params = [course_id]
+        if after is not None:
+            created_at, discussion_id = decode_cursor(after)
+            conditions.append("(page.created_at, page.id) < (%s::timestamp, %s::uuid)")
+            params += [created_at, discussion_id]
+        
+        query = f"""
+            SELECT * FROM (
                 SELECT 
-                    d.id, 
-                    d.title, 
-                    d.description, 
-                    d.user_id, 
-                    u.username,
-                    d.created_at, 
-                    COUNT(r.id) as reply_count
+                    {columns_sql},
+                    COUNT(*) OVER () AS total_count
                 FROM 
                     course_discussions cd
                 JOIN 
                     discussions d ON cd.discussion_id = d.id
                 JOIN 
                     users u ON d.user_id = u.id
-                LEFT JOIN 
-                    replies r ON r.discussion_id = d.id
                 WHERE 
                     cd.course_id = %s
-                GROUP BY 
-                    d.id, u.username, d.created_at
-                ORDER BY 
-                    d.created_at DESC
-            """, [course_id])
+            ) page
+            WHERE 
+                {" AND ".join(conditions)}
+            ORDER BY 
+                page.created_at DESC, page.id DESC
+        """
+        query, params = self.paginate_sql(query, params, limit, offset)
+        
+        with self.conn.cursor() as cursor:
+            cursor.execute(query, params)
             
             columns = [desc[0] for desc in cursor.description]
             results = []
+            total = None
             
             for row in cursor.fetchall():
                 # Convert row to dictionary
                 discussion_dict = dict(zip(columns, row))
+                total = discussion_dict.pop("total_count")
                 # Convert UUID and datetime objects to strings for JSON serialization
                 for key, value in discussion_dict.items():
                     if isinstance(value, UUID):
@@ -912,7 +1207,15 @@ class PostgresVectorDB(VectorDB):
                 
                 results.append(discussion_dict)
             
-            return results
+            if total is None:
+                # empty page, the window count had no row to ride on
+                cursor.execute("SELECT COUNT(*) FROM course_discussions WHERE course_id = %s", [course_id])
+                total = cursor.fetchone()[0]
+            
+            return {
+                "discussions": results,
+                "pagination": page_info(results, total, limit, offset)
+            }
     
     # Course Discussion Functions
     def insert_course_discussion_reference(self, course_id, discussion_id):
@@ -1009,86 +1312,67 @@ class PostgresVectorDB(VectorDB):
             
             return results
 
-    def get_discussions_for_course(self, course_id):
+    def get_discussions_for_course(self, course_id, limit=None, offset=None, after=None):
         """
-        Get all discussions that reference a specific course.
+        Get the discussions that reference a specific course, newest first, with optional pagination.
         
         Args:
             course_id (UUID): The ID of the course
+            limit (int, optional): Maximum number of discussions to return
+            offset (int, optional): Number of discussions to skip
+            after (str, optional): Cursor from a previous page's pagination.next_cursor
             
         Returns:
-            List[Dict]: List of discussions referencing the course
-        """
-        with self.conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT 
-                    d.id, 
-                    d.title, 
-                    d.description, 
-                    d.user_id, 
-                    u.username as user_username,
-                    d.created_at,
-                    cd.created_at as reference_created_at,
-                    COUNT(r.id) as reply_count
-                FROM 
-                    course_discussions cd
-                JOIN 
-                    discussions d ON cd.discussion_id = d.id
-                JOIN 
-                    users u ON d.user_id = u.id
-                LEFT JOIN 
-                    replies r ON r.discussion_id = d.id
-                WHERE 
-                    cd.course_id = %s
-                GROUP BY 
-                    d.id, u.username, cd.created_at
-                ORDER BY 
-                    d.created_at DESC
-            """, [course_id])
-            
-            columns = [desc[0] for desc in cursor.description]
-            results = []
-            
-            for row in cursor.fetchall():
-                # Convert row to dictionary
-                discussion_dict = dict(zip(columns, row))
-                
-                # Convert UUID and datetime objects to strings for JSON serialization
-                for key, value in discussion_dict.items():
-                    if isinstance(value, UUID):
-                        discussion_dict[key] = str(value)
-                    elif isinstance(value, datetime):
-                        discussion_dict[key] = value.isoformat()
-                
-                results.append(discussion_dict)
-            
-            return results
+            dict: The page of discussions referencing the course and pagination info
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        return self.get_course_discussions_page("""
+            d.id, 
+            d.title, 
+            d.description, 
+            d.user_id, 
+            u.username as user_username,
+            d.created_at,
+            cd.created_at as reference_created_at,
+            d.reply_count,
+            d.like_count
+        """, course_id, limit, offset, after)
 
 # Reply Queries
-    def insert_reply(self, reply: Reply, vector: List[float]):
+    def insert_reply(self, reply: Reply, vector: Optional[List[float]] = None):
         """
         Insert a reply into the replies table.
         
         Args:
             reply (Reply): The reply object to insert
-            vector (List[float]): The embedding vector for the reply text
+            vector (List[float], optional): The embedding vector for the reply text.
+                When omitted the embedding is left pending for the embedding outbox worker.
             
         Returns:
             UUID: The ID of the inserted reply
         """
         with self.conn.cursor() as cursor:
-            # Format the vector properly for pgvector
-            vector_str = self.pgvector_format(vector)
+            # Store unit vectors so inner product can be used as cosine similarity
+            vector_str = self.pgvector_format(l2_normalize(vector)) if vector is not None else None
             
-            # Insert the reply
+            # Insert the reply and count it on its discussion
             cursor.execute("""
-                INSERT INTO replies (
-                    user_id,
-                    discussion_id,
-                    text,
-                    embedding
-                ) VALUES (%s, %s, %s, %s)
-                RETURNING id
+                WITH inserted AS (
+                    INSERT INTO replies (
+                        user_id,
+                        discussion_id,
+                        text,
+                        embedding
+                    ) VALUES (%s, %s, %s, %s)
+                    RETURNING id, discussion_id
+                ),
+                discussion_count AS (
+                    UPDATE discussions SET reply_count = reply_count + 1
+                    WHERE id = (SELECT discussion_id FROM inserted)
+                )
+                SELECT id FROM inserted
             """, [
                 reply.user_id,
                 reply.discussion_id,
@@ -1098,6 +1382,8 @@ class PostgresVectorDB(VectorDB):
             
             # Get the generated reply ID
             reply_id = cursor.fetchone()[0]
+            if vector is None:
+                self.enqueue_embedding(cursor, "reply", reply_id)
             self.conn.commit()
             
         return reply_id
@@ -1105,6 +1391,7 @@ class PostgresVectorDB(VectorDB):
     def update_reply_text(self, reply_id, new_text):
         """
         Update the text of a reply in the database.
+        The reply's embedding is cleared and queued to be recomputed from the new text.
         
         Args:
             reply_id (UUID): The ID of the reply to update
@@ -1116,12 +1403,14 @@ class PostgresVectorDB(VectorDB):
         try:
             with self.conn.cursor() as cursor:
                 cursor.execute(
-                    "UPDATE replies SET text = %s WHERE id = %s",
+                    "UPDATE replies SET text = %s, embedding = NULL WHERE id = %s",
                     [new_text, reply_id]
                 )
                 
                 # Check if any rows were updated
                 rows_updated = cursor.rowcount
+                if rows_updated > 0:
+                    self.enqueue_embedding(cursor, "reply", reply_id)
                 self.conn.commit()
                 
                 return rows_updated > 0
@@ -1130,32 +1419,44 @@ class PostgresVectorDB(VectorDB):
             self.conn.rollback()
             return False
 
-    def insert_reply_to_reply(self, reply: Reply, parent_reply_id: UUID, vector: List[float]):
+    def insert_reply_to_reply(self, reply: Reply, parent_reply_id: UUID, vector: Optional[List[float]] = None):
         """
         Insert a reply to another reply into the replies table.
         
         Args:
             reply (Reply): The reply object to insert
             parent_reply_id (UUID): The ID of the parent reply this is responding to
-            vector (List[float]): The embedding vector for the reply text
+            vector (List[float], optional): The embedding vector for the reply text.
+                When omitted the embedding is left pending for the embedding outbox worker.
             
         Returns:
             UUID: The ID of the inserted reply
         """
         with self.conn.cursor() as cursor:
-            # Format the vector properly for pgvector
-            vector_str = self.pgvector_format(vector)
+            # Store unit vectors so inner product can be used as cosine similarity
+            vector_str = self.pgvector_format(l2_normalize(vector)) if vector is not None else None
             
-            # Insert the reply
+            # Insert the reply and count it on its discussion and parent reply
             cursor.execute("""
-                INSERT INTO replies (
-                    user_id,
-                    discussion_id,
-                    text,
-                    embedding,
-                    parent_reply_id
-                ) VALUES (%s, %s, %s, %s, %s)
-                RETURNING id
+                WITH inserted AS (
+                    INSERT INTO replies (
+                        user_id,
+                        discussion_id,
+                        text,
+                        embedding,
+                        parent_reply_id
+                    ) VALUES (%s, %s, %s, %s, %s)
+                    RETURNING id, discussion_id, parent_reply_id
+                ),
+                discussion_count AS (
+                    UPDATE discussions SET reply_count = reply_count + 1
+                    WHERE id = (SELECT discussion_id FROM inserted)
+                ),
+                parent_count AS (
+                    UPDATE replies SET reply_count = reply_count + 1
+                    WHERE id = (SELECT parent_reply_id FROM inserted)
+                )
+                SELECT id FROM inserted
             """, [
                 reply.user_id,
                 reply.discussion_id,
@@ -1166,39 +1467,60 @@ class PostgresVectorDB(VectorDB):
             
             # Get the generated reply ID
             reply_id = cursor.fetchone()[0]
+            if vector is None:
+                self.enqueue_embedding(cursor, "reply", reply_id)
             self.conn.commit()
             
         return reply_id
 
     
-    def get_replies_by_discussion(self, discussion_id):
+    def get_replies_by_discussion(self, discussion_id, limit=None, offset=None, after=None):
         """
-        Get all replies for a specific discussion.
+        Get the replies for a specific discussion, oldest first, with optional pagination.
         
         Args:
             discussion_id (UUID): The ID of the discussion
+            limit (int, optional): Maximum number of replies to return
+            offset (int, optional): Number of replies to skip
+            after (str, optional): Cursor from a previous page's pagination.next_cursor
             
         Returns:
-            List[Dict]: List of replies with user information and parent reply information
+            dict: The page of replies with user information and parent reply information, and
+                pagination info (the total is the discussion's maintained reply_count)
+            
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        conditions = ["r.discussion_id = %s"]
+        params = [discussion_id]
+        if after is not None:
+            created_at, reply_id = decode_cursor(after)
+            conditions.append("(r.created_at, r.id) > (%s::timestamp, %s::uuid)")
+            params += [created_at, reply_id]
+        
+        query = f"""
+            SELECT 
+                r.id,
+                r.text,
+                r.created_at,
+                r.user_id,
+                u.username,
+                r.parent_reply_id,
+                r.reply_count,
+                r.like_count
+            FROM 
+                replies r
+            JOIN
+                users u ON r.user_id = u.id
+            WHERE
+                {" AND ".join(conditions)}
+            ORDER BY
+                r.created_at ASC, r.id ASC
         """
+        query, params = self.paginate_sql(query, params, limit, offset)
+        
         with self.conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT 
-                    r.id,
-                    r.text,
-                    r.created_at,
-                    r.user_id,
-                    u.username,
-                    r.parent_reply_id
-                FROM 
-                    replies r
-                JOIN
-                    users u ON r.user_id = u.id
-                WHERE
-                    r.discussion_id = %s
-                ORDER BY
-                    r.created_at ASC
-            """, [discussion_id])
+            cursor.execute(query, params)
             
             columns = [desc[0] for desc in cursor.description]
             results = []
@@ -1216,7 +1538,13 @@ class PostgresVectorDB(VectorDB):
                 
                 results.append(reply_dict)
             
-            return results
+            cursor.execute("SELECT reply_count FROM discussions WHERE id = %s", [discussion_id])
+            discussion = cursor.fetchone()
+            
+            return {
+                "replies": results,
+                "pagination": page_info(results, discussion[0] if discussion else 0, limit, offset)
+            }
 
     #TODO
     def get_replies_by_user(self, user_id):
@@ -1282,53 +1610,83 @@ class PostgresVectorDB(VectorDB):
         return None
 
 # Like Queries
+    @staticmethod
+    def like_count_update_sql(changed: str, delta: int, object_types=tuple(LIKE_COUNTER_TABLES)) -> str:
+        """
+        Return data-modifying CTEs (with their leading comma) that add delta to the like_count
+        of every object liked or unliked in the changed CTE. Object types without a counter
+        are skipped, so the result can be empty.
+        
+        Args:
+            changed (str): Name of a CTE returning (object_id, object_type) of every inserted or deleted like
+            delta (int): 1 for inserted likes, -1 for deleted ones
+            object_types (Iterable[str]): The object types the changed likes can have
+        """
+        ctes = ""
+        for object_type in object_types:
+            table = LIKE_COUNTER_TABLES.get(object_type)
+            if table is None:
+                continue
+            ctes += f""",
+                {object_type}_like_count AS (
+                    UPDATE {table} o SET like_count = o.like_count + {int(delta)} * c.changed
+                    FROM (
+                        SELECT object_id, COUNT(*) AS changed FROM {changed}
+                        WHERE object_type = '{object_type}'
+                        GROUP BY object_id
+                    ) c
+                    WHERE o.id = c.object_id
+                )"""
+        return ctes
+
     def insert_like(self, like: Like):
         """
-        Insert a like into the likes table.
-        If the like already exists (same user, object, and type), it won't create a duplicate.
+        Like an object in a single statement: the like is only inserted if the object exists,
+        an existing like is left as is, and the object's like_count is updated with it.
         
         Args:
             like (Like): The like object to insert
             
         Returns:
-            UUID or None: The ID of the inserted like, or None if it already exists
-        """
-        with self.conn.cursor() as cursor:
-            # Check if like already exists
-            cursor.execute(
-                "SELECT id FROM likes WHERE user_id = %s AND object_id = %s AND object_type = %s",
-                [like.user_id, like.object_id, like.object_type.value]
-            )
-            existing_like = cursor.fetchone()
+            Tuple[bool, bool]: Whether the object exists, and whether a new like was inserted
             
-            if existing_like:
-                # Like already exists, return the existing like ID
-                self.conn.commit()
-                return existing_like[0]
-                
-            # Insert the like
-            cursor.execute("""
-                INSERT INTO likes (
-                    user_id,
-                    object_id,
-                    object_type
-                ) VALUES (%s, %s, %s)
-                RETURNING id
-            """, [
-                like.user_id,
-                like.object_id,
-                like.object_type.value
-            ])
+        Raises:
+            ValueError: If the object type can't be liked
+        """
+        object_type = LikeObjectType(like.object_type).value
+        if object_type not in LIKE_OBJECT_TABLES:
+            raise ValueError(f"Likes on {object_type} are not supported")
             
-            # Get the generated like ID
-            like_id = cursor.fetchone()[0]
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"""
+                WITH target AS (
+                    SELECT id FROM {LIKE_OBJECT_TABLES[object_type]} WHERE id = %(object_id)s
+                ),
+                inserted AS (
+                    INSERT INTO likes (
+                        user_id,
+                        object_id,
+                        object_type
+                    )
+                    SELECT %(user_id)s::uuid, id, %(object_type)s FROM target
+                    ON CONFLICT (user_id, object_id, object_type) DO NOTHING
+                    RETURNING object_id, object_type
+                ){self.like_count_update_sql("inserted", 1, [object_type])}
+                SELECT EXISTS (SELECT 1 FROM target), EXISTS (SELECT 1 FROM inserted)
+            """, {
+                "user_id": like.user_id,
+                "object_id": like.object_id,
+                "object_type": object_type,
+            })
+            
+            found, inserted = cursor.fetchone()
             self.conn.commit()
             
-        return like_id
+        return found, inserted
 
     def delete_like(self, user_id, object_id, object_type: LikeObjectType):
         """
-        Delete a like from the likes table.
+        Unlike an object in a single statement, updating the object's like_count with it.
         
         Args:
             user_id (UUID): The ID of the user who liked the object
@@ -1336,22 +1694,99 @@ class PostgresVectorDB(VectorDB):
             object_type (LikeObjectType or str): The type of the liked object
             
         Returns:
-            bool: True if a like was deleted, False otherwise
+            Tuple[bool, bool]: Whether the object exists, and whether a like was deleted
+            
+        Raises:
+            ValueError: If the object type can't be liked
         """
-        # Convert object_type to string if it's an enum
-        object_type = object_type.value
+        object_type = LikeObjectType(object_type).value
+        if object_type not in LIKE_OBJECT_TABLES:
+            raise ValueError(f"Likes on {object_type} are not supported")
             
         with self.conn.cursor() as cursor:
-            cursor.execute(
-                "DELETE FROM likes WHERE user_id = %s AND object_id = %s AND object_type = %s",
-                [user_id, object_id, object_type]
-            )
-            
-            # Check if any rows were deleted
-            rows_deleted = cursor.rowcount
+            cursor.execute(f"""
+                WITH target AS (
+                    SELECT id FROM {LIKE_OBJECT_TABLES[object_type]} WHERE id = %(object_id)s
+                ),
+                deleted AS (
+                    DELETE FROM likes
+                    WHERE user_id = %(user_id)s AND object_id = %(object_id)s AND object_type = %(object_type)s
+                    RETURNING object_id, object_type
+                ){self.like_count_update_sql("deleted", -1, [object_type])}
+                SELECT EXISTS (SELECT 1 FROM target), EXISTS (SELECT 1 FROM deleted)
+            """, {
+                "user_id": user_id,
+                "object_id": object_id,
+                "object_type": object_type,
+            })
+            
+            found, deleted = cursor.fetchone()
             self.conn.commit()
             
-        return rows_deleted > 0
+        return found, deleted
+
+    def apply_like_mutations(self, likes: List[tuple], unlikes: List[tuple]) -> Tuple[int, int]:
+        """
+        Apply many likes and unlikes in one transaction (used by the like write-behind buffer).
+        Likes on objects or by users that don't exist and duplicate likes are skipped.
+        The transaction is rolled back if a statement fails.
+        
+        Args:
+            likes (List[tuple]): (user_id, object_id, object_type) of every like to insert
+            unlikes (List[tuple]): (user_id, object_id, object_type) of every like to delete
+            
+        Returns:
+            Tuple[int, int]: Number of likes inserted and deleted
+        """
+        object_exists = " OR ".join(
+            f"(r.object_type = '{object_type}' AND EXISTS (SELECT 1 FROM {table} WHERE id = r.object_id::uuid))"
+            for object_type, table in LIKE_OBJECT_TABLES.items()
+        )
+        inserted = deleted = 0
+        try:
+            with self.conn.cursor() as cursor:
+                if likes:
+                    rows = psycopg2.extras.execute_values(cursor, f"""
+                        WITH requested (user_id, object_id, object_type) AS (
+                            VALUES %s
+                        ),
+                        inserted AS (
+                            INSERT INTO likes (user_id, object_id, object_type)
+                            SELECT r.user_id::uuid, r.object_id::uuid, r.object_type
+                            FROM requested r
+                            WHERE ({object_exists})
+                                -- the user may have been deleted since the like was queued
+                                AND EXISTS (SELECT 1 FROM users u WHERE u.id = r.user_id::uuid)
+                            ON CONFLICT (user_id, object_id, object_type) DO NOTHING
+                            RETURNING object_id, object_type
+                        ){self.like_count_update_sql("inserted", 1)}
+                        SELECT COUNT(*) FROM inserted
+                    """, [(str(user_id), str(object_id), object_type) for user_id, object_id, object_type in likes],
+                    page_size=len(likes), fetch=True)
+                    inserted = rows[0][0]
+            
+                if unlikes:
+                    rows = psycopg2.extras.execute_values(cursor, f"""
+                        WITH requested (user_id, object_id, object_type) AS (
+                            VALUES %s
+                        ),
+                        deleted AS (
+                            DELETE FROM likes l
+                            USING requested r
+                            WHERE l.user_id = r.user_id::uuid AND l.object_id = r.object_id::uuid AND l.object_type = r.object_type
+                            RETURNING l.object_id, l.object_type
+                        ){self.like_count_update_sql("deleted", -1)}
+                        SELECT COUNT(*) FROM deleted
+                    """, [(str(user_id), str(object_id), object_type) for user_id, object_id, object_type in unlikes],
+                    page_size=len(unlikes), fetch=True)
+                    deleted = rows[0][0]
+            
+                self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+            
+        return inserted, deleted
     
     def get_like(self, object_id, user_id, object_type: LikeObjectType):
         """
@@ -1439,6 +1874,14 @@ class PostgresVectorDB(VectorDB):
         object_type = object_type.value
         
         with self.conn.cursor() as cursor:
+            if object_type in LIKE_COUNTER_TABLES:
+                cursor.execute(
+                    f"SELECT like_count FROM {LIKE_COUNTER_TABLES[object_type]} WHERE id = %s",
+                    [object_id]
+                )
+                row = cursor.fetchone()
+                return row[0] if row else 0
+            
             cursor.execute(
                 "SELECT COUNT(*) FROM likes WHERE object_id = %s AND object_type = %s",
                 [object_id, object_type]
@@ -1448,104 +1891,646 @@ class PostgresVectorDB(VectorDB):
             
         return count
 
+    def get_like_summaries(self, object_ids, object_type: LikeObjectType, viewer_id=None):
+        """
+        Get the like count of many objects, and whether the viewer liked each of them, in one query.
+        
+        Args:
+            object_ids (List[UUID or str]): The IDs of the objects
+            object_type (LikeObjectType or str): The type of the objects
+            viewer_id (UUID, optional): The user viewing the objects (liked_by_viewer is False without one)
+            
+        Returns:
+            Dict[str, Dict]: Object ID -> {"like_count": int, "liked_by_viewer": bool}, for every requested ID
+        """
+        object_type = LikeObjectType(object_type).value
+        object_ids = [str(object_id) for object_id in object_ids]
+        summaries = {object_id: {"like_count": 0, "liked_by_viewer": False} for object_id in object_ids}
+        if not object_ids:
+            return summaries
+        
+        with self.conn.cursor() as cursor:
+            if object_type in LIKE_COUNTER_TABLES:
+                # maintained counters, only the viewer's likes are looked up
+                cursor.execute(f"""
+                    SELECT 
+                        o.id,
+                        o.like_count,
+                        EXISTS (
+                            SELECT 1 FROM likes l
+                            WHERE l.object_id = o.id AND l.object_type = %s AND l.user_id = %s
+                        ) AS liked_by_viewer
+                    FROM 
+                        {LIKE_COUNTER_TABLES[object_type]} o
+                    WHERE 
+                        o.id = ANY(%s::uuid[])
+                """, [object_type, viewer_id, object_ids])
+            else:
+                cursor.execute("""
+                    SELECT 
+                        l.object_id,
+                        COUNT(*) AS like_count,
+                        COALESCE(BOOL_OR(l.user_id = %s), FALSE) AS liked_by_viewer
+                    FROM 
+                        likes l
+                    WHERE 
+                        l.object_id = ANY(%s::uuid[]) AND l.object_type = %s
+                    GROUP BY 
+                        l.object_id
+                """, [viewer_id, object_ids, object_type])
+            
+            for object_id, like_count, liked_by_viewer in cursor.fetchall():
+                summaries[str(object_id)] = {"like_count": like_count, "liked_by_viewer": liked_by_viewer}
+            
+        return summaries
+
+    def get_viewer_likes(self, object_ids, object_type: LikeObjectType, viewer_id):
+        """
+        Get which of many objects the viewer liked, in one query. For lists whose rows already
+        carry their maintained like_count, so only the viewer's likes need looking up.
+        
+        Args:
+            object_ids (List[UUID or str]): The IDs of the objects
+            object_type (LikeObjectType or str): The type of the objects
+            viewer_id (UUID): The user viewing the objects
+            
+        Returns:
+            Set[str]: The IDs of the objects the viewer liked
+        """
+        object_type = LikeObjectType(object_type).value
+        object_ids = [str(object_id) for object_id in object_ids]
+        if not object_ids:
+            return set()
+        
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT object_id FROM likes
+                WHERE object_id = ANY(%s::uuid[]) AND object_type = %s AND user_id = %s
+            """, [object_ids, object_type, viewer_id])
+            return {str(row[0]) for row in cursor.fetchall()}
+
+# Embedding Outbox
+    def enqueue_embedding(self, cursor, object_type: str, object_id):
+        """
+        Queue a discussion or reply to be embedded by the outbox worker, in the caller's transaction.
+        Queuing an object that is already queued makes it due again.
+        
+        Args:
+            cursor: The cursor of the transaction writing the object
+            object_type (str): discussion or reply
+            object_id (UUID): The ID of the object
+        """
+        cursor.execute("""
+            INSERT INTO embedding_outbox (object_type, object_id) VALUES (%s, %s)
+            ON CONFLICT (object_type, object_id) DO UPDATE
+            SET available_at = CURRENT_TIMESTAMP, attempts = 0, last_error = NULL
+        """, [object_type, object_id])
+
+    def claim_embedding_jobs(self, limit: int, lease_seconds: int) -> List[dict]:
+        """
+        Claim due outbox jobs with the text to embed.
+        
+        Jobs are leased rather than locked for the duration of the embedding: their available_at
+        is pushed lease_seconds ahead and the claim is committed, so concurrent workers (SKIP LOCKED)
+        never claim the same job and jobs of a worker that dies are picked up after the lease.
+        
+        Args:
+            limit (int): Maximum number of jobs to claim
+            lease_seconds (int): Seconds before an unfinished job can be claimed again
+            
+        Returns:
+            List[Dict]: Jobs with id, object_type, object_id and the object's current
+                title/description (discussions) or text/discussion_id (replies)
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                WITH claimed AS (
+                    UPDATE embedding_outbox o
+                    SET available_at = CURRENT_TIMESTAMP + make_interval(secs => %(lease_seconds)s),
+                        attempts = o.attempts + 1
+                    WHERE o.id IN (
+                        SELECT id FROM embedding_outbox
+                        WHERE available_at <= CURRENT_TIMESTAMP
+                        ORDER BY available_at
+                        LIMIT %(limit)s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING o.id, o.object_type, o.object_id
+                )
+                SELECT
+                    c.id, c.object_type, c.object_id,
+                    d.title, d.description, d.user_id AS discussion_user_id,
+                    r.text, r.discussion_id, r.user_id AS reply_user_id
+                FROM claimed c
+                LEFT JOIN discussions d ON c.object_type = 'discussion' AND d.id = c.object_id
+                LEFT JOIN replies r ON c.object_type = 'reply' AND r.id = c.object_id
+            """, {"limit": limit, "lease_seconds": lease_seconds})
+            
+            columns = [desc[0] for desc in cursor.description]
+            jobs = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            self.conn.commit()
+            
+        return jobs
+
+    def complete_embedding_jobs(self, jobs: List[dict], vectors: List[Optional[List[float]]]):
+        """
+        Store the embeddings of claimed jobs and remove them from the outbox in one transaction.
+        
+        An embedding is only stored if the object's text is still the text that was embedded.
+        Jobs whose object was edited meanwhile stay queued (due immediately) and are embedded
+        again from the new text; jobs whose object was deleted are dropped.
+        
+        Args:
+            jobs (List[Dict]): Jobs from claim_embedding_jobs
+            vectors (List[List[float]]): The embedding for each job, None for deleted objects
+        """
+        with self.conn.cursor() as cursor:
+            for job, vector in zip(jobs, vectors):
+                if vector is not None:
+                    vector_str = self.pgvector_format(l2_normalize(vector))
+                    if job["object_type"] == "discussion":
+                        cursor.execute(
+                            "UPDATE discussions SET embedding = %s WHERE id = %s AND title = %s AND description = %s",
+                            [vector_str, job["object_id"], job["title"], job["description"]]
+                        )
+                    else:
+                        cursor.execute(
+                            "UPDATE replies SET embedding = %s WHERE id = %s AND text = %s",
+                            [vector_str, job["object_id"], job["text"]]
+                        )
+                    if cursor.rowcount == 0:
+                        # edited (or deleted) while it was being embedded
+                        cursor.execute(
+                            "UPDATE embedding_outbox SET available_at = CURRENT_TIMESTAMP WHERE id = %s",
+                            [job["id"]]
+                        )
+                        continue
+                
+                cursor.execute("DELETE FROM embedding_outbox WHERE id = %s", [job["id"]])
+            self.conn.commit()
+
+    def fail_embedding_jobs(self, jobs: List[dict], error: str):
+        """
+        Record a failed embedding attempt and retry the jobs with exponential backoff (capped at an hour)
+        
+        Args:
+            jobs (List[Dict]): Jobs from claim_embedding_jobs
+            error (str): The error to record
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE embedding_outbox
+                SET last_error = %s,
+                    available_at = CURRENT_TIMESTAMP + make_interval(secs => LEAST(power(2, attempts), 3600))
+                WHERE id = ANY(%s)
+            """, [error, [job["id"] for job in jobs]])
+            self.conn.commit()
+
 # Vector Search Queries
-    def query_course_vector(self, query_vector: List[float], limit: int = 10, threshold: float = 0.5, similarity_weight: float = .85):
+    def set_ef_search(self, cursor, ef_search: Optional[int], candidate_limit: int):
         """
-        Search for courses similar to the given query vector.
+        Set hnsw.ef_search for the current transaction only.
+        An HNSW scan returns at most ef_search rows, so it is never set below the number
+        of candidates requested.
+        
+        Args:
+            cursor: The cursor the search will run on
+            ef_search (int, optional): Requested candidate list size (defaults to the search profile's)
+            candidate_limit (int): Number of nearest neighbours the search will ask the index for
+        """
+        session_ef_search = get_search_profile()["hnsw.ef_search"]
+        # pgvector caps ef_search at 1000
+        ef_search = min(max(ef_search or session_ef_search, candidate_limit), 1000)
+        if ef_search == session_ef_search:
+            # already set on the connection by the search profile
+            return
+        cursor.execute("SELECT set_config('hnsw.ef_search', %s, true)", [str(ef_search)])
+
+    def set_statement_timeout(self, timeout_ms: int):
+        """
+        Cancel any statement that runs longer than timeout_ms for the rest of the current transaction.
+        
+        Args:
+            timeout_ms (int): Statement timeout in milliseconds
+        """
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT set_config('statement_timeout', %s, true)", [str(max(1, int(timeout_ms)))])
+
+    def candidate_search_sql(self, table: str, where: str = "t.embedding IS NOT NULL") -> str:
+        """
+        Build the nearest neighbour candidate query for a table's embedding storage mode.
+        
+        The query returns (id, similarity) for the %(candidate_limit)s rows closest to
+        %(query_vector)s, ordering by distance so the planner can use the ANN index.
+        In halfvec, binary and matryoshka storage modes a wider pool of %(rerank_limit)s rows
+        is taken from the compact column's index and re-ranked on the full precision embedding.
+        
+        Args:
+            table (str): courses, discussions or replies
+            where (str): Filter on the table (aliased t) applied during the index scan. By default
+                rows whose embedding is still pending (NULL) are skipped.
+            
+        Returns:
+            str: SQL using the named parameters query_vector, prefix_vector, candidate_limit and rerank_limit
+        """
+        mode = get_storage_mode(table)
+        if mode == "full":
+            # <#> is the negative inner product, ordering by it ascending uses the HNSW index
+            return f"""
+                SELECT t.id, (t.embedding <#> %(query_vector)s) * -1 AS similarity
+                FROM {table} t
+                WHERE {where}
+                ORDER BY t.embedding <#> %(query_vector)s
+                LIMIT %(candidate_limit)s
+            """
+
+        if mode == "halfvec":
+            approximate_distance = f"t.embedding_half <#> %(query_vector)s::halfvec({EMBEDDING_DIMENSIONS})"
+        elif mode == "binary":
+            approximate_distance = f"t.embedding_bin <~> binary_quantize(%(query_vector)s::vector)::bit({EMBEDDING_DIMENSIONS})"
+        else:
+            approximate_distance = "t.embedding_short <#> %(prefix_vector)s"
+
+        return f"""
+            SELECT approx.id, (approx.embedding <#> %(query_vector)s) * -1 AS similarity
+            FROM (
+                SELECT t.id, t.embedding
+                FROM {table} t
+                WHERE {where}
+                ORDER BY {approximate_distance}
+                LIMIT %(rerank_limit)s
+            ) approx
+            ORDER BY approx.embedding <#> %(query_vector)s
+            LIMIT %(candidate_limit)s
+        """
+
+    def course_filter_sql(self, filters: Optional[dict], alias: str = "t"):
+        """
+        Build the WHERE clause for course search filters.
+        
+        Args:
+            filters (dict, optional): Any of
+                platform (str or List[str]): Platforms to include
+                is_free (bool): Only free (True) or only paid (False) courses
+                min_rating (float): Minimum platform rating (0-5)
+                skills (List[str]): Courses teaching at least one of these skills
+            alias (str): Alias of the courses table in the query
+            
+        Returns:
+            Tuple[str, dict]: SQL condition ("TRUE" without filters) and its named parameters
+            
+        Raises:
+            ValueError: If a filter is unknown or has an invalid value
+        """
+        if not filters:
+            return "TRUE", {}
+
+        unknown_filters = set(filters) - set(COURSE_FILTERS)
+        if unknown_filters:
+            raise ValueError(f"Unknown course filters: {', '.join(sorted(unknown_filters))}")
+
+        conditions = []
+        params = {}
+        if filters.get("platform") is not None:
+            platforms = filters["platform"]
+            params["filter_platforms"] = [platforms] if isinstance(platforms, str) else list(platforms)
+            conditions.append(f"{alias}.platform = ANY(%(filter_platforms)s)")
+        if filters.get("is_free") is not None:
+            if not isinstance(filters["is_free"], bool):
+                raise ValueError("is_free filter must be true or false")
+            params["filter_is_free"] = filters["is_free"]
+            conditions.append(f"{alias}.is_free = %(filter_is_free)s")
+        if filters.get("min_rating") is not None:
+            params["filter_min_rating"] = float(filters["min_rating"])
+            conditions.append(f"{alias}.rating >= %(filter_min_rating)s")
+        if filters.get("skills"):
+            skills = filters["skills"]
+            params["filter_skills"] = [skills] if isinstance(skills, str) else list(skills)
+            # && (overlaps) is served by the GIN index on skills
+            conditions.append(f"{alias}.skills && %(filter_skills)s::text[]")
+
+        if not conditions:
+            return "TRUE", {}
+        return " AND ".join(conditions), params
+
+    def filtered_course_candidate_sql(self, cursor, filters: Optional[dict], params: dict) -> str:
+        """
+        Build the vector candidate query for courses, choosing how to apply filters.
+        
+        Selective filters (at most FILTER_PREFILTER_MAX_ROWS matching courses) pre-filter: the
+        matching rows are fetched through the btree/GIN indexes and scanned exactly, skipping the
+        ANN index. Broad filters post-filter inside the ANN index scan, with iterative index scans
+        enabled so the scan keeps going until candidate_limit rows pass the filter (a plain HNSW
+        scan stops after ef_search rows, returning too few results for filtered queries).
+        
+        Args:
+            cursor: The cursor the search will run on
+            filters (dict, optional): Course filters (see course_filter_sql)
+            params (dict): Named parameters of the search, updated with the filter parameters
+            
+        Returns:
+            str: SQL returning (id, similarity), like candidate_search_sql
+        """
+        where, filter_params = self.course_filter_sql(filters)
+        params.update(filter_params)
+        if not filter_params:
+            return self.candidate_search_sql("courses")
+
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM courses t WHERE {where} LIMIT %(prefilter_max_rows)s
+            ) matching
+        """, {**filter_params, "prefilter_max_rows": FILTER_PREFILTER_MAX_ROWS + 1})
+        matching_rows = cursor.fetchone()[0]
+
+        if matching_rows <= FILTER_PREFILTER_MAX_ROWS:
+            # MATERIALIZED keeps the planner from pushing the ORDER BY into the ANN index
+            return f"""
+                WITH filtered AS MATERIALIZED (
+                    SELECT t.id, t.embedding FROM courses t WHERE {where}
+                )
+                SELECT f.id, (f.embedding <#> %(query_vector)s) * -1 AS similarity
+                FROM filtered f
+                ORDER BY f.embedding <#> %(query_vector)s
+                LIMIT %(candidate_limit)s
+            """
+
+        # relaxed_order may return candidates slightly out of order, they are re-ranked afterwards
+        cursor.execute("SELECT set_config('hnsw.iterative_scan', 'relaxed_order', true)")
+        cursor.execute("SELECT set_config('ivfflat.iterative_scan', 'relaxed_order', true)")
+        return self.candidate_search_sql("courses", where)
+
+    def candidate_search_params(self, cursor, query_vector: List[float], candidate_limit: int, ef_search: Optional[int] = None, prefix_vector: Optional[List[float]] = None) -> dict:
+        """
+        Prepare the named parameters for candidate_search_sql and size hnsw.ef_search for them.
+        
+        Args:
+            cursor: The cursor the search will run on
+            query_vector (List[float]): The query embedding vector
+            candidate_limit (int): Number of candidates to return after re-ranking
+            ef_search (int, optional): Requested HNSW candidate list size
+            prefix_vector (List[float], optional): Truncated query embedding for the matryoshka
+                storage mode (derived from query_vector when omitted)
+            
+        Returns:
+            dict: Parameters for candidate_search_sql
+        """
+        rerank_limit = candidate_limit * RERANK_CANDIDATE_FACTOR
+        self.set_ef_search(cursor, ef_search, rerank_limit)
+        if prefix_vector is None:
+            prefix_vector = truncate_embedding(query_vector, MATRYOSHKA_DIMENSIONS)
+        return {
+            # Stored embeddings are unit vectors, so normalize the query and use inner product
+            "query_vector": self.pgvector_format(l2_normalize(query_vector)),
+            "prefix_vector": self.pgvector_format(l2_normalize(prefix_vector)),
+            "candidate_limit": candidate_limit,
+            "rerank_limit": rerank_limit,
+        }
+
+    def lexical_search_sql(self, where: str = "TRUE") -> str:
+        """
+        Build the full-text candidate query over courses.search_vector.
+        
+        Args:
+            where (str): Filter on courses (aliased c)
+            
+        Returns:
+            str: SQL returning (id, lexical_rank) for the %(candidate_limit)s best matches of
+                %(query_text)s, using the named parameters query_text and candidate_limit
+        """
+        # websearch_to_tsquery never raises on user input (quotes, "or", -exclusions are supported)
+        return f"""
+            SELECT c.id, ts_rank_cd(c.search_vector, q.tsquery) AS lexical_rank
+            FROM courses c, websearch_to_tsquery('english', %(query_text)s) AS q(tsquery)
+            WHERE c.search_vector @@ q.tsquery AND {where}
+            ORDER BY lexical_rank DESC
+            LIMIT %(candidate_limit)s
+        """
+
+    def rank_course_candidates(self, cursor, candidates_sql: str, params: dict):
+        """
+        Rank course candidates by relevance blended with their normalized rating.
         Normalizes ratings separately for courses with internal reviews vs external reviews.
         
+        Args:
+            cursor: The cursor to run the query on
+            candidates_sql (str): Query returning (id, similarity, relevance) for every candidate,
+                where relevance (0-1) is the score blended with the rating
+            params (dict): Named parameters for candidates_sql, plus similarity_weight and limit
+            
+        Returns:
+            List[Dict]: List of ranked courses
+        """
+        cursor.execute(f"""
+            WITH candidates AS (
+                {candidates_sql}
+            ),
+            similar_courses AS (
+                SELECT 
+                    c.id, c.title, c.description, c.platform, c.authors, c.skills, c.rating, 
+                    c.num_ratings, c.image_url, c.is_free, c.url,
+                    rs.avg_rating AS course_review_rating,
+                    rs.review_count AS course_review_rating_num,
+                    c.rating AS original_website_rating,
+                    c.num_ratings AS original_website_num_ratings,
+                    cand.similarity,
+                    cand.relevance,
+                    CASE WHEN rs.avg_rating IS NOT NULL THEN 1 ELSE 0 END AS has_internal_reviews
+                FROM candidates cand
+                JOIN courses c ON c.id = cand.id
+                -- maintained by every review write, see review_stats_upsert_sql
+                LEFT JOIN course_review_stats rs ON c.id = rs.course_id
+            ),
+            normalized_internal_reviews AS (
+                -- Normalize courses that have internal reviews against each other
+                SELECT 
+                    *,
+                    course_review_rating / 5 AS norm_rating,
+                    LOG(1 + course_review_rating_num) / NULLIF(LOG(1 + MAX(course_review_rating_num) OVER ()), 0) AS norm_reviews,
+                    (course_review_rating / 5) * (LOG(1 + course_review_rating_num) / NULLIF(LOG(1 + MAX(course_review_rating_num) OVER ()), 0)) AS normalized_effective_rating
+                FROM similar_courses
+                WHERE has_internal_reviews = 1
+            ),
+            normalized_external_reviews AS (
+                -- Normalize courses that only have external reviews against each other
+                SELECT 
+                    *,
+                    original_website_rating / 5 AS norm_rating,
+                    LOG(1 + original_website_num_ratings) / NULLIF(LOG(1 + MAX(original_website_num_ratings) OVER ()), 0) AS norm_reviews,
+                    (original_website_rating / 5) * (LOG(1 + original_website_num_ratings) / NULLIF(LOG(1 + MAX(original_website_num_ratings) OVER ()), 0)) AS normalized_effective_rating
+                FROM similar_courses
+                WHERE has_internal_reviews = 0
+            ),
+            combined_results AS (
+                SELECT * FROM normalized_internal_reviews
+                UNION ALL
+                SELECT * FROM normalized_external_reviews
+            )
+            SELECT 
+                id, title, description, platform, authors, skills, image_url, is_free, url,
+                course_review_rating, course_review_rating_num,
+                original_website_rating, original_website_num_ratings, 
+                CASE 
+                    WHEN has_internal_reviews = 1 THEN course_review_rating 
+                    ELSE original_website_rating 
+                END AS rating_used_for_query, 
+                CASE 
+                    WHEN has_internal_reviews = 1 THEN course_review_rating_num 
+                    ELSE original_website_num_ratings 
+                END AS num_ratings_used_for_query,
+                -- Ordering related fields
+                similarity, relevance, norm_rating, norm_reviews, normalized_effective_rating,
+                %(similarity_weight)s * relevance + (1-%(similarity_weight)s) * normalized_effective_rating AS custom_ranking,
+                has_internal_reviews
+            FROM combined_results
+            ORDER BY custom_ranking DESC
+            LIMIT %(limit)s
+        """, params)
+        
+        columns = [desc[0] for desc in cursor.description]
+        results = []
+        
+        for row in cursor.fetchall():
+            # Convert row to dictionary
+            course_dict = dict(zip(columns, row))
+            results.append(course_dict)
+                
+        return results
+
+    def query_course_vector(self, query_vector: List[float], limit: int = 10, threshold: float = 0.5, similarity_weight: float = .85, ef_search: Optional[int] = None, prefix_vector: Optional[List[float]] = None, filters: Optional[dict] = None):
+        """
+        Search for courses similar to the given query vector.
+        
+        The nearest neighbours are fetched first with ORDER BY distance LIMIT k so the
+        vector index is used (re-ranking compact candidates on the full embedding when
+        courses use halfvec, binary or matryoshka storage), and the similarity threshold is applied
+        to those candidates.
+        
         Args:
             query_vector (List[float]): The query embedding vector
             limit (int): Maximum number of results to return
             threshold (float): Minimum similarity threshold (0-1)
             similarity_weight (float): Weight given to vector similarity vs. rating (0-1)
+            ef_search (int, optional): HNSW candidate list size for this query (higher = better recall, slower)
+            prefix_vector (List[float], optional): Truncated query embedding for matryoshka storage
+            filters (dict, optional): platform, is_free, min_rating and/or skills (see course_filter_sql)
             
         Returns:
             List[Dict]: List of courses with similarity scores
         """
         with self.conn.cursor() as cursor:
-            # Format the query vector for pgvector
-            vector_str = self.pgvector_format(query_vector)
+            params = self.candidate_search_params(cursor, query_vector, limit * 2, ef_search, prefix_vector)
+            params.update({
+                "threshold": threshold,
+                "similarity_weight": similarity_weight,
+                "limit": limit,
+            })
+            
+            vector_candidates_sql = self.filtered_course_candidate_sql(cursor, filters, params)
+            candidates_sql = f"""
+                SELECT vec.id, vec.similarity, vec.similarity AS relevance
+                FROM ({vector_candidates_sql}) vec
+                WHERE vec.similarity > %(threshold)s
+            """
+            return self.rank_course_candidates(cursor, candidates_sql, params)
+
+    def query_course_lexical(self, query_text: str, limit: int = 10, similarity_weight: float = .85, filters: Optional[dict] = None):
+        """
+        Search for courses matching the query text with full-text search only.
+        Used when the query can't be embedded, so it never needs the embedder.
+        
+        Relevance is the reciprocal rank of each match (1 for the best match), on the same
+        scale as the hybrid search's fused score.
+        
+        Args:
+            query_text (str): The search query
+            limit (int): Maximum number of results to return
+            similarity_weight (float): Weight given to text relevance vs. rating (0-1)
+            filters (dict, optional): platform, is_free, min_rating and/or skills (see course_filter_sql)
             
-            cursor.execute("""
-                WITH review_ratings AS (
-                    SELECT r.course_id, AVG(r.rating) AS avg_rating, COUNT(r.id) AS num_reviews 
-                    FROM course_reviews r 
-                    GROUP BY r.course_id
-                ),
-                similar_courses AS (
-                    SELECT 
-                        c.id, c.title, c.description, c.platform, c.authors, c.skills, c.rating, 
-                        c.num_ratings, c.image_url, c.is_free, c.url,
-                        rr.avg_rating AS course_review_rating,
-                        rr.num_reviews AS course_review_rating_num,
-                        c.rating AS original_website_rating,
-                        c.num_ratings AS original_website_num_ratings,
-                        1 - (c.embedding <=> %s) as similarity,
-                        CASE WHEN rr.avg_rating IS NOT NULL THEN 1 ELSE 0 END AS has_internal_reviews
-                    FROM courses c
-                    LEFT JOIN review_ratings rr ON c.id = rr.course_id
-                    WHERE 1 - (c.embedding <=> %s) > %s
-                    ORDER BY similarity DESC
-                    LIMIT %s
-                ),
-                normalized_internal_reviews AS (
-                    -- Normalize courses that have internal reviews against each other
-                    SELECT 
-                        *,
-                        course_review_rating / 5 AS norm_rating,
-                        LOG(1 + course_review_rating_num) / NULLIF(LOG(1 + MAX(course_review_rating_num) OVER ()), 0) AS norm_reviews,
-                        (course_review_rating / 5) * (LOG(1 + course_review_rating_num) / NULLIF(LOG(1 + MAX(course_review_rating_num) OVER ()), 0)) AS normalized_effective_rating
-                    FROM similar_courses
-                    WHERE has_internal_reviews = 1
-                ),
-                normalized_external_reviews AS (
-                    -- Normalize courses that only have external reviews against each other
-                    SELECT 
-                        *,
-                        original_website_rating / 5 AS norm_rating,
-                        LOG(1 + original_website_num_ratings) / NULLIF(LOG(1 + MAX(original_website_num_ratings) OVER ()), 0) AS norm_reviews,
-                        (original_website_rating / 5) * (LOG(1 + original_website_num_ratings) / NULLIF(LOG(1 + MAX(original_website_num_ratings) OVER ()), 0)) AS normalized_effective_rating
-                    FROM similar_courses
-                    WHERE has_internal_reviews = 0
-                ),
-                combined_results AS (
-                    SELECT * FROM normalized_internal_reviews
-                    UNION ALL
-                    SELECT * FROM normalized_external_reviews
-                )
-                SELECT 
-                    id, title, description, platform, authors, skills, image_url, is_free, url,
-                    course_review_rating, course_review_rating_num,
-                    original_website_rating, original_website_num_ratings, 
-                    CASE 
-                        WHEN has_internal_reviews = 1 THEN course_review_rating 
-                        ELSE original_website_rating 
-                    END AS rating_used_for_query, 
-                    CASE 
-                        WHEN has_internal_reviews = 1 THEN course_review_rating_num 
-                        ELSE original_website_num_ratings 
-                    END AS num_ratings_used_for_query,
-                    -- Ordering related fields
-                    similarity, norm_rating, norm_reviews, normalized_effective_rating,
-                    %s * similarity + (1-%s) * normalized_effective_rating AS custom_ranking,
-                    has_internal_reviews
-                FROM combined_results
-                ORDER BY custom_ranking DESC
-                LIMIT %s
-            """, [vector_str, vector_str, threshold, limit * 2, similarity_weight, similarity_weight, limit])
+        Returns:
+            List[Dict]: List of matching courses (similarity is None)
+        """
+        where, filter_params = self.course_filter_sql(filters, alias="c")
+        with self.conn.cursor() as cursor:
+            params = {
+                **filter_params,
+                "query_text": query_text,
+                "candidate_limit": limit * 2,
+                "rrf_k": HYBRID_RRF_K,
+                "similarity_weight": similarity_weight,
+                "limit": limit,
+            }
             
-            columns = [desc[0] for desc in cursor.description]
-            results = []
+            candidates_sql = f"""
+                SELECT lex.id, NULL::float AS similarity,
+                    (%(rrf_k)s + 1.0) / (%(rrf_k)s + ROW_NUMBER() OVER (ORDER BY lex.lexical_rank DESC)) AS relevance
+                FROM ({self.lexical_search_sql(where)}) lex
+            """
+            return self.rank_course_candidates(cursor, candidates_sql, params)
+
+    def query_course_hybrid(self, query_text: str, query_vector: List[float], limit: int = 10, threshold: float = 0.5, similarity_weight: float = .85, ef_search: Optional[int] = None, prefix_vector: Optional[List[float]] = None, vector_weight: float = HYBRID_VECTOR_WEIGHT, lexical_weight: float = HYBRID_LEXICAL_WEIGHT, filters: Optional[dict] = None):
+        """
+        Search for courses with both the vector index and full-text search, fusing the two
+        candidate lists with reciprocal rank fusion (RRF):
+        
+            score(c) = vector_weight / (k + vector_rank(c)) + lexical_weight / (k + lexical_rank(c))
+        
+        A course missing from one list gets no contribution from it, so exact title or skill
+        matches are found even when their embedding is not among the nearest neighbours.
+        The fused score is divided by its maximum (first in both lists) so it stays in 0-1
+        before being blended with the rating like the vector search's similarity.
+        
+        Args:
+            query_text (str): The search query
+            query_vector (List[float]): The query embedding vector
+            limit (int): Maximum number of results to return
+            threshold (float): Minimum similarity for vector candidates (0-1)
+            similarity_weight (float): Weight given to the fused relevance vs. rating (0-1)
+            ef_search (int, optional): HNSW candidate list size for this query
+            prefix_vector (List[float], optional): Truncated query embedding for matryoshka storage
+            vector_weight (float): RRF weight of the vector candidate list
+            lexical_weight (float): RRF weight of the full-text candidate list
+            filters (dict, optional): platform, is_free, min_rating and/or skills (see course_filter_sql)
             
-            for row in cursor.fetchall():
-                # Convert row to dictionary
-                course_dict = dict(zip(columns, row))
-                results.append(course_dict)
-                    
-        return results
+        Returns:
+            List[Dict]: List of courses with similarity (None for text-only matches) and fused relevance
+        """
+        with self.conn.cursor() as cursor:
+            params = self.candidate_search_params(cursor, query_vector, limit * 2, ef_search, prefix_vector)
+            params.update({
+                "query_text": query_text,
+                "threshold": threshold,
+                "rrf_k": HYBRID_RRF_K,
+                "vector_weight": vector_weight,
+                "lexical_weight": lexical_weight,
+                "similarity_weight": similarity_weight,
+                "limit": limit,
+            })
+            vector_candidates_sql = self.filtered_course_candidate_sql(cursor, filters, params)
+            lexical_where, _ = self.course_filter_sql(filters, alias="c")
+            
+            candidates_sql = f"""
+                SELECT
+                    COALESCE(vec.id, lex.id) AS id,
+                    vec.similarity,
+                    (
+                        COALESCE(%(vector_weight)s / (%(rrf_k)s + vec.rank), 0) +
+                        COALESCE(%(lexical_weight)s / (%(rrf_k)s + lex.rank), 0)
+                    ) / ((%(vector_weight)s + %(lexical_weight)s) / (%(rrf_k)s + 1.0)) AS relevance
+                FROM (
+                    SELECT ann.id, ann.similarity, ROW_NUMBER() OVER (ORDER BY ann.similarity DESC) AS rank
+                    FROM ({vector_candidates_sql}) ann
+                    WHERE ann.similarity > %(threshold)s
+                ) vec
+                FULL OUTER JOIN (
+                    SELECT fts.id, ROW_NUMBER() OVER (ORDER BY fts.lexical_rank DESC) AS rank
+                    FROM ({self.lexical_search_sql(lexical_where)}) fts
+                ) lex ON lex.id = vec.id
+            """
+            return self.rank_course_candidates(cursor, candidates_sql, params)
 
-    def query_discussion_vectors(self, query_vector: List[float], limit: int = 10, threshold: float = 0.5):
+    def query_discussion_vectors(self, query_vector: List[float], limit: int = 10, threshold: float = 0.5, ef_search: Optional[int] = None, prefix_vector: Optional[List[float]] = None):
         """
         Search for discussions similar to the given query vector.
         
@@ -1553,42 +2538,41 @@ class PostgresVectorDB(VectorDB):
             query_vector (List[float]): The query embedding vector
             limit (int): Maximum number of results to return
             threshold (float): Minimum similarity threshold (0-1)
+            ef_search (int, optional): HNSW candidate list size for this query
+            prefix_vector (List[float], optional): Truncated query embedding for matryoshka storage
             
         Returns:
             List[Dict]: List of discussions with similarity scores
         """
         with self.conn.cursor() as cursor:
-            # Format the query vector for pgvector
-            vector_str = self.pgvector_format(query_vector)
+            params = self.candidate_search_params(cursor, query_vector, limit, ef_search, prefix_vector)
+            params["threshold"] = threshold
             
-            cursor.execute("""
+            cursor.execute(f"""
+                WITH candidates AS (
+                    {self.candidate_search_sql("discussions")}
+                )
                 SELECT 
                     d.id, 
                     d.title, 
                     d.description,
                     d.created_at,
                     u.username as author,
-                    CASE 
-                        WHEN d.course_id IS NOT NULL THEN 'course'
-                        ELSE 'learning_journey'
-                    END as context_type,
-                    COALESCE(d.course_id, d.learning_journey_id) as context_id,
-                    COALESCE(c.title, lj.title) as context_title,
-                    1 - (d.embedding <=> %s) as similarity
+                    ARRAY(
+                        SELECT cd.course_id FROM course_discussions cd WHERE cd.discussion_id = d.id
+                    ) as referenced_course_ids,
+                    cand.similarity
                 FROM 
-                    discussions d
+                    candidates cand
+                JOIN 
+                    discussions d ON d.id = cand.id
                 JOIN 
                     users u ON d.user_id = u.id
-                LEFT JOIN 
-                    courses c ON d.course_id = c.id
-                LEFT JOIN 
-                    learning_journeys lj ON d.learning_journey_id = lj.id
                 WHERE 
-                    1 - (d.embedding <=> %s) > %s
+                    cand.similarity > %(threshold)s
                 ORDER BY 
-                    d.embedding <=> %s
-                LIMIT %s
-            """, [vector_str, vector_str, threshold, vector_str, limit])
+                    cand.similarity DESC
+            """, params)
             
             columns = [desc[0] for desc in cursor.description]
             results = []
@@ -1600,7 +2584,7 @@ class PostgresVectorDB(VectorDB):
                 
         return results
 
-    def query_reply_vectors(self, query_vector: List[float], limit: int = 10, threshold: float = 0.5):
+    def query_reply_vectors(self, query_vector: List[float], limit: int = 10, threshold: float = 0.5, ef_search: Optional[int] = None, prefix_vector: Optional[List[float]] = None):
         """
         Search for replies similar to the given query vector.
         
@@ -1608,15 +2592,20 @@ class PostgresVectorDB(VectorDB):
             query_vector (List[float]): The query embedding vector
             limit (int): Maximum number of results to return
             threshold (float): Minimum similarity threshold (0-1)
+            ef_search (int, optional): HNSW candidate list size for this query
+            prefix_vector (List[float], optional): Truncated query embedding for matryoshka storage
             
         Returns:
             List[Dict]: List of replies with similarity scores
         """
         with self.conn.cursor() as cursor:
-            # Format the query vector for pgvector
-            vector_str = self.pgvector_format(query_vector)
+            params = self.candidate_search_params(cursor, query_vector, limit, ef_search, prefix_vector)
+            params["threshold"] = threshold
             
-            cursor.execute("""
+            cursor.execute(f"""
+                WITH candidates AS (
+                    {self.candidate_search_sql("replies")}
+                )
                 SELECT 
                     r.id, 
                     r.text,
@@ -1624,29 +2613,20 @@ class PostgresVectorDB(VectorDB):
                     u.username as author,
                     d.id as discussion_id,
                     d.title as discussion_title,
-                    CASE 
-                        WHEN d.course_id IS NOT NULL THEN 'course'
-                        ELSE 'learning_journey'
-                    END as context_type,
-                    COALESCE(d.course_id, d.learning_journey_id) as context_id,
-                    COALESCE(c.title, lj.title) as context_title,
-                    1 - (r.embedding <=> %s) as similarity
+                    cand.similarity
                 FROM 
-                    replies r
+                    candidates cand
+                JOIN 
+                    replies r ON r.id = cand.id
                 JOIN 
                     users u ON r.user_id = u.id
                 JOIN 
                     discussions d ON r.discussion_id = d.id
-                LEFT JOIN 
-                    courses c ON d.course_id = c.id
-                LEFT JOIN 
-                    learning_journeys lj ON d.learning_journey_id = lj.id
                 WHERE 
-                    1 - (r.embedding <=> %s) > %s
+                    cand.similarity > %(threshold)s
                 ORDER BY 
-                    r.embedding <=> %s
-                LIMIT %s
-            """, [vector_str, vector_str, threshold, vector_str, limit])
+                    cand.similarity DESC
+            """, params)
             
             columns = [desc[0] for desc in cursor.description]
             results = []
@@ -1658,7 +2638,7 @@ class PostgresVectorDB(VectorDB):
                 
         return results
 
-    def query_discussions_and_replies_vectors(self, query_vector: List[float], limit: int = 10, threshold: float = 0.5):
+    def query_discussions_and_replies_vectors(self, query_vector: List[float], limit: int = 10, threshold: float = 0.5, ef_search: Optional[int] = None, prefix_vector: Optional[List[float]] = None):
         """
         Search for discussions and replies similar to the given query vector.
         Results are combined and sorted by similarity score.
@@ -1667,15 +2647,23 @@ class PostgresVectorDB(VectorDB):
             query_vector (List[float]): The query embedding vector
             limit (int): Maximum number of results to return
             threshold (float): Minimum similarity threshold (0-1)
+            ef_search (int, optional): HNSW candidate list size for this query
+            prefix_vector (List[float], optional): Truncated query embedding for matryoshka storage
             
         Returns:
             List[Dict]: List of discussions and replies with similarity scores and content type
         """
         with self.conn.cursor() as cursor:
-            # Format the query vector for pgvector
-            vector_str = self.pgvector_format(query_vector)
+            params = self.candidate_search_params(cursor, query_vector, limit, ef_search, prefix_vector)
+            params.update({"threshold": threshold, "limit": limit})
             
-            cursor.execute("""
+            cursor.execute(f"""
+                WITH discussion_candidates AS (
+                    {self.candidate_search_sql("discussions")}
+                ),
+                reply_candidates AS (
+                    {self.candidate_search_sql("replies")}
+                )
                 -- Discussions query
                 SELECT 
                     d.id,
@@ -1684,23 +2672,16 @@ class PostgresVectorDB(VectorDB):
                     d.description as content_text,
                     d.created_at,
                     u.username as author,
-                    CASE 
-                        WHEN d.course_id IS NOT NULL THEN 'course'
-                        ELSE 'learning_journey'
-                    END as context_type,
-                    COALESCE(d.course_id, d.learning_journey_id) as context_id,
-                    COALESCE(c.title, lj.title) as context_title,
-                    1 - (d.embedding <=> %s) as similarity
+                    d.id as discussion_id,
+                    dc.similarity
                 FROM 
-                    discussions d
+                    discussion_candidates dc
+                JOIN 
+                    discussions d ON d.id = dc.id
                 JOIN 
                     users u ON d.user_id = u.id
-                LEFT JOIN 
-                    courses c ON d.course_id = c.id
-                LEFT JOIN 
-                    learning_journeys lj ON d.learning_journey_id = lj.id
                 WHERE 
-                    1 - (d.embedding <=> %s) > %s
+                    dc.similarity > %(threshold)s
                     
                 UNION ALL
                 
@@ -1712,30 +2693,23 @@ class PostgresVectorDB(VectorDB):
                     r.text as content_text,
                     r.created_at,
                     u.username as author,
-                    CASE 
-                        WHEN d.course_id IS NOT NULL THEN 'course'
-                        ELSE 'learning_journey'
-                    END as context_type,
-                    COALESCE(d.course_id, d.learning_journey_id) as context_id,
-                    COALESCE(c.title, lj.title) as context_title,
-                    1 - (r.embedding <=> %s) as similarity
+                    d.id as discussion_id,
+                    rc.similarity
                 FROM 
-                    replies r
+                    reply_candidates rc
+                JOIN 
+                    replies r ON r.id = rc.id
                 JOIN 
                     users u ON r.user_id = u.id
                 JOIN 
                     discussions d ON r.discussion_id = d.id
-                LEFT JOIN 
-                    courses c ON d.course_id = c.id
-                LEFT JOIN 
-                    learning_journeys lj ON d.learning_journey_id = lj.id
                 WHERE 
-                    1 - (r.embedding <=> %s) > %s
+                    rc.similarity > %(threshold)s
                     
                 ORDER BY 
                     similarity DESC
-                LIMIT %s
-            """, [vector_str, vector_str, threshold, vector_str, vector_str, threshold, limit])
+                LIMIT %(limit)s
+            """, params)
             
             columns = [desc[0] for desc in cursor.description]
             results = []
@@ -1749,7 +2723,23 @@ class PostgresVectorDB(VectorDB):
     
     # remove or update for new schema
     def clear_courses(self):
-        pass
+        course_data_version.bump()
 
     def close(self):
-        self.conn.close()
\ No newline at end of file
+        # Request scoped connections are shared by every get_vector_db() call in a request,
+        # so they stay checked out until the request is torn down
+        if self.request_scoped:
+            return
+        self.release()
+
+    def release(self):
+        """
+        Return the connection to its pool, or close it if it was not pooled.
+        """
+        if self.conn is None:
+            return
+        if self.pool is not None:
+            self.pool.putconn(self.conn)
+        else:
+            self.conn.close()
+        self.conn = None
\ No newline at end of file
@@ -0,0 +1,99 @@
+import psycopg2
+from typing import Dict
+from env import DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+
+"""
+Repair drift in the denormalized reply and like counters
+
+discussions.reply_count / like_count and replies.reply_count / like_count are updated by
+the statements that insert and delete replies, likes and users (see PostgresVectorDB), but
+not by writes made outside the API, e.g. rows deleted by hand. This recounts every counter
+from the replies and likes tables and fixes the ones that differ. It can run while the API
+is serving (e.g. from a nightly cron job): rows are locked in batches before they are
+recounted, so writes to them wait for the batch instead of being overwritten by it:
+
+    python -m database.reconcile_counters
+"""
+
+# rows locked and recounted per transaction
+RECONCILE_BATCH_SIZE = 1000
+
+# counter name -> (table, counter column, counted table and the join of its rows to ids.id)
+COUNTERS = {
+    "discussions.reply_count": ("discussions", "reply_count", "replies c ON c.discussion_id = ids.id"),
+    "replies.reply_count": ("replies", "reply_count", "replies c ON c.parent_reply_id = ids.id"),
+    "discussions.like_count": ("discussions", "like_count", "likes c ON c.object_id = ids.id AND c.object_type = 'discussion'"),
+    "replies.like_count": ("replies", "like_count", "likes c ON c.object_id = ids.id AND c.object_type = 'reply'"),
+}
+
+
+def reconcile_counter(conn, table: str, column: str, counted: str, batch_size: int = RECONCILE_BATCH_SIZE) -> int:
+    """
+    Recount one counter, RECONCILE_BATCH_SIZE rows per transaction. Each batch is locked
+    first and recounted by a second statement, whose snapshot (READ COMMITTED) includes every
+    write committed before the lock, while writes to the locked rows wait until the batch
+    commits and then apply on top of the recounted value.
+
+    Returns:
+        int: Number of rows repaired
+    """
+    repaired = 0
+    last_id = None
+    while True:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT id FROM {table}
+                    WHERE %s::uuid IS NULL OR id > %s::uuid
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE
+                """, [last_id, last_id, batch_size])
+                ids = [str(row[0]) for row in cursor.fetchall()]
+                if not ids:
+                    conn.rollback()
+                    return repaired
+
+                cursor.execute(f"""
+                    UPDATE {table} o
+                    SET {column} = counts.actual
+                    FROM (
+                        SELECT ids.id, COUNT(c.id) AS actual
+                        FROM unnest(%s::uuid[]) AS ids(id)
+                        LEFT JOIN {counted}
+                        GROUP BY ids.id
+                    ) counts
+                    WHERE o.id = counts.id AND o.{column} <> counts.actual
+                """, [ids])
+                repaired += cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        last_id = ids[-1]
+
+
+def reconcile_counters(conn) -> Dict[str, int]:
+    """
+    Recount every reply and like counter.
+
+    Args:
+        conn: An open psycopg2 connection
+
+    Returns:
+        Dict[str, int]: Number of rows repaired per counter
+    """
+    return {
+        counter: reconcile_counter(conn, table, column, counted)
+        for counter, (table, column, counted) in COUNTERS.items()
+    }
+
+
+if __name__ == "__main__":
+    connection_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    connection = psycopg2.connect(connection_string)
+    try:
+        for counter, rows in reconcile_counters(connection).items():
+            print(f"{counter}: repaired {rows} row(s)")
+    finally:
+        connection.close()
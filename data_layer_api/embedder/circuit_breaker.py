@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, TypeVar
+from opentelemetry import metrics
+from embedder.embedding_backend import EmbedderError
+
+"""
+Circuit breaker and bulkhead for embedding calls
+
+The breaker tracks the outcome of the last calls. When too many of them failed or were slow
+it opens and calls fail fast with EmbedderUnavailableError instead of waiting on a stalled
+backend. After a cool-down it lets a single probe call through (half open) and closes again
+if the probe succeeds. The bulkhead caps how many request threads can be waiting on the
+backend at once, so an outage can't tie up every worker thread.
+"""
+
+meter = metrics.get_meter(__name__)
+rejection_counter = meter.create_counter(
+    "embedding.circuit_breaker.rejections",
+    description="Embedding calls rejected without calling the backend (breaker open or bulkhead full)",
+)
+state_change_counter = meter.create_counter(
+    "embedding.circuit_breaker.state_changes",
+    description="Embedding circuit breaker state transitions, by new state",
+)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class EmbedderUnavailableError(EmbedderError):
+    """
+    Raised without calling the backend when the circuit breaker is open or the bulkhead is full
+    """
+    pass
+
+
+class CircuitBreaker:
+    """
+    Args:
+        window_size (int): Number of recent calls the failure and slow call rates are computed over
+        min_calls (int): Calls needed in the window before the breaker can open
+        failure_rate (float): Fraction of failed calls (0-1) that opens the breaker
+        slow_call_ms (float): Calls slower than this count as slow
+        slow_call_rate (float): Fraction of slow calls (0-1) that opens the breaker
+        open_seconds (float): Seconds the breaker stays open before a probe call is allowed
+        max_concurrent_calls (int): Bulkhead size, calls in flight at once
+        bulkhead_timeout (float): Seconds a call waits for a bulkhead slot before being rejected
+    """
+    def __init__(self, window_size: int, min_calls: int, failure_rate: float, slow_call_ms: float,
+                 slow_call_rate: float, open_seconds: float, max_concurrent_calls: int, bulkhead_timeout: float):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.bulkhead_timeout = bulkhead_timeout
+
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window_size)  # (failed, slow) per call
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._bulkhead = threading.BoundedSemaphore(max_concurrent_calls)
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """
+        Run fn through the breaker and bulkhead.
+
+        Raises:
+            EmbedderUnavailableError: If the breaker is open or no bulkhead slot freed up in time
+            Whatever fn raised otherwise
+        """
+        probe = self._before_call()
+        if not self._bulkhead.acquire(timeout=self.bulkhead_timeout):
+            if probe:
+                self._release_probe()
+            rejection_counter.add(1, {"reason": "bulkhead_full"})
+            raise EmbedderUnavailableError("Too many embedding calls in flight")
+
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            # any error counts, otherwise a probe failing with e.g. an HTTPError would never be released
+            self._record(failed=True, elapsed_ms=(time.perf_counter() - start) * 1000, probe=probe)
+            raise
+        finally:
+            self._bulkhead.release()
+
+        self._record(failed=False, elapsed_ms=(time.perf_counter() - start) * 1000, probe=probe)
+        return result
+
+    def is_open(self) -> bool:
+        """
+        Return whether calls are currently being rejected
+        """
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self._opened_at < self.open_seconds
+
+    def _before_call(self) -> bool:
+        """
+        Reject the call if the breaker is open. Returns whether the call is the half open probe.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+        rejection_counter.add(1, {"reason": "circuit_open"})
+        raise EmbedderUnavailableError("Embedding circuit breaker is open")
+
+    def _release_probe(self):
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _record(self, failed: bool, elapsed_ms: float, probe: bool):
+        slow = elapsed_ms > self.slow_call_ms
+        with self._lock:
+            if probe:
+                self._probe_in_flight = False
+                if failed or slow:
+                    self._open()
+                else:
+                    self._outcomes.clear()
+                    self._transition(CLOSED)
+                return
+
+            self._outcomes.append((failed, slow))
+            if self.state == CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = sum(1 for call_failed, _ in self._outcomes if call_failed)
+                slow_calls = sum(1 for _, call_slow in self._outcomes if call_slow)
+                if failures / len(self._outcomes) >= self.failure_rate or slow_calls / len(self._outcomes) >= self.slow_call_rate:
+                    self._open()
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._transition(OPEN)
+
+    def _transition(self, state: str):
+        if self.state != state:
+            self.state = state
+            state_change_counter.add(1, {"state": state})
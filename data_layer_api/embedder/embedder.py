@@ -1,23 +1,113 @@
-import requests
-from typing import List
+import threading
+import time
+import unicodedata
+from opentelemetry import metrics
+from typing import List, Tuple
 from classes.course import Course
 from classes.discussion import Discussion
 from classes.reply import Reply
-
-OLLAMA_EMBED_ENDPOINT = "http://ollama:11434/api/embed"
-OLLAMA_MODEL_PULL_ENDPOINT = "http://ollama:11434/api/pull"
+from embedder.vectors import truncate_embedding
+from cache.ttl_cache import TTLCache
+from embedder.embedding_store import get_embedding_store, content_hash
+from embedder.single_flight import SingleFlight
+from embedder.embedding_backend import EmbeddingBackend, EmbedderError
+from embedder.circuit_breaker import CircuitBreaker, EmbedderUnavailableError
+from env import MATRYOSHKA_DIMENSIONS, EMBEDDING_BACKEND
+from env import EMBED_BATCH_SIZE, EMBED_BATCH_MAX_SIZE, EMBED_BATCH_MAX_CHARS, EMBED_BATCH_TARGET_MS
+from env import EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL, EMBEDDER_READ_TIMEOUT
+from env import EMBEDDER_BREAKER_WINDOW, EMBEDDER_BREAKER_MIN_CALLS, EMBEDDER_BREAKER_FAILURE_RATE, EMBEDDER_BREAKER_SLOW_CALL_MS
+from env import EMBEDDER_BREAKER_SLOW_CALL_RATE, EMBEDDER_BREAKER_OPEN_SECONDS, EMBEDDER_MAX_CONCURRENT_CALLS, EMBEDDER_BULKHEAD_TIMEOUT
 
 """
 Embedder module for courses and queries
 
-Relies on underlying Ollama API hosted via a docker container
+Embeddings come from the backend selected by EMBEDDING_BACKEND: the Ollama API hosted via
+a docker container (default), an in-process ONNX model, or a deterministic fake for
+running without a model.
 """
 
+meter = metrics.get_meter(__name__)
+cache_hit_counter = meter.create_counter(
+    "embedding.cache.hits",
+    description="Query embeddings served from the in-process cache",
+)
+cache_miss_counter = meter.create_counter(
+    "embedding.cache.misses",
+    description="Query embeddings that had to be computed by the embedding backend",
+)
+cache_eviction_counter = meter.create_counter(
+    "embedding.cache.evictions",
+    description="Query embeddings evicted from the full in-process cache",
+)
+coalesced_call_counter = meter.create_counter(
+    "embedding.coalesced_calls",
+    description="Embedding requests served by waiting on an identical request already in flight",
+)
+
+# Search queries are heavily repeated, so their embeddings are cached (see get_embedding)
+query_embedding_cache = TTLCache(EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL)
+# Concurrent identical queries that miss the cache share one embedding call
+embedding_flight = SingleFlight()
+
+# Interactive (query) and bulk (batch) embedding calls have separate breakers and bulkheads:
+# large batches are expected to be slow, and bulk loads must not starve search of capacity
+query_breaker = CircuitBreaker(
+    EMBEDDER_BREAKER_WINDOW, EMBEDDER_BREAKER_MIN_CALLS, EMBEDDER_BREAKER_FAILURE_RATE, EMBEDDER_BREAKER_SLOW_CALL_MS,
+    EMBEDDER_BREAKER_SLOW_CALL_RATE, EMBEDDER_BREAKER_OPEN_SECONDS, EMBEDDER_MAX_CONCURRENT_CALLS, EMBEDDER_BULKHEAD_TIMEOUT,
+)
+batch_breaker = CircuitBreaker(
+    EMBEDDER_BREAKER_WINDOW, EMBEDDER_BREAKER_MIN_CALLS, EMBEDDER_BREAKER_FAILURE_RATE, float("inf"),
+    1.0, EMBEDDER_BREAKER_OPEN_SECONDS, EMBEDDER_MAX_CONCURRENT_CALLS, EMBEDDER_READ_TIMEOUT,
+)
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def create_embedding_backend(name: str = EMBEDDING_BACKEND) -> EmbeddingBackend:
+    """
+    Create the embedding backend selected by EMBEDDING_BACKEND (ollama, onnx or fake)
+    """
+    if name == "ollama":
+        from embedder.ollama_backend import OllamaBackend
+        return OllamaBackend()
+    elif name == "onnx":
+        from embedder.onnx_backend import OnnxBackend
+        return OnnxBackend()
+    elif name == "fake":
+        from embedder.fake_backend import FakeBackend
+        return FakeBackend()
+    else:
+        raise ValueError(f"Unsupported EMBEDDING_BACKEND: {name}")
+
+
+def get_embedder() -> EmbeddingBackend:
+    """
+    Return the process-wide embedding backend, creating it on first use
+    """
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                _embedder = create_embedding_backend()
+    return _embedder
+
+
+def warm_up_embedder():
+    """
+    Prepare the embedding model (pull or load it) ahead of the first request. Failures are
+    only logged, the first embedding call prepares the model again if this didn't succeed.
+    """
+    try:
+        get_embedder().ensure_model()
+    except Exception as e:
+        print(f"Embedding model warm-up failed: {str(e)}")
+
 def embed_course_vector(course: Course) ->List[float]:
     """
     Return an embedded vectors a course based on relevant semantic fields
     """
-    return get_embedding(course_to_string(course))
+    return embed_stored([course_to_string(course)])[0]
 
 
 def course_to_string(course: Course) -> str:
@@ -46,7 +136,7 @@ def embed_discussion_vector(discussion: Discussion) -> List[float]:
     Returns:
         List[float]: The embedding vector for the discussion
     """
-    return get_embedding(discussion_to_string(discussion))
+    return embed_stored([discussion_to_string(discussion)])[0]
 
 def discussion_to_string(discussion: Discussion) -> str:
     """
@@ -65,19 +155,189 @@ def discussion_to_string(discussion: Discussion) -> str:
     
     return " ".join(parts)  
 
-def get_embedding(query: str) -> List[float]:
+class BatchSizer:
+    """
+    Picks the size of the next embedding batch from the latency of the previous ones.
+
+    Each batch aims to take about EMBED_BATCH_TARGET_MS: the size moves halfway towards
+    target / (observed time per text) after every batch and is halved when a batch fails.
+    Batches are also cut at EMBED_BATCH_MAX_CHARS of input so long descriptions don't
+    produce oversized requests.
+    """
+    def __init__(self, size: int = EMBED_BATCH_SIZE, max_size: int = EMBED_BATCH_MAX_SIZE,
+                 max_chars: int = EMBED_BATCH_MAX_CHARS, target_ms: float = EMBED_BATCH_TARGET_MS):
+        self.size = max(1, min(size, max_size))
+        self.max_size = max_size
+        self.max_chars = max_chars
+        self.target_ms = target_ms
+
+    def next_batch_end(self, texts: List[str], start: int) -> int:
+        """
+        Return the end index (exclusive) of the batch starting at start
+        """
+        end = start
+        chars = 0
+        while end < len(texts) and end - start < self.size:
+            chars += len(texts[end])
+            # always take at least one text, even if it is longer than max_chars on its own
+            if chars > self.max_chars and end > start:
+                break
+            end += 1
+        return end
+
+    def record_success(self, batch_size: int, elapsed_ms: float):
+        per_text_ms = max(elapsed_ms / batch_size, 0.1)
+        ideal = self.target_ms / per_text_ms
+        self.size = max(1, min(self.max_size, int((self.size + ideal) / 2)))
+
+    def record_failure(self):
+        self.size = max(1, self.size // 2)
+
+
+def embed_batch(texts: List[str]) -> List[List[float]]:
+    """
+    Embed many texts with as few backend calls as possible.
+
+    The texts are sent in batches sized adaptively from the observed latency and payload size.
+    A failed batch is retried at half the size until a single text fails on its own.
+    
+    Args:
+        texts (List[str]): The texts to embed
+        
+    Returns:
+        List[List[float]]: One embedding per text, in input order
+    """
+    embedder = get_embedder()
+    sizer = BatchSizer()
+    embeddings = []
+    start = 0
+    while start < len(texts):
+        end = sizer.next_batch_end(texts, start)
+        batch_start = time.perf_counter()
+        try:
+            batch = texts[start:end]
+            embeddings.extend(batch_breaker.call(lambda: embedder.embed_many(batch)))
+        except EmbedderUnavailableError:
+            raise
+        except EmbedderError:
+            if end - start == 1:
+                raise
+            sizer.record_failure()
+            continue
+        sizer.record_success(end - start, (time.perf_counter() - batch_start) * 1000)
+        start = end
+    return embeddings
+
+
+def embed_courses(courses: List[Course]) -> List[List[float]]:
     """
-    Makes request to Ollama container API to get embedding for a query
+    Return embedded vectors for many courses (see embed_batch), in input order
+    """
+    return embed_stored([course_to_string(course) for course in courses])
+
+
+def embed_stored(texts: List[str]) -> List[List[float]]:
+    """
+    Embed entity texts, reusing embeddings of previously embedded text from the persistent
+    embedding store and only sending new text to the model (see embed_batch).
+    
+    Args:
+        texts (List[str]): The texts to embed
+        
+    Returns:
+        List[List[float]]: One embedding per text, in input order
+    """
+    store = get_embedding_store()
+    if store is None:
+        return embed_batch(texts)
+
+    model = get_embedder().model
+    hashes = [content_hash(model, text) for text in texts]
+    try:
+        embeddings = store.lookup(hashes)
+    except Exception as e:
+        print(f"Error reading the embedding store: {str(e)}")
+        embeddings = {}
+
+    # dict keeps one copy of repeated texts
+    missing = {text_hash: text for text_hash, text in zip(hashes, texts) if text_hash not in embeddings}
+    if missing:
+        new_embeddings = dict(zip(missing, embed_batch(list(missing.values()))))
+        try:
+            store.store(model, new_embeddings)
+        except Exception as e:
+            print(f"Error writing to the embedding store: {str(e)}")
+        embeddings.update(new_embeddings)
+
+    return [embeddings[text_hash] for text_hash in hashes]
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize query text for the embedding cache so trivially different spellings of a query
+    ("Python", " python ", full-width characters) share an entry
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+def get_embedding(query: str, use_cache: bool = True) -> List[float]:
+    """
+    Get the embedding for a query from the configured embedding backend
+    
+    Args:
+        query (str): The text to embed
+        use_cache (bool): Serve repeated queries from the in-process cache. Entity text
+            (courses, discussions, replies) goes through embed_stored instead.
+        
+    Returns:
+        List[float]: The embedding vector
+        
+    Raises:
+        EmbedderUnavailableError: If the embedding circuit breaker is open or too many calls are in flight
+        EmbedderError: If the backend failed
+    """
+    embedder = get_embedder()
+    if not use_cache:
+        embedding, shared = embedding_flight.do((embedder.model, query), lambda: query_breaker.call(lambda: embedder.embed(query)))
+        if shared:
+            coalesced_call_counter.add(1)
+        return list(embedding)
+
+    normalized_query = normalize_query(query)
+    cache_key = (embedder.model, normalized_query)
+    embedding = query_embedding_cache.get(cache_key)
+    if embedding is not None:
+        cache_hit_counter.add(1)
+        return list(embedding)
+
+    cache_miss_counter.add(1)
+    embedding, shared = embedding_flight.do(cache_key, lambda: query_breaker.call(lambda: embedder.embed(normalized_query)))
+    if shared:
+        # the thread that made the call caches the result
+        coalesced_call_counter.add(1)
+        return list(embedding)
+
+    evicted = query_embedding_cache.set(cache_key, tuple(embedding))
+    if evicted:
+        cache_eviction_counter.add(evicted)
+    return list(embedding)
+
+def get_embedding_with_prefix(query: str, dimensions: int = MATRYOSHKA_DIMENSIONS, use_cache: bool = True) -> Tuple[List[float], List[float]]:
+    """
+    Return both the full embedding for a query and its renormalized Matryoshka prefix
+    from a single embedding call. The prefix is used for the first (short vector) search
+    stage of tables stored in matryoshka mode, the full vector for re-ranking.
+    
+    Args:
+        query (str): The text to embed
+        dimensions (int): Length of the truncated prefix
+        use_cache (bool): Serve repeated queries from the in-process cache
+        
+    Returns:
+        Tuple[List[float], List[float]]: The full embedding and the truncated embedding
     """
-    # request to pull nomic-embed-text model
-    # TODO: look into a better way to handle pulling (rather than pulling on each query)
-    # model might be cached in volumes of ollama service - might be worth looking into later to confirm
-    # can probably wrap in a singleton class that only pulls once on first call 
-    pull_response = requests.post(OLLAMA_MODEL_PULL_ENDPOINT, json={"model": "nomic-embed-text"}) 
-    pull_response.raise_for_status()
-    response = requests.post(OLLAMA_EMBED_ENDPOINT, json={"model": "nomic-embed-text", "input": query})
-    response.raise_for_status()
-    return response.json()['embeddings'][0]
+    embedding = get_embedding(query, use_cache)
+    return embedding, truncate_embedding(embedding, dimensions)
 
 def embed_reply_vector(reply: Reply) -> List[float]:
     """
@@ -89,7 +349,7 @@ def embed_reply_vector(reply: Reply) -> List[float]:
     Returns:
         List[float]: The embedding vector for the reply
     """
-    return get_embedding(reply_to_string(reply))
+    return embed_stored([reply_to_string(reply)])[0]
 
 def reply_to_string(reply: Reply) -> str:
     """
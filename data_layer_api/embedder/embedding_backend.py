@@ -0,0 +1,42 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+
+class EmbedderError(Exception):
+    """
+    Raised when a backend could not return an embedding (after any retries)
+    """
+    pass
+
+
+class EmbeddingBackend(ABC):
+    """
+    Source of text embeddings. Implementations must be safe to share between threads.
+
+    model identifies the embeddings a backend produces: it is part of the query cache and
+    persistent embedding store keys, so backends producing different vectors must use
+    different model names.
+    """
+    model: str
+
+    def ensure_model(self):
+        """
+        Prepare the model (download, load) ahead of the first embedding. Safe to call repeatedly.
+        """
+        pass
+
+    @abstractmethod
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """
+        Return one embedding per text, in input order
+
+        Raises:
+            EmbedderError: If the embeddings could not be computed
+        """
+        pass
+
+    def embed(self, text: str) -> List[float]:
+        """
+        Return the embedding for a single text
+        """
+        return self.embed_many([text])[0]
@@ -0,0 +1,87 @@
+import hashlib
+import psycopg2.extras
+from typing import Dict, List
+from env import DB_IMPLEMENTATION, EMBEDDING_STORE_ENABLED
+
+"""
+Persistent embedding store (the embedding_cache table)
+
+Entity embeddings are looked up by sha256(model + input text) before asking the model,
+so reloading an unchanged catalog only reads from Postgres. The store is an optimization
+only: if it can't be read or written the embeddings are computed as usual.
+"""
+
+
+def content_hash(model: str, text: str) -> str:
+    """
+    Return the store key for a text embedded with a model
+    """
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+def parse_vector(value: str) -> List[float]:
+    """
+    Parse pgvector's text format ("[0.1,0.2,...]") into a list of floats
+    """
+    return [float(component) for component in value.strip("[]").split(",")]
+
+
+class EmbeddingStore:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def lookup(self, hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Return the stored embeddings for the given content hashes (missing hashes are left out)
+        """
+        if not hashes:
+            return {}
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT content_hash, embedding::text FROM embedding_cache WHERE content_hash = ANY(%s)",
+                    [list(hashes)]
+                )
+                return {row[0]: parse_vector(row[1]) for row in cursor.fetchall()}
+        finally:
+            self.pool.putconn(conn)
+
+    def store(self, model: str, embeddings: Dict[str, List[float]]):
+        """
+        Save embeddings by content hash (hashes that are already stored are left unchanged)
+        """
+        if not embeddings:
+            return
+        rows = [
+            (content_hash, model, f"[{','.join(map(str, embedding))}]")
+            for content_hash, embedding in embeddings.items()
+        ]
+        conn = self.pool.getconn()
+        try:
+            with conn.cursor() as cursor:
+                psycopg2.extras.execute_values(cursor, """
+                    INSERT INTO embedding_cache (content_hash, model, embedding) VALUES %s
+                    ON CONFLICT (content_hash) DO NOTHING
+                """, rows)
+            conn.commit()
+        finally:
+            self.pool.putconn(conn)
+
+
+_store = None
+
+
+def get_embedding_store():
+    """
+    Return the process-wide embedding store, or None when it is disabled
+    (EMBEDDING_STORE_ENABLED=false or a non-postgres DB_IMPLEMENTATION)
+    """
+    global _store
+    if not EMBEDDING_STORE_ENABLED or DB_IMPLEMENTATION != "postgres":
+        return None
+    if _store is None:
+        # imported here so the embedder doesn't open a database pool unless the store is used
+        from database.connection_pool import get_pool
+        _store = EmbeddingStore(get_pool())
+    return _store
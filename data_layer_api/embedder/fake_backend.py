@@ -0,0 +1,68 @@
+import hashlib
+import random
+import re
+import time
+from functools import lru_cache
+from typing import List, Tuple
+from embedder.embedding_backend import EmbeddingBackend, EmbedderError
+from embedder.vectors import l2_normalize
+from env import FAKE_EMBEDDING_LATENCY_MS, FAKE_EMBEDDING_TAIL_LATENCY_MS, FAKE_EMBEDDING_TAIL_PROBABILITY, FAKE_EMBEDDING_ERROR_RATE
+
+"""
+Deterministic stand-in embedding backend for tests, benchmarks and ETL dry runs
+
+Each word is mapped to a fixed pseudo-random vector seeded by its hash, and a text's
+embedding is the normalized sum of its word vectors. The same text always gets the same
+embedding and texts sharing words are similar, so search behaves plausibly without a model.
+Latency and errors can be injected to exercise timeouts, hedging and circuit breaking.
+"""
+
+FAKE_EMBEDDING_DIMENSIONS = 768
+WORD_PATTERN = re.compile(r"\w+")
+# distinct tokens whose vectors are kept, so injected latency isn't drowned out by regenerating them
+SEEDED_VECTOR_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=SEEDED_VECTOR_CACHE_SIZE)
+def seeded_vector(token: str, dimensions: int = FAKE_EMBEDDING_DIMENSIONS) -> Tuple[float, ...]:
+    """
+    Return the fixed pseudo-random vector for a token (a tuple, since it is shared between calls)
+    """
+    seed = int.from_bytes(hashlib.sha256(token.encode("utf-8")).digest()[:8], "big")
+    generator = random.Random(seed)
+    return tuple(generator.gauss(0, 1) for _ in range(dimensions))
+
+
+class FakeBackend(EmbeddingBackend):
+    """
+    Args:
+        latency_ms (float): Delay added to every call
+        tail_latency_ms (float): Extra delay added to a tail_probability fraction of calls
+        tail_probability (float): Fraction of calls (0-1) that get the tail latency
+        error_rate (float): Fraction of calls (0-1) that raise EmbedderError
+    """
+    model = "fake-hash-768"
+
+    def __init__(self, latency_ms: float = FAKE_EMBEDDING_LATENCY_MS, tail_latency_ms: float = FAKE_EMBEDDING_TAIL_LATENCY_MS,
+                 tail_probability: float = FAKE_EMBEDDING_TAIL_PROBABILITY, error_rate: float = FAKE_EMBEDDING_ERROR_RATE):
+        self.latency_ms = latency_ms
+        self.tail_latency_ms = tail_latency_ms
+        self.tail_probability = tail_probability
+        self.error_rate = error_rate
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        delay_ms = self.latency_ms
+        if self.tail_latency_ms and random.random() < self.tail_probability:
+            delay_ms += self.tail_latency_ms
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+
+        if self.error_rate and random.random() < self.error_rate:
+            raise EmbedderError("Injected fake embedding error")
+
+        return [self.embed_text(text) for text in texts]
+
+    def embed_text(self, text: str) -> List[float]:
+        tokens = WORD_PATTERN.findall(text.casefold()) or [text]
+        embedding = [sum(values) for values in zip(*map(seeded_vector, tokens))]
+        return l2_normalize(embedding)
@@ -0,0 +1,367 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from opentelemetry import metrics
+from embedder.embedding_backend import EmbeddingBackend, EmbedderError
+from env import OLLAMA_HOSTS, EMBEDDING_MODEL
+from env import EMBEDDER_CONNECT_TIMEOUT, EMBEDDER_READ_TIMEOUT, EMBEDDER_PULL_TIMEOUT, EMBEDDER_MAX_RETRIES, EMBEDDER_POOL_SIZE
+from env import OLLAMA_EJECT_FAILURES, OLLAMA_EJECT_SECONDS, OLLAMA_HEDGE_ENABLED, OLLAMA_HEDGE_PERCENTILE, OLLAMA_HEDGE_MIN_SAMPLES
+
+"""
+Embedding backend for the Ollama API hosted via docker containers
+
+Calls are spread over every endpoint in OLLAMA_HOSTS: each call goes to the healthy endpoint
+with the fewest requests in flight (ties broken by lower EWMA latency). Endpoints that fail
+OLLAMA_EJECT_FAILURES times in a row are ejected for OLLAMA_EJECT_SECONDS and re-admitted
+afterwards on probation (a single failure ejects them again). Endpoints receive no calls
+until the model has been pulled on them, pulls after startup run in the background. With
+hedging enabled, a single text embedding call still running after the observed p95 latency
+of single text calls is duplicated on another endpoint, and the duplicate's response is used
+if the original one fails.
+"""
+
+meter = metrics.get_meter(__name__)
+hedged_request_counter = meter.create_counter(
+    "embedding.hedged_requests",
+    description="Embedding calls duplicated on a second endpoint after exceeding the p95 latency",
+)
+hedge_win_counter = meter.create_counter(
+    "embedding.hedge_wins",
+    description="Hedged embedding calls answered by the duplicate request after the original one failed",
+)
+ejection_counter = meter.create_counter(
+    "embedding.endpoint_ejections",
+    description="Ollama endpoints ejected after consecutive failures",
+)
+
+# Status codes worth retrying (Ollama returns 503 while it is loading or overloaded)
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRY_BACKOFF_SECONDS = 0.2
+EWMA_ALPHA = 0.2
+LATENCY_SAMPLES = 500
+
+
+class OllamaEndpoint:
+    """
+    Load and health state of one Ollama replica
+    """
+    def __init__(self, host: str):
+        self.host = host.rstrip("/")
+        self.outstanding = 0
+        self.ewma_latency_ms: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        # set when ejected: once re-admitted, a single failure ejects the endpoint again
+        self.probation = False
+        self.model_ready = False
+        self.pulling = False
+        # earliest time a failed background pull is retried
+        self.next_pull_at = 0.0
+
+    def is_available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+
+class OllamaBackend(EmbeddingBackend):
+    """
+    Client for the Ollama embedding API.
+
+    Keeps one requests.Session so connections to Ollama are reused (keep-alive) across calls
+    and threads, and makes sure the model is pulled once per endpoint rather than on every call.
+    """
+    def __init__(self, hosts: List[str] = OLLAMA_HOSTS, model: str = EMBEDDING_MODEL, hedge: bool = OLLAMA_HEDGE_ENABLED):
+        if not hosts:
+            raise ValueError("At least one Ollama host is required")
+        self.endpoints = [OllamaEndpoint(host) for host in hosts]
+        self.model = model
+        self.timeout = (EMBEDDER_CONNECT_TIMEOUT, EMBEDDER_READ_TIMEOUT)
+        self.max_retries = EMBEDDER_MAX_RETRIES
+        # hedging needs a second endpoint to send the duplicate to
+        self.hedge = hedge and len(self.endpoints) > 1
+
+        self.session = requests.Session()
+        # one connection per concurrent request thread and endpoint, reused between calls
+        adapter = HTTPAdapter(pool_connections=len(self.endpoints), pool_maxsize=EMBEDDER_POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._state_lock = threading.Lock()
+        self._model_lock = threading.Lock()
+        self._latencies_ms = deque(maxlen=LATENCY_SAMPLES)
+        self._hedge_executor = ThreadPoolExecutor(max_workers=EMBEDDER_POOL_SIZE, thread_name_prefix="ollama-hedge") if self.hedge else None
+        # one per hedge thread, a call isn't hedged when none is free rather than queueing its duplicate
+        self._hedge_slots = threading.BoundedSemaphore(EMBEDDER_POOL_SIZE)
+
+    def ensure_model(self):
+        """
+        Pull the embedding model on every endpoint that hasn't been prepared yet.
+        Pulling a model that is already present only checks its manifest.
+
+        Raises:
+            EmbedderError: If the model could not be pulled on any endpoint
+        """
+        if all(endpoint.model_ready for endpoint in self.endpoints):
+            return
+        with self._model_lock:
+            errors = []
+            for endpoint in self.endpoints:
+                if endpoint.model_ready:
+                    continue
+                try:
+                    self._pull(endpoint)
+                except (requests.RequestException, EmbedderError) as e:
+                    # pulled in the background once calls need it, see _pick_endpoint
+                    errors.append(f"{endpoint.host}: {str(e)}")
+
+            if not any(endpoint.model_ready for endpoint in self.endpoints):
+                raise EmbedderError(f"Could not pull {self.model} on any Ollama endpoint: {'; '.join(errors)}")
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """
+        Return the embeddings for several texts from a single Ollama call, in input order.
+        Only single text calls (queries) are hedged and sampled for the hedge delay, since
+        batch latency grows with the batch size.
+        """
+        payload = {"model": self.model, "input": texts}
+        single = len(texts) == 1
+        try:
+            if self.hedge and single:
+                response = self._post_hedged("/api/embed", payload)
+            else:
+                response = self._post("/api/embed", payload, sample_latency=single)
+        except requests.RequestException as e:
+            # non-retryable errors (e.g. 400 or 404 for an unknown model) are re-raised as is by _post
+            raise EmbedderError(f"Embedding request failed: {str(e)}") from e
+        embeddings = response.json()["embeddings"]
+        if len(embeddings) != len(texts):
+            raise EmbedderError(f"Expected {len(texts)} embeddings from Ollama, got {len(embeddings)}")
+        return embeddings
+
+    def _pull(self, endpoint: OllamaEndpoint):
+        response = self.session.post(
+            f"{endpoint.host}/api/pull", json={"model": self.model, "stream": False},
+            timeout=(EMBEDDER_CONNECT_TIMEOUT, EMBEDDER_PULL_TIMEOUT)
+        )
+        response.raise_for_status()
+        endpoint.model_ready = True
+
+    def _pull_in_background(self, endpoint: OllamaEndpoint):
+        """
+        Start pulling the model on an endpoint that isn't prepared, unless a pull is already
+        running or the last one failed less than OLLAMA_EJECT_SECONDS ago
+        """
+        with self._state_lock:
+            if endpoint.model_ready or endpoint.pulling or endpoint.next_pull_at > time.monotonic():
+                return
+            endpoint.pulling = True
+        threading.Thread(target=self._background_pull, args=(endpoint,), name="ollama-pull", daemon=True).start()
+
+    def _background_pull(self, endpoint: OllamaEndpoint):
+        try:
+            self._pull(endpoint)
+        except (requests.RequestException, EmbedderError) as e:
+            print(f"Pulling {self.model} on {endpoint.host} failed: {str(e)}")
+            with self._state_lock:
+                endpoint.next_pull_at = time.monotonic() + OLLAMA_EJECT_SECONDS
+        finally:
+            with self._state_lock:
+                endpoint.pulling = False
+
+    def _pick_endpoint(self, exclude: Set[OllamaEndpoint] = frozenset()) -> Optional[OllamaEndpoint]:
+        """
+        Return the available endpoint with the fewest requests in flight (then the lowest EWMA latency).
+        Endpoints the model hasn't been pulled on are skipped and their pull is started in the
+        background. When every endpoint is ejected the one re-admitted soonest is used rather
+        than failing outright. Returns None if every prepared endpoint is excluded.
+
+        Raises:
+            EmbedderError: If the model isn't ready on any endpoint yet
+        """
+        now = time.monotonic()
+        unprepared = [endpoint for endpoint in self.endpoints if not endpoint.model_ready]
+        for endpoint in unprepared:
+            self._pull_in_background(endpoint)
+        if len(unprepared) == len(self.endpoints):
+            raise EmbedderError(f"{self.model} is not ready on any Ollama endpoint yet")
+
+        with self._state_lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude and endpoint.model_ready]
+            if not candidates:
+                return None
+            available = [endpoint for endpoint in candidates if endpoint.is_available(now)]
+            if not available:
+                return min(candidates, key=lambda endpoint: endpoint.ejected_until)
+            return min(available, key=lambda endpoint: (
+                endpoint.outstanding,
+                endpoint.ewma_latency_ms if endpoint.ewma_latency_ms is not None else 0.0,
+            ))
+
+    def _send(self, endpoint: OllamaEndpoint, path: str, payload: dict, timeout=None, sample_latency: bool = False) -> requests.Response:
+        """
+        POST to one endpoint, tracking its requests in flight, latency and health.
+        With sample_latency, the latency also counts towards the hedge delay.
+
+        Raises:
+            requests.RequestException: Connection errors, timeouts and HTTP errors
+        """
+        url = f"{endpoint.host}{path}"
+        with self._state_lock:
+            endpoint.outstanding += 1
+        try:
+            start = time.perf_counter()
+            response = self.session.post(url, json=payload, timeout=timeout or self.timeout)
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                raise requests.HTTPError(f"{response.status_code} from {url}", response=response)
+            response.raise_for_status()
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            if is_retryable(e):
+                self._record_failure(endpoint)
+            raise
+        finally:
+            with self._state_lock:
+                endpoint.outstanding -= 1
+
+        self._record_success(endpoint, (time.perf_counter() - start) * 1000, sample_latency)
+        return response
+
+    def _record_success(self, endpoint: OllamaEndpoint, latency_ms: float, sample_latency: bool = False):
+        with self._state_lock:
+            endpoint.consecutive_failures = 0
+            endpoint.probation = False
+            if endpoint.ewma_latency_ms is None:
+                endpoint.ewma_latency_ms = latency_ms
+            else:
+                endpoint.ewma_latency_ms = EWMA_ALPHA * latency_ms + (1 - EWMA_ALPHA) * endpoint.ewma_latency_ms
+            if sample_latency:
+                self._latencies_ms.append(latency_ms)
+
+    def _record_failure(self, endpoint: OllamaEndpoint):
+        now = time.monotonic()
+        with self._state_lock:
+            if not endpoint.is_available(now):
+                # already ejected (e.g. a request that was in flight when it was ejected)
+                return
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= OLLAMA_EJECT_FAILURES or endpoint.probation:
+                endpoint.ejected_until = now + OLLAMA_EJECT_SECONDS
+                endpoint.consecutive_failures = 0
+                endpoint.probation = True
+                ejection_counter.add(1, {"endpoint": endpoint.host})
+
+    def _hedge_delay_seconds(self) -> Optional[float]:
+        """
+        Return the single text call latency percentile after which a call is hedged, or None
+        until enough calls were observed
+        """
+        with self._state_lock:
+            if len(self._latencies_ms) < OLLAMA_HEDGE_MIN_SAMPLES:
+                return None
+            latencies = sorted(self._latencies_ms)
+        index = min(len(latencies) - 1, int(len(latencies) * OLLAMA_HEDGE_PERCENTILE / 100))
+        return latencies[index] / 1000
+
+    def _post(self, path: str, payload: dict, timeout=None, tried: Set[OllamaEndpoint] = None, sample_latency: bool = False) -> requests.Response:
+        """
+        POST to Ollama, retrying connection errors, timeouts and retryable status codes
+        on the next best endpoint with exponential backoff and full jitter.
+
+        Raises:
+            EmbedderError: If the request still failed after max_retries retries
+        """
+        tried = set(tried or ())
+        error = None
+        for attempt in range(self.max_retries + 1):
+            # prefer an endpoint that hasn't failed this call yet
+            endpoint = self._pick_endpoint(exclude=tried) or self._pick_endpoint()
+            try:
+                return self._send(endpoint, path, payload, timeout, sample_latency)
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                if not is_retryable(e):
+                    raise
+                error = e
+                tried.add(endpoint)
+
+            if attempt < self.max_retries:
+                # full jitter keeps retrying workers from hitting a recovering Ollama in lockstep
+                time.sleep(random.uniform(0, RETRY_BACKOFF_SECONDS * 2 ** attempt))
+
+        raise EmbedderError(f"Embedding request {path} failed after {self.max_retries + 1} attempts: {error}")
+
+    def _post_hedged(self, path: str, payload: dict) -> requests.Response:
+        """
+        POST to the best endpoint on the caller's thread. If it hasn't answered by the hedge
+        delay, a hedge thread sends the same request to the next best endpoint, and if the
+        original request then fails the duplicate's response is used instead of starting a
+        retry. The duplicate is never sent once the original has answered, and the call isn't
+        hedged when no hedge thread is free, so duplicates don't queue behind stuck requests.
+        Falls back to the retrying _post if both requests fail.
+        """
+        hedge_delay = self._hedge_delay_seconds()
+        if hedge_delay is None:
+            return self._post(path, payload, sample_latency=True)
+        primary = self._pick_endpoint()
+        if not self._hedge_slots.acquire(blocking=False):
+            return self._post(path, payload, sample_latency=True)
+
+        primary_done = threading.Event()
+        try:
+            hedge = self._hedge_executor.submit(self._send_hedge, primary, primary_done, hedge_delay, path, payload)
+        except Exception:
+            self._hedge_slots.release()
+            raise
+
+        try:
+            return self._send(primary, path, payload, sample_latency=True)
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            if not is_retryable(e):
+                raise
+        finally:
+            primary_done.set()
+
+        secondary, response = hedge.result()
+        if response is not None:
+            hedge_win_counter.add(1)
+            return response
+
+        # both attempts failed, retry on the remaining endpoints
+        return self._post(path, payload, tried={primary, secondary} - {None}, sample_latency=True)
+
+    def _send_hedge(self, primary: OllamaEndpoint, primary_done: threading.Event, hedge_delay: float,
+                    path: str, payload: dict) -> Tuple[Optional[OllamaEndpoint], Optional[requests.Response]]:
+        """
+        Runs on a hedge thread: wait up to the hedge delay for the original request and, if it
+        is still running, send the duplicate to another available endpoint.
+
+        Returns:
+            Tuple: The endpoint the duplicate went to and its response, None for either if it
+                wasn't sent or failed with a retryable error
+        """
+        try:
+            if primary_done.wait(hedge_delay):
+                return None, None
+            secondary = self._pick_endpoint(exclude={primary})
+            if secondary is None or not secondary.is_available(time.monotonic()):
+                return None, None
+            hedged_request_counter.add(1)
+            try:
+                return secondary, self._send(secondary, path, payload, sample_latency=True)
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                if not is_retryable(e):
+                    raise
+                return secondary, None
+        finally:
+            self._hedge_slots.release()
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Return whether a failed Ollama request is worth retrying (and counts against the endpoint's health)
+    """
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
@@ -0,0 +1,90 @@
+import threading
+from typing import List
+from embedder.embedding_backend import EmbeddingBackend, EmbedderError
+from env import ONNX_MODEL_PATH, ONNX_TOKENIZER_PATH, ONNX_MAX_TOKENS, ONNX_THREADS
+
+"""
+In-process CPU embedding backend using ONNX Runtime
+
+Intended for nomic-embed-text-v1.5's ONNX export (onnx/model.onnx and tokenizer.json from
+the nomic-ai/nomic-embed-text-v1.5 Hugging Face repository), which produces 768 dimension
+Matryoshka embeddings like the Ollama model. Needs the optional packages:
+
+    pip install onnxruntime tokenizers numpy
+"""
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    Args:
+        model_path (str): Path to the ONNX model file
+        tokenizer_path (str): Path to the Hugging Face tokenizer.json for the model
+        max_tokens (int): Inputs are truncated to this many tokens
+        threads (int): ONNX Runtime intra-op threads (0 lets ONNX Runtime decide)
+    """
+    def __init__(self, model_path: str = ONNX_MODEL_PATH, tokenizer_path: str = ONNX_TOKENIZER_PATH,
+                 max_tokens: int = ONNX_MAX_TOKENS, threads: int = ONNX_THREADS):
+        self.model_path = model_path
+        self.tokenizer_path = tokenizer_path
+        self.max_tokens = max_tokens
+        self.threads = threads
+        # embeddings are only comparable with those of the same model file
+        self.model = f"onnx:{model_path}"
+
+        self._session = None
+        self._tokenizer = None
+        self._load_lock = threading.Lock()
+
+    def ensure_model(self):
+        """
+        Load the tokenizer and ONNX model once per process
+        """
+        if self._session is not None:
+            return
+        with self._load_lock:
+            if self._session is not None:
+                return
+            try:
+                import onnxruntime
+                from tokenizers import Tokenizer
+            except ImportError as e:
+                raise EmbedderError(
+                    "EMBEDDING_BACKEND=onnx needs the onnxruntime, tokenizers and numpy packages"
+                ) from e
+
+            tokenizer = Tokenizer.from_file(self.tokenizer_path)
+            tokenizer.enable_truncation(max_length=self.max_tokens)
+            tokenizer.enable_padding()
+
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = self.threads
+            self._tokenizer = tokenizer
+            self._session = onnxruntime.InferenceSession(
+                self.model_path, sess_options=options, providers=["CPUExecutionProvider"]
+            )
+
+    def embed_many(self, texts: List[str]) -> List[List[float]]:
+        import numpy as np
+
+        self.ensure_model()
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        input_names = {model_input.name for model_input in self._session.get_inputs()}
+        if "token_type_ids" in input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+
+        try:
+            token_embeddings = self._session.run(None, inputs)[0]
+        except Exception as e:
+            raise EmbedderError(f"ONNX inference failed: {str(e)}") from e
+
+        # mean pooling over real (unpadded) tokens
+        mask = attention_mask[:, :, None].astype(token_embeddings.dtype)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        # nomic-embed-text-v1.5 applies layer norm before normalizing so its prefixes stay usable
+        embeddings = (embeddings - embeddings.mean(axis=1, keepdims=True)) / np.sqrt(embeddings.var(axis=1, keepdims=True) + 1e-5)
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings.tolist()
@@ -0,0 +1,115 @@
+import threading
+import time
+from typing import List
+from classes.discussion import Discussion
+from classes.reply import Reply
+from database.db_factory import get_vector_db
+from embedder.embedder import embed_stored, discussion_to_string, reply_to_string
+from env import EMBEDDING_WORKER_THREADS, EMBEDDING_WORKER_BATCH_SIZE, EMBEDDING_WORKER_POLL_SECONDS, EMBEDDING_JOB_LEASE_SECONDS
+
+"""
+Background workers that embed pending discussions and replies
+
+Write routes commit discussions and replies without an embedding and queue them in
+embedding_outbox. Workers claim due jobs in batches, embed them with one batched call
+(reusing stored embeddings of unchanged text) and store the results. Any number of
+workers across processes can run at once. Run standalone with:
+
+    python -m embedder.outbox_worker
+"""
+
+
+def job_text(job: dict) -> str:
+    """
+    Return the text to embed for an outbox job, built the same way as the synchronous embedding path
+    """
+    if job["object_type"] == "discussion":
+        return discussion_to_string(Discussion(
+            title=job["title"], description=job["description"], user_id=job["discussion_user_id"]
+        ))
+    return reply_to_string(Reply(
+        user_id=job["reply_user_id"], discussion_id=job["discussion_id"], text=job["text"]
+    ))
+
+
+def is_deleted(job: dict) -> bool:
+    """
+    Return whether the job's object was deleted after it was queued
+    """
+    if job["object_type"] == "discussion":
+        return job["title"] is None
+    return job["text"] is None
+
+
+def process_batch(batch_size: int = EMBEDDING_WORKER_BATCH_SIZE) -> int:
+    """
+    Claim, embed and store one batch of outbox jobs.
+
+    Returns:
+        int: Number of jobs claimed (0 when the outbox has nothing due)
+    """
+    database = get_vector_db()
+    try:
+        jobs = database.claim_embedding_jobs(batch_size, EMBEDDING_JOB_LEASE_SECONDS)
+        if not jobs:
+            return 0
+
+        live_jobs = [job for job in jobs if not is_deleted(job)]
+        try:
+            live_vectors = embed_stored([job_text(job) for job in live_jobs]) if live_jobs else []
+        except Exception as e:
+            print(f"Error embedding {len(live_jobs)} outbox jobs: {str(e)}")
+            database.fail_embedding_jobs(live_jobs, str(e))
+            live_jobs, live_vectors = [], []
+
+        vectors_by_job = {job["id"]: vector for job, vector in zip(live_jobs, live_vectors)}
+        # deleted objects complete with no vector, which drops their jobs
+        finished_jobs = [job for job in jobs if is_deleted(job) or job["id"] in vectors_by_job]
+        database.complete_embedding_jobs(finished_jobs, [vectors_by_job.get(job["id"]) for job in finished_jobs])
+        return len(jobs)
+    finally:
+        database.close()
+
+
+class EmbeddingOutboxWorker:
+    """
+    Pool of daemon threads draining the embedding outbox
+    """
+    def __init__(self, threads: int = EMBEDDING_WORKER_THREADS, poll_seconds: float = EMBEDDING_WORKER_POLL_SECONDS):
+        self.threads = threads
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        for index in range(self.threads):
+            thread = threading.Thread(target=self._run, name=f"embedding-outbox-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                claimed = process_batch()
+            except Exception as e:
+                # e.g. the database is unavailable, keep polling
+                print(f"Error processing the embedding outbox: {str(e)}")
+                claimed = 0
+
+            if claimed == 0:
+                self._stop.wait(self.poll_seconds)
+
+
+if __name__ == "__main__":
+    worker = EmbeddingOutboxWorker()
+    worker.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        worker.stop()
@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+"""
+Request coalescing for concurrent identical calls
+
+The first thread to ask for a key runs the call. Threads asking for the same key while it
+is in flight wait for that call and share its result, or its exception. Nothing is cached
+once the call completes.
+"""
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn for key, or wait for the call already in flight for key.
+
+        Args:
+            key: Identifies calls that would return the same result
+            fn: The call to make if none is in flight
+
+        Returns:
+            Tuple[Any, bool]: The result and whether it was shared from another thread's call
+
+        Raises:
+            Whatever fn raised, in the calling thread and in every thread that waited on it
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key)
+            future.set_exception(e)
+            raise
+
+        self._finish(key)
+        future.set_result(result)
+        return result, False
+
+    def _finish(self, key: Hashable):
+        with self._lock:
+            self._calls.pop(key, None)
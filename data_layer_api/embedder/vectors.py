@@ -0,0 +1,28 @@
+import math
+from typing import List
+
+"""
+Small vector helpers shared by the embedder and the database layer
+"""
+
+def l2_normalize(vector: List[float]) -> List[float]:
+    """
+    Scale a vector to unit length. For unit vectors inner product equals cosine similarity,
+    which lets vector search use the cheaper inner product operator (<#>).
+    A zero vector is returned unchanged.
+    """
+    norm = math.sqrt(sum(value * value for value in vector))
+    if norm == 0:
+        return list(vector)
+    return [value / norm for value in vector]
+
+
+def truncate_embedding(vector: List[float], dimensions: int) -> List[float]:
+    """
+    Return the renormalized first `dimensions` values of a Matryoshka embedding.
+    nomic-embed-text is trained so that prefixes of its embeddings remain useful
+    (lower fidelity) embeddings on their own.
+    """
+    if dimensions > len(vector):
+        raise ValueError(f"Cannot truncate a {len(vector)} dimension embedding to {dimensions} dimensions")
+    return l2_normalize(vector[:dimensions])
@@ -11,4 +11,121 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
-DB_NAME = os.getenv("DB_NAME", "course_data_etl")
\ No newline at end of file
+DB_NAME = os.getenv("DB_NAME", "course_data_etl")
+
+# Postgres connection pool
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))  # seconds to wait for a free connection
+
+
+# HNSW vector index (see https://github.com/pgvector/pgvector#hnsw)
+HNSW_M = int(os.getenv("HNSW_M", "16"))  # max connections per graph node, used when the index is built
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))  # build-time candidate list size
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40"))  # query-time candidate list size for the balanced profile
+
+# IVFFlat vector index (see https://github.com/pgvector/pgvector#ivfflat)
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "10"))  # lists searched per query for the balanced profile
+
+# Search profile applied to every connection: fast, balanced or accurate (see database/index_admin.py)
+VECTOR_SEARCH_PROFILE = os.getenv("VECTOR_SEARCH_PROFILE", "balanced")
+
+# Embedding storage per table: full (vector only), halfvec, binary or matryoshka
+# Compact modes add a quantized or truncated copy of the embedding with its own index for the
+# candidate search and re-rank the candidates on the full precision vector (see database/index_admin.py)
+EMBEDDING_STORAGE_COURSES = os.getenv("EMBEDDING_STORAGE_COURSES", "full")
+EMBEDDING_STORAGE_DISCUSSIONS = os.getenv("EMBEDDING_STORAGE_DISCUSSIONS", "full")
+EMBEDDING_STORAGE_REPLIES = os.getenv("EMBEDDING_STORAGE_REPLIES", "full")
+RERANK_CANDIDATE_FACTOR = int(os.getenv("RERANK_CANDIDATE_FACTOR", "4"))  # compact candidates fetched per result before re-ranking
+MATRYOSHKA_DIMENSIONS = int(os.getenv("MATRYOSHKA_DIMENSIONS", "256"))  # prefix length kept by the matryoshka storage mode
+
+# Unified search (/search) fan-out
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "8"))  # threads shared by all /search requests
+SEARCH_TIMEOUT_MS = int(os.getenv("SEARCH_TIMEOUT_MS", "2000"))  # default and maximum deadline for a /search request
+
+# Hybrid (full-text + vector) course search, fused with reciprocal rank fusion
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))  # rank smoothing constant, larger values flatten the fused scores
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0"))  # weight of the vector candidate ranks
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))  # weight of the full-text candidate ranks
+
+# Course title autocomplete (/course/suggest)
+SUGGEST_CACHE_SIZE = int(os.getenv("SUGGEST_CACHE_SIZE", "2048"))  # hot prefixes kept in memory per process
+SUGGEST_CACHE_TTL = float(os.getenv("SUGGEST_CACHE_TTL", "300"))  # seconds before a cached prefix is looked up again
+
+# Course search result cache (see cache/result_cache.py)
+COURSE_SEARCH_CACHE_SIZE = int(os.getenv("COURSE_SEARCH_CACHE_SIZE", "1024"))  # search results kept in memory per process
+COURSE_SEARCH_CACHE_TTL = float(os.getenv("COURSE_SEARCH_CACHE_TTL", "60"))  # seconds a result is served as fresh
+COURSE_SEARCH_CACHE_STALE_TTL = float(os.getenv("COURSE_SEARCH_CACHE_STALE_TTL", "300"))  # further seconds it is served while refreshed in the background
+
+# Filtered course search: filters matching at most this many courses are applied before the vector
+# search (exact scan of the matching rows), broader filters during the ANN index scan
+FILTER_PREFILTER_MAX_ROWS = int(os.getenv("FILTER_PREFILTER_MAX_ROWS", "2000"))
+
+# Ollama embedding client
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://ollama:11434")
+# comma separated replicas to balance embedding calls over (defaults to OLLAMA_HOST)
+OLLAMA_HOSTS = [host.strip() for host in os.getenv("OLLAMA_HOSTS", OLLAMA_HOST).split(",") if host.strip()]
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+EMBEDDER_CONNECT_TIMEOUT = float(os.getenv("EMBEDDER_CONNECT_TIMEOUT", "2"))  # seconds to open a connection to Ollama
+EMBEDDER_READ_TIMEOUT = float(os.getenv("EMBEDDER_READ_TIMEOUT", "30"))  # seconds to wait for an embedding response
+EMBEDDER_PULL_TIMEOUT = float(os.getenv("EMBEDDER_PULL_TIMEOUT", "600"))  # seconds to wait for the model pull (a first pull downloads it)
+EMBEDDER_MAX_RETRIES = int(os.getenv("EMBEDDER_MAX_RETRIES", "2"))  # retries after a connection error, timeout or 5xx/429
+EMBEDDER_POOL_SIZE = int(os.getenv("EMBEDDER_POOL_SIZE", "10"))  # keep-alive connections to Ollama
+
+# Batch embedding (embed_batch): batch sizes adapt towards the target latency per Ollama call
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))  # size of the first batch
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "256"))  # largest batch sent in one call
+EMBED_BATCH_MAX_CHARS = int(os.getenv("EMBED_BATCH_MAX_CHARS", "200000"))  # input characters per call
+EMBED_BATCH_TARGET_MS = float(os.getenv("EMBED_BATCH_TARGET_MS", "2000"))  # latency each batch aims for
+
+# Query embedding cache (get_embedding): repeated search queries skip the Ollama call
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))  # cached query embeddings per process
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "3600"))  # seconds a cached query embedding is served
+
+# Persistent embedding store (embedding_cache table): course, discussion and reply text that was
+# embedded before is read back from Postgres instead of being sent to the model again
+EMBEDDING_STORE_ENABLED = os.getenv("EMBEDDING_STORE_ENABLED", "true").lower() == "true"
+
+# Asynchronous discussion/reply embedding (embedding_outbox drained by background workers)
+EMBEDDING_WORKER_ENABLED = os.getenv("EMBEDDING_WORKER_ENABLED", "true").lower() == "true"  # start workers with the API
+EMBEDDING_WORKER_THREADS = int(os.getenv("EMBEDDING_WORKER_THREADS", "2"))  # worker threads per process
+EMBEDDING_WORKER_BATCH_SIZE = int(os.getenv("EMBEDDING_WORKER_BATCH_SIZE", "64"))  # outbox rows claimed per batch
+EMBEDDING_WORKER_POLL_SECONDS = float(os.getenv("EMBEDDING_WORKER_POLL_SECONDS", "1"))  # idle wait between empty polls
+EMBEDDING_JOB_LEASE_SECONDS = int(os.getenv("EMBEDDING_JOB_LEASE_SECONDS", "300"))  # claimed jobs are retried after this if a worker dies
+
+# Embedding backend: ollama (default), onnx (in-process CPU model) or fake (deterministic, no model)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "ollama")
+
+# onnx backend (see embedder/onnx_backend.py)
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), "embedder/models/model.onnx")))
+ONNX_TOKENIZER_PATH = os.getenv("ONNX_TOKENIZER_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), "embedder/models/tokenizer.json")))
+ONNX_MAX_TOKENS = int(os.getenv("ONNX_MAX_TOKENS", "512"))  # longer inputs are truncated
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # intra-op threads, 0 lets ONNX Runtime decide
+
+# fake backend latency and error injection
+FAKE_EMBEDDING_LATENCY_MS = float(os.getenv("FAKE_EMBEDDING_LATENCY_MS", "0"))  # delay added to every call
+FAKE_EMBEDDING_TAIL_LATENCY_MS = float(os.getenv("FAKE_EMBEDDING_TAIL_LATENCY_MS", "0"))  # extra delay for tail calls
+FAKE_EMBEDDING_TAIL_PROBABILITY = float(os.getenv("FAKE_EMBEDDING_TAIL_PROBABILITY", "0"))  # fraction of calls that are slow
+FAKE_EMBEDDING_ERROR_RATE = float(os.getenv("FAKE_EMBEDDING_ERROR_RATE", "0"))  # fraction of calls that fail
+
+# Ollama replica health and hedging (see embedder/ollama_backend.py)
+OLLAMA_EJECT_FAILURES = int(os.getenv("OLLAMA_EJECT_FAILURES", "3"))  # consecutive failures before an endpoint is ejected
+OLLAMA_EJECT_SECONDS = float(os.getenv("OLLAMA_EJECT_SECONDS", "30"))  # seconds an ejected endpoint receives no calls
+OLLAMA_HEDGE_ENABLED = os.getenv("OLLAMA_HEDGE_ENABLED", "false").lower() == "true"  # duplicate slow calls on a second endpoint
+OLLAMA_HEDGE_PERCENTILE = float(os.getenv("OLLAMA_HEDGE_PERCENTILE", "95"))  # latency percentile after which a call is hedged
+OLLAMA_HEDGE_MIN_SAMPLES = int(os.getenv("OLLAMA_HEDGE_MIN_SAMPLES", "50"))  # calls observed before hedging starts
+
+# Embedding circuit breaker and bulkhead (see embedder/circuit_breaker.py)
+EMBEDDER_BREAKER_WINDOW = int(os.getenv("EMBEDDER_BREAKER_WINDOW", "20"))  # recent calls the failure/slow rates are computed over
+EMBEDDER_BREAKER_MIN_CALLS = int(os.getenv("EMBEDDER_BREAKER_MIN_CALLS", "10"))  # calls needed before the breaker can open
+EMBEDDER_BREAKER_FAILURE_RATE = float(os.getenv("EMBEDDER_BREAKER_FAILURE_RATE", "0.5"))  # failed call fraction that opens the breaker
+EMBEDDER_BREAKER_SLOW_CALL_MS = float(os.getenv("EMBEDDER_BREAKER_SLOW_CALL_MS", "2000"))  # query embeddings slower than this count as slow
+EMBEDDER_BREAKER_SLOW_CALL_RATE = float(os.getenv("EMBEDDER_BREAKER_SLOW_CALL_RATE", "0.5"))  # slow call fraction that opens the breaker
+EMBEDDER_BREAKER_OPEN_SECONDS = float(os.getenv("EMBEDDER_BREAKER_OPEN_SECONDS", "15"))  # seconds before a probe call is let through
+EMBEDDER_MAX_CONCURRENT_CALLS = int(os.getenv("EMBEDDER_MAX_CONCURRENT_CALLS", "8"))  # embedding calls in flight at once (bulkhead)
+EMBEDDER_BULKHEAD_TIMEOUT = float(os.getenv("EMBEDDER_BULKHEAD_TIMEOUT", "0.2"))  # seconds a query waits for a bulkhead slot
+
+# Like write-behind buffer (see database/like_buffer.py)
+LIKE_WRITE_BEHIND_ENABLED = os.getenv("LIKE_WRITE_BEHIND_ENABLED", "false").lower() == "true"  # queue likes and write them in batches
+LIKE_WRITE_BEHIND_FLUSH_MS = float(os.getenv("LIKE_WRITE_BEHIND_FLUSH_MS", "200"))  # milliseconds between flushes
+LIKE_WRITE_BEHIND_MAX_PENDING = int(os.getenv("LIKE_WRITE_BEHIND_MAX_PENDING", "10000"))  # queued likes before writes go straight to the database
@@ -0,0 +1,189 @@
+import pytest
+from embedder import circuit_breaker
+from embedder.circuit_breaker import CircuitBreaker, EmbedderUnavailableError, CLOSED, OPEN, HALF_OPEN
+from embedder.embedding_backend import EmbedderError
+
+
+class FakeClock:
+    """
+    Stands in for the time module in circuit_breaker, so tests move time forward explicitly
+    """
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    return clock
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    options = dict(
+        window_size=4, min_calls=4, failure_rate=0.5, slow_call_ms=1000,
+        slow_call_rate=1.0, open_seconds=30, max_concurrent_calls=2, bulkhead_timeout=0,
+    )
+    options.update(overrides)
+    return CircuitBreaker(**options)
+
+
+def succeed():
+    return "ok"
+
+
+def fail(error: Exception = None):
+    def call():
+        raise error or EmbedderError("backend failed")
+    return call
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(2):
+        breaker.call(succeed)
+    for _ in range(2):
+        with pytest.raises(EmbedderError):
+            breaker.call(fail())
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_below_min_calls(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        with pytest.raises(EmbedderError):
+            breaker.call(fail())
+    assert breaker.state == CLOSED
+
+
+def test_opens_at_failure_rate_and_rejects_without_calling(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+
+    calls = []
+    with pytest.raises(EmbedderUnavailableError):
+        breaker.call(lambda: calls.append(1))
+    assert calls == []
+    assert breaker.is_open()
+
+
+def test_opens_at_slow_call_rate(clock):
+    breaker = make_breaker(slow_call_ms=100, slow_call_rate=0.5)
+
+    def slow():
+        clock.advance(0.2)
+        return "ok"
+
+    for _ in range(2):
+        breaker.call(succeed)
+    for _ in range(2):
+        breaker.call(slow)
+    assert breaker.state == OPEN
+
+
+def test_successful_probe_closes(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+
+    clock.advance(30)
+    assert not breaker.is_open()
+    assert breaker.call(succeed) == "ok"
+    assert breaker.state == CLOSED
+
+    # the window was cleared, earlier failures don't count towards reopening
+    with pytest.raises(EmbedderError):
+        breaker.call(fail())
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_reopens(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+
+    clock.advance(30)
+    with pytest.raises(EmbedderError):
+        breaker.call(fail())
+    assert breaker.state == OPEN
+    with pytest.raises(EmbedderUnavailableError):
+        breaker.call(succeed)
+
+
+def test_probe_failing_with_other_error_is_released(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+
+    clock.advance(30)
+    with pytest.raises(RuntimeError):
+        breaker.call(fail(RuntimeError("400 Bad Request")))
+    assert breaker.state == OPEN
+    assert not breaker._probe_in_flight
+
+    # the next cool-down lets a new probe through
+    clock.advance(30)
+    assert breaker.call(succeed) == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_only_one_probe_at_a_time(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.advance(30)
+
+    def probe():
+        assert breaker.state == HALF_OPEN
+        # a second call while the probe is in flight is rejected
+        with pytest.raises(EmbedderUnavailableError):
+            breaker.call(succeed)
+        return "probed"
+
+    assert breaker.call(probe) == "probed"
+    assert breaker.state == CLOSED
+
+
+def test_slow_probe_reopens(clock):
+    breaker = make_breaker(slow_call_ms=100)
+    open_breaker(breaker)
+    clock.advance(30)
+
+    def slow():
+        clock.advance(0.2)
+        return "ok"
+
+    assert breaker.call(slow) == "ok"
+    assert breaker.state == OPEN
+
+
+def test_full_bulkhead_rejects(clock):
+    breaker = make_breaker(max_concurrent_calls=1)
+
+    def nested():
+        with pytest.raises(EmbedderUnavailableError):
+            breaker.call(succeed)
+        return "outer"
+
+    assert breaker.call(nested) == "outer"
+    assert breaker.state == CLOSED
+
+
+def test_probe_rejected_by_bulkhead_is_released(clock):
+    breaker = make_breaker(max_concurrent_calls=1)
+    open_breaker(breaker)
+    clock.advance(30)
+
+    # hold the only bulkhead slot so the probe can't get one
+    breaker._bulkhead.acquire()
+    with pytest.raises(EmbedderUnavailableError):
+        breaker.call(succeed)
+    breaker._bulkhead.release()
+
+    assert not breaker._probe_in_flight
+    assert breaker.call(succeed) == "ok"
+    assert breaker.state == CLOSED
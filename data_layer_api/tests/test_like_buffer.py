@@ -0,0 +1,143 @@
+import psycopg2
+import pytest
+from database import like_buffer
+from database.like_buffer import LikeWriteBuffer
+
+
+class FakeDatabase:
+    """
+    Stands in for PostgresVectorDB.apply_like_mutations: likes by unknown users violate the
+    likes.user_id foreign key, and nothing can be written while the database is down
+    """
+    def __init__(self, users):
+        self.users = set(users)
+        self.likes = set()
+        self.down = False
+        self.calls = 0
+
+    def apply_like_mutations(self, likes, unlikes):
+        self.calls += 1
+        if self.down:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        for user_id, _, _ in likes:
+            if user_id not in self.users:
+                raise psycopg2.IntegrityError("insert or update on table \"likes\" violates foreign key constraint")
+        inserted = len(set(likes) - self.likes)
+        deleted = len(set(unlikes) & self.likes)
+        self.likes |= set(likes)
+        self.likes -= set(unlikes)
+        return inserted, deleted
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase(users={"alice", "bob"})
+    monkeypatch.setattr(like_buffer, "get_vector_db", lambda: database)
+    return database
+
+
+def test_flush_writes_batch(database):
+    buffer = LikeWriteBuffer()
+    buffer.like("alice", "d1", "discussion")
+    buffer.like("bob", "d1", "discussion")
+
+    assert buffer.flush() == (2, 0)
+    assert database.calls == 1
+    assert buffer.flush() == (0, 0)
+
+
+def test_coalesces_mutations_of_the_same_like(database):
+    buffer = LikeWriteBuffer()
+    buffer.like("alice", "d1", "discussion")
+    buffer.unlike("alice", "d1", "discussion")
+    buffer.like("alice", "d1", "discussion")
+
+    assert buffer.flush() == (1, 0)
+
+
+def test_row_failing_for_good_is_dropped(database):
+    buffer = LikeWriteBuffer()
+    buffer.like("alice", "d1", "discussion")
+    # queued by a user deleted before the flush
+    buffer.like("deleted-user", "d1", "discussion")
+    buffer.like("bob", "r1", "reply")
+
+    assert buffer.flush() == (2, 0)
+    assert database.likes == {("alice", "d1", "discussion"), ("bob", "r1", "reply")}
+
+    # nothing is re-queued, later flushes don't fail on the dropped like again
+    calls = database.calls
+    assert buffer.flush() == (0, 0)
+    assert database.calls == calls
+
+
+def test_unavailable_database_requeues_and_recovers(database):
+    buffer = LikeWriteBuffer()
+    buffer.like("alice", "d1", "discussion")
+    buffer.like("bob", "d1", "discussion")
+
+    database.down = True
+    with pytest.raises(psycopg2.OperationalError):
+        buffer.flush()
+    assert database.likes == set()
+
+    database.down = False
+    assert buffer.flush() == (2, 0)
+    assert database.likes == {("alice", "d1", "discussion"), ("bob", "d1", "discussion")}
+
+
+def test_failure_while_writing_one_by_one_requeues_unwritten(database):
+    buffer = LikeWriteBuffer()
+    buffer.like("deleted-user", "d1", "discussion")
+    buffer.like("alice", "d1", "discussion")
+    buffer.like("bob", "d1", "discussion")
+
+    apply_like_mutations = database.apply_like_mutations
+
+    def fail_after_first_row(likes, unlikes):
+        result = apply_like_mutations(likes, unlikes)
+        if len(likes) == 1 and database.calls == 3:
+            database.down = True
+        return result
+
+    database.apply_like_mutations = fail_after_first_row
+    with pytest.raises(psycopg2.OperationalError):
+        buffer.flush()
+    # the poison like was dropped and alice's written before the database went down
+    assert database.likes == {("alice", "d1", "discussion")}
+
+    database.down = False
+    assert buffer.flush() == (1, 0)
+    assert database.likes == {("alice", "d1", "discussion"), ("bob", "d1", "discussion")}
+
+
+def test_newer_mutation_wins_over_requeued_one(database):
+    buffer = LikeWriteBuffer()
+    buffer.like("alice", "d1", "discussion")
+
+    database.down = True
+    apply_like_mutations = database.apply_like_mutations
+
+    def unlike_during_flush(likes, unlikes):
+        buffer.unlike("alice", "d1", "discussion")
+        return apply_like_mutations(likes, unlikes)
+
+    database.apply_like_mutations = unlike_during_flush
+    with pytest.raises(psycopg2.OperationalError):
+        buffer.flush()
+
+    database.down = False
+    database.apply_like_mutations = apply_like_mutations
+    assert buffer.flush() == (0, 0)
+    assert database.likes == set()
+
+
+def test_stop_does_not_raise_when_flush_fails(database):
+    buffer = LikeWriteBuffer()
+    buffer.like("alice", "d1", "discussion")
+    database.down = True
+
+    buffer.stop()